@@ -0,0 +1,109 @@
+"""Benchmark: resumo de propriedades com 6 consultas vs. um único $facet.
+
+Uso: python -m benchmarks.summary_facet [documentos] [repetições]
+
+Popula um banco separado (<DATABASE_NAME>_bench) com documentos de
+ServersProperties e mede a latência de /servers_properties/stats/advanced-summary
+nas duas implementações.
+"""
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+from beanie import init_beanie
+from dotenv import load_dotenv
+from pymongo import AsyncMongoClient
+
+from core.summary import SummaryBuilder
+from models.servers_properties import ServersProperties
+
+load_dotenv()
+
+
+async def summary_multi_query():
+    total = await ServersProperties.count()
+    by_gamemode = await ServersProperties.aggregate([
+        {"$group": {"_id": "$gamemode", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}}
+    ]).to_list()
+    by_difficulty = await ServersProperties.aggregate([
+        {"$group": {"_id": "$difficulty", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}}
+    ]).to_list()
+    hardcore = await ServersProperties.find({"hardcore": True}).count()
+    online_mode = await ServersProperties.find({"online_mode": True}).count()
+    flight = await ServersProperties.find({"allow_flight": True}).count()
+    return total, by_gamemode, by_difficulty, hardcore, online_mode, flight
+
+
+async def summary_facet():
+    return await (
+        SummaryBuilder(ServersProperties)
+        .count("total")
+        .group_count("by_gamemode", "gamemode")
+        .group_count("by_difficulty", "difficulty")
+        .count("hardcore", {"hardcore": True})
+        .count("online_mode", {"online_mode": True})
+        .count("allow_flight", {"allow_flight": True})
+        .run()
+    )
+
+
+async def populate(documents: int):
+    collection = ServersProperties.get_pymongo_collection()
+    await collection.delete_many({})
+    batch = []
+    for i in range(documents):
+        batch.append({
+            "level_name": f"world_{i}",
+            "gamemode": random.choice(["survival", "creative", "adventure", "spectator"]),
+            "difficulty": random.choice(["peaceful", "easy", "normal", "hard"]),
+            "hardcore": random.random() < 0.1,
+            "online_mode": random.random() < 0.8,
+            "allow_flight": random.random() < 0.3,
+            "max_players": random.choice([10, 20, 50, 100]),
+        })
+        if len(batch) == 10000:
+            await collection.insert_many(batch)
+            batch = []
+    if batch:
+        await collection.insert_many(batch)
+
+
+async def measure(func, repetitions: int) -> float:
+    await func()  # aquecimento
+    timings = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+async def main():
+    documents = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    client = AsyncMongoClient(os.getenv("MONGODB_URL"))
+    db = client[f"{os.getenv('DATABASE_NAME')}_bench"]
+    await init_beanie(database=db, document_models=[ServersProperties])
+
+    try:
+        print(f"Populando {documents} documentos...")
+        await populate(documents)
+
+        multi = await measure(summary_multi_query, repetitions)
+        facet = await measure(summary_facet, repetitions)
+        print(f"6 consultas: {multi * 1000:.1f} ms (mediana de {repetitions})")
+        print(f"$facet:      {facet * 1000:.1f} ms (mediana de {repetitions})")
+        print(f"Redução:     {(1 - facet / multi) * 100:.1f}%")
+    finally:
+        await client.drop_database(db.name)
+        await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
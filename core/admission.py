@@ -0,0 +1,131 @@
+import asyncio
+import math
+import time
+from fnmatch import fnmatchcase
+
+from fastapi import HTTPException, Request
+
+from core.config import settings
+
+# Custo relativo de cada rota (padrões fnmatch sobre o path, o primeiro que casar vale).
+# Rotas não listadas custam 1 e cada uma tem o seu balde, pelo template da rota.
+DEFAULT_ROUTE_COSTS = {
+    "/servers/complex/*": 100,
+    "/servers/with-operators/count": 50,
+    "/servers/aggregations/*": 50,
+    "/servers/stats/summary": 20,
+    "/operators/complex/*": 20,
+    "/*/aggregations/*": 40,
+    "/*/stats/*": 40,
+}
+
+MAX_BUCKETS = 10000
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, cost: float) -> float:
+        """Consome `cost` tokens. Retorna 0 se admitido ou os segundos até haver tokens suficientes."""
+        self._refill()
+        if cost > self.capacity:
+            cost = self.capacity
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def refund(self, cost: float):
+        self.tokens = min(self.capacity, self.tokens + cost)
+
+
+class AdmissionController:
+    """Controle de admissão por custo de rota.
+
+    Cada requisição consome tokens do balde do cliente e do balde da rota, de
+    acordo com o peso da rota. Rotas pesadas também disputam um número fixo de
+    vagas simultâneas. Requisições recusadas recebem 429 com Retry-After, de
+    forma que tráfego barato mantenha a latência sob pressão.
+
+    Roda como dependência global (`admit`), depois do roteamento, para que o
+    balde da rota seja o template casado (/servers/{server_id}) e não o path.
+    """
+
+    def __init__(self, route_costs: dict[str, int], max_heavy: int):
+        self.route_costs = list(route_costs.items())
+        self.heavy = asyncio.Semaphore(max_heavy)
+        self._client_buckets: dict[str, TokenBucket] = {}
+        self._route_buckets: dict[str, TokenBucket] = {}
+
+    def route_cost(self, path: str, template: str) -> tuple[str, int]:
+        """Retorna (chave do balde da rota, custo); o path concreto nunca vira chave.
+
+        Rotas listadas compartilham o balde do padrão; as demais usam o template
+        da rota casada, então uma rota barata muito usada não esgota as outras.
+        """
+        for pattern, cost in self.route_costs:
+            if fnmatchcase(path, pattern):
+                return pattern, cost
+        return template, 1
+
+    def _bucket(self, buckets: dict[str, TokenBucket], key: str, rate: float, burst: float) -> TokenBucket:
+        bucket = buckets.get(key)
+        if bucket is None:
+            if len(buckets) >= MAX_BUCKETS:
+                # Descarta os baldes mais antigos (clientes inativos)
+                for stale in list(buckets)[:MAX_BUCKETS // 10]:
+                    del buckets[stale]
+            bucket = buckets[key] = TokenBucket(rate, burst)
+        return bucket
+
+    def _reject(self, retry_after: float, reason: str) -> HTTPException:
+        return HTTPException(
+            status_code=429,
+            detail=f"Muitas requisições ({reason}), tente novamente mais tarde",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    async def admit(self, request: Request):
+        """Dependência global: admite a requisição ou levanta 429"""
+        route_key, cost = self.route_cost(request.url.path, request.scope["route"].path)
+        client = request.client.host if request.client else "unknown"
+
+        client_bucket = self._bucket(self._client_buckets, client, settings.admission_client_rate, settings.admission_client_burst)
+        wait = client_bucket.take(cost)
+        if wait:
+            raise self._reject(wait, "cliente")
+
+        route_bucket = self._bucket(self._route_buckets, route_key, settings.admission_route_rate, settings.admission_route_burst)
+        wait = route_bucket.take(cost)
+        if wait:
+            client_bucket.refund(cost)
+            raise self._reject(wait, "rota")
+
+        if cost < settings.admission_heavy_cost:
+            yield
+            return
+
+        if self.heavy.locked():
+            client_bucket.refund(cost)
+            route_bucket.refund(cost)
+            raise self._reject(1, "consultas pesadas em andamento")
+
+        async with self.heavy:
+            yield
+
+
+# Padrões configurados têm precedência sobre os padrões embutidos
+_route_costs = dict(settings.admission_route_costs)
+for _pattern, _cost in DEFAULT_ROUTE_COSTS.items():
+    _route_costs.setdefault(_pattern, _cost)
+
+admission = AdmissionController(_route_costs, settings.admission_max_heavy)
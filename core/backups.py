@@ -0,0 +1,344 @@
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import zstandard
+
+from core.config import settings
+from core.property_templates import effective_properties
+from core.supervisor import supervisor
+from models.backups import Backup, BackupFile
+from models.servers import Server
+
+logger = logging.getLogger(__name__)
+
+SECTOR = 4096
+REGION_HEADER = 2 * SECTOR  # tabela de localização + timestamps
+REGION_SUFFIXES = (".mca", ".mcr", ".mcc")
+
+# Primeiro byte de cada objeto no store indica o codec (zlib só em objetos
+# gravados por versões que não tinham o zstandard como dependência)
+CODEC_ZSTD = b"Z"
+CODEC_ZLIB = b"D"
+
+
+class BackupError(Exception):
+    pass
+
+
+def region_segments(data: bytes) -> list[tuple[int, int]]:
+    """Divide um arquivo de região nos setores de cada chunk do Minecraft.
+
+    Retorna (início, fim) cobrindo o arquivo inteiro: o cabeçalho, cada chunk
+    (offset e quantidade de setores de 4 KiB da tabela de localização) e os
+    intervalos livres entre eles. Um chunk alterado muda só o seu segmento.
+    """
+    if len(data) < REGION_HEADER or len(data) % SECTOR:
+        return fixed_segments(len(data))
+    spans = []
+    for index in range(1024):
+        (location,) = struct.unpack_from(">I", data, index * 4)
+        offset, count = location >> 8, location & 0xFF
+        if not location:
+            continue
+        start, end = offset * SECTOR, (offset + count) * SECTOR
+        if start < REGION_HEADER or end > len(data) or count == 0:
+            return fixed_segments(len(data))
+        spans.append((start, end))
+    spans.sort()
+
+    segments, position = [(0, REGION_HEADER)], REGION_HEADER
+    for start, end in spans:
+        if start < position:
+            return fixed_segments(len(data))  # setores sobrepostos: região corrompida
+        if start > position:
+            segments.append((position, start))
+        segments.append((start, end))
+        position = end
+    if position < len(data):
+        segments.append((position, len(data)))
+    return segments
+
+
+def fixed_segments(size: int) -> list[tuple[int, int]]:
+    block = settings.backup_block_size
+    return [(start, min(start + block, size)) for start in range(0, size, block)] or [(0, 0)]
+
+
+class ChunkStore:
+    """Store endereçado por conteúdo: objects/<2 primeiros hex>/<sha256>"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, digest: bytes) -> str:
+        name = digest.hex()
+        return os.path.join(self.root, "objects", name[:2], name)
+
+    def has(self, digest: bytes) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def put(self, digest: bytes, data: bytes) -> int:
+        """Grava o chunk se ainda não existir; retorna os bytes gravados.
+
+        Um chunk que já existe tem o mtime atualizado: o GC não apaga objetos
+        mais novos que o backup em andamento mais antigo.
+        """
+        path = self.path(digest)
+        try:
+            os.utime(path)
+            return 0
+        except FileNotFoundError:
+            pass
+        payload = CODEC_ZSTD + zstandard.ZstdCompressor(level=settings.backup_compression_level).compress(data)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        os.replace(temporary, path)
+        return len(payload)
+
+    def get(self, digest: bytes) -> bytes:
+        with open(self.path(digest), "rb") as f:
+            payload = f.read()
+        codec, body = payload[:1], payload[1:]
+        if codec == CODEC_ZSTD:
+            data = zstandard.ZstdDecompressor().decompress(body)
+        elif codec == CODEC_ZLIB:
+            data = zlib.decompress(body)
+        else:
+            raise BackupError(f"Codec desconhecido no chunk {digest.hex()}")
+        if hashlib.sha256(data).digest() != digest:
+            raise BackupError(f"Chunk corrompido: {digest.hex()}")
+        return data
+
+    def digests(self):
+        objects = os.path.join(self.root, "objects")
+        for directory, _, files in os.walk(objects):
+            for name in files:
+                if len(name) == 64:
+                    yield bytes.fromhex(name)
+
+    def delete(self, digest: bytes, older_than: float | None = None) -> bool:
+        """Remove o chunk; com `older_than`, só se o mtime for anterior a ele"""
+        path = self.path(digest)
+        try:
+            if older_than is not None and os.stat(path).st_mtime >= older_than:
+                return False
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+
+store = ChunkStore(settings.backup_dir)
+
+
+def _chunk_file(path: str) -> tuple[list[bytes], int, int]:
+    """Divide, grava os chunks novos e retorna (hashes, chunks novos, bytes gravados)"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(REGION_SUFFIXES):
+        segments = region_segments(data)
+    else:
+        segments = fixed_segments(len(data))
+    view = memoryview(data)
+    digests, new, stored = [], 0, 0
+    for start, end in segments:
+        chunk = view[start:end]
+        digest = hashlib.sha256(chunk).digest()
+        written = store.put(digest, chunk)
+        new += written > 0
+        stored += written
+        digests.append(digest)
+    return digests, new, stored
+
+
+def _walk(world: str):
+    for directory, _, files in os.walk(world):
+        for name in sorted(files):
+            if name == "session.lock":
+                continue
+            full = os.path.join(directory, name)
+            yield os.path.relpath(full, world), os.stat(full)
+
+
+async def world_path(server: Server) -> tuple[str, str]:
+    """Diretório do mundo do servidor e o level_name efetivo"""
+    properties = await effective_properties(server)
+    level_name = properties.level_name if properties else "world"
+    return os.path.join(supervisor.get(server.id).path, level_name), level_name
+
+
+async def _heartbeat(backup: Backup):
+    """Renova o lease do backup em andamento; sem ele o GC o considera interrompido"""
+    while True:
+        await asyncio.sleep(settings.backup_lease_seconds / 3)
+        await Backup.find_one(Backup.id == backup.id, Backup.status == "running").update(
+            {"$set": {"heartbeat_at": datetime.utcnow()}}
+        )
+
+
+async def create_backup(server_id, world: str, level_name: str, map_id=None) -> Backup:
+    """Backup incremental: arquivos com tamanho/mtime iguais aos do último backup
+    reutilizam o manifesto sem serem lidos; os demais são divididos e só os
+    chunks inéditos vão para o store."""
+    if not os.path.isdir(world):
+        raise BackupError(f"Mundo não encontrado em {world}")
+    parent = await Backup.find(
+        Backup.server_id == server_id, Backup.level_name == level_name, Backup.status == "completed"
+    ).sort("-created_at").first_or_none()
+    # Registrado antes de ler o manifesto base: delete_backup recusa apagar a
+    # base de um backup em andamento
+    backup = Backup(server_id=server_id, map_id=map_id, level_name=level_name, parent_id=parent.id if parent else None)
+    await backup.insert()
+    heartbeat = asyncio.create_task(_heartbeat(backup))
+    try:
+        previous = {}
+        if parent:
+            previous = {entry.path: entry async for entry in BackupFile.find(BackupFile.backup_id == parent.id)}
+        entries = await asyncio.to_thread(lambda: list(_walk(world)))
+        semaphore = asyncio.Semaphore(settings.backup_workers)
+
+        async def process(relative: str, stat: os.stat_result) -> BackupFile:
+            old = previous.get(relative)
+            if old and old.size == stat.st_size and old.mtime_ns == stat.st_mtime_ns:
+                chunks = old.chunks
+            else:
+                async with semaphore:
+                    chunks, new, stored = await asyncio.to_thread(_chunk_file, os.path.join(world, relative))
+                backup.new_bytes += stat.st_size
+                backup.new_chunks += new
+                backup.stored_bytes += stored
+            return BackupFile(
+                backup_id=backup.id,
+                path=relative,
+                size=stat.st_size,
+                mtime_ns=stat.st_mtime_ns,
+                mode=stat.st_mode & 0o777,
+                chunks=chunks,
+            )
+
+        files = await asyncio.gather(*(process(relative, stat) for relative, stat in entries))
+        for start in range(0, len(files), 500):
+            await BackupFile.insert_many(files[start:start + 500])
+        backup.files = len(files)
+        backup.total_bytes = sum(entry.size for entry in files)
+        backup.status = "completed"
+    except Exception as e:
+        backup.status = "failed"
+        backup.error = str(e)
+        raise
+    finally:
+        heartbeat.cancel()
+        await asyncio.gather(heartbeat, return_exceptions=True)
+        backup.finished_at = datetime.utcnow()
+        await backup.save()
+    logger.info(
+        f"Backup {backup.id}: {backup.files} arquivos, {backup.new_bytes}/{backup.total_bytes} bytes lidos, "
+        f"{backup.stored_bytes} bytes gravados"
+    )
+    return backup
+
+
+def _restore_file(entry: BackupFile, destination: str):
+    path = os.path.join(destination, entry.path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        for digest in entry.chunks:
+            f.write(store.get(digest))
+    os.chmod(path, entry.mode)
+    os.utime(path, ns=(entry.mtime_ns, entry.mtime_ns))
+
+
+async def restore_backup(backup: Backup, world: str) -> int:
+    """Restaura em paralelo para um diretório temporário e troca pelo mundo atual"""
+    if backup.status != "completed":
+        raise BackupError("Só backups concluídos podem ser restaurados")
+    entries = await BackupFile.find(BackupFile.backup_id == backup.id).to_list()
+    staging = f"{world}.restoring"
+    await asyncio.to_thread(shutil.rmtree, staging, True)
+    os.makedirs(staging)
+
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=settings.backup_workers) as executor:
+        await asyncio.gather(*(loop.run_in_executor(executor, _restore_file, entry, staging) for entry in entries))
+
+    def swap():
+        if os.path.exists(world):
+            old = f"{world}.old"
+            shutil.rmtree(old, ignore_errors=True)
+            os.replace(world, old)
+            os.replace(staging, world)
+            shutil.rmtree(old, ignore_errors=True)
+        else:
+            os.replace(staging, world)
+
+    await asyncio.to_thread(swap)
+    return len(entries)
+
+
+async def delete_backup(backup: Backup):
+    if await Backup.find(Backup.parent_id == backup.id, Backup.status == "running").count():
+        raise BackupError("Backup em uso como base de um backup em andamento")
+    await BackupFile.find(BackupFile.backup_id == backup.id).delete()
+    await backup.delete()
+    # Backups que usavam este como base continuam completos (manifestos são inteiros)
+    await Backup.find(Backup.parent_id == backup.id).update({"$set": {"parent_id": None}})
+
+
+async def expire_stale_backups() -> int:
+    """Marca como falhos os backups "running" sem heartbeat (processo morreu no meio)"""
+    deadline = datetime.utcnow() - timedelta(seconds=settings.backup_lease_seconds)
+    result = await Backup.find({
+        "status": "running",
+        "$or": [
+            {"heartbeat_at": {"$lt": deadline}},
+            {"heartbeat_at": {"$exists": False}, "created_at": {"$lt": deadline}},
+        ],
+    }).update({"$set": {
+        "status": "failed",
+        "error": "Backup interrompido (lease expirado)",
+        "finished_at": datetime.utcnow(),
+    }})
+    return result.modified_count if result else 0
+
+
+async def collect_garbage(dry_run: bool = True) -> dict:
+    """Mark-and-sweep: remove do store os chunks que nenhum manifesto referencia.
+
+    Backups em andamento ainda não gravaram o manifesto, mas tocam (put) todo
+    chunk que usam; por isso só são apagados objetos mais antigos que o início
+    do backup em andamento mais antigo (ou que o início do GC).
+    """
+    expired = await expire_stale_backups()
+    started = datetime.utcnow()
+    oldest = await Backup.find(Backup.status == "running").sort("created_at").first_or_none()
+    threshold = min(started, oldest.created_at) if oldest else started
+    threshold_ts = (threshold - datetime(1970, 1, 1)).total_seconds()
+
+    referenced = set()
+    async for entry in BackupFile.get_pymongo_collection().find({}, {"chunks": 1}):
+        referenced.update(entry["chunks"])
+    orphans = [digest for digest in await asyncio.to_thread(lambda: list(store.digests())) if digest not in referenced]
+    removed = 0
+    if not dry_run:
+        # O mtime é conferido no momento de apagar: um backup que começou
+        # durante a varredura e reutilizou o chunk o deixa mais novo que o limite
+        removed = sum(await asyncio.to_thread(
+            lambda: [store.delete(digest, older_than=threshold_ts) for digest in orphans]
+        ))
+    return {
+        "referenced_chunks": len(referenced),
+        "orphan_chunks": len(orphans),
+        "removed_chunks": removed,
+        "expired_backups": expired,
+        "dry_run": dry_run,
+    }
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from datetime import datetime
+
+from beanie import Document, PydanticObjectId
+from bson import Timestamp
+from pymongo.errors import OperationFailure, PyMongoError
+
+from core.config import settings
+from models.java_links import Java
+from models.minecraft_maps import MinecraftMap
+from models.softwares import Softwares
+
+logger = logging.getLogger(__name__)
+
+# Códigos retornados quando o mongod não suporta change streams (standalone)
+CHANGE_STREAM_UNSUPPORTED = {40573, 40324}
+
+# Teto da espera entre tentativas de reabrir o change stream (dobra a cada falha)
+MAX_RETRY_INTERVAL = 60.0
+
+
+class CatalogCache:
+    """Cache em memória dos catálogos de referência (Java, Softwares, Mapas).
+
+    Os documentos são carregados no startup e mantidos coerentes por change
+    streams, abertos a partir do cluster time anterior à carga para que
+    escritas feitas durante ela não se percam. Em um mongod standalone o cache
+    cai para polling em `updated_at`.
+    Os documentos retornados são compartilhados e devem ser tratados como
+    somente leitura.
+    """
+
+    def __init__(self, models: list[type[Document]], poll_interval: float):
+        self.models = models
+        self.poll_interval = poll_interval
+        self.loaded = False
+        self._entries: dict[type[Document], dict[PydanticObjectId, Document]] = {m: {} for m in models}
+        self._watermarks: dict[type[Document], datetime] = {}
+        # Cluster time lido antes da última carga de cada catálogo (None em standalone)
+        self._loaded_at: dict[type[Document], Timestamp | None] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self, background: bool = False):
+        """Carrega os catálogos. Em background o startup não espera a carga:
+        até lá `fetch` consulta o banco."""
+        if background:
+            self._tasks = [asyncio.create_task(self._start_logged())]
+            return
+        for model in self.models:
+            await self.load(model)
+        self.loaded = True
+        self._tasks += [asyncio.create_task(self._watch(model)) for model in self.models]
+
+    async def _start_logged(self):
+        try:
+            await self.start()
+        except PyMongoError as e:
+            logger.error(f"Falha ao carregar os catálogos, consultas irão ao banco: {e}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.loaded = False
+
+    async def load(self, model: type[Document]):
+        # O change stream começa neste instante: o que for escrito durante a carga é reaplicado
+        reply = await model.get_pymongo_collection().database.command("ping")
+        self._loaded_at[model] = reply.get("operationTime")
+        documents = await model.find_all().to_list()
+        self._entries[model] = {doc.id: doc for doc in documents}
+        self._watermarks[model] = max((doc.updated_at for doc in documents), default=datetime.min)
+        logger.info(f"Catálogo {model.__name__} carregado com {len(documents)} documentos")
+
+    # Leitura
+
+    def get(self, model: type[Document], document_id) -> Document | None:
+        return self._entries[model].get(PydanticObjectId(document_id))
+
+    async def fetch(self, model: type[Document], document_id) -> Document | None:
+        """Busca no cache, ou no banco se o cache ainda não foi carregado"""
+        if self.loaded:
+            return self.get(model, document_id)
+        return await model.get(document_id)
+
+    # Escrita (write-through para que o próprio processo leia o que escreveu)
+
+    def put(self, document: Document):
+        model = type(document)
+        self._entries[model][document.id] = document
+        if document.updated_at > self._watermarks.get(model, datetime.min):
+            self._watermarks[model] = document.updated_at
+
+    def discard(self, model: type[Document], document_id):
+        self._entries[model].pop(PydanticObjectId(document_id), None)
+
+    # Sincronização
+
+    async def _watch(self, model: type[Document]):
+        collection = model.get_pymongo_collection()
+        failures = 0
+        stale = False
+        while True:
+            try:
+                if stale:
+                    # Eventos podem ter sido perdidos durante a falha
+                    await self.load(model)
+                    stale = False
+                start_at = self._loaded_at.get(model)
+                async with await collection.watch(full_document="updateLookup", start_at_operation_time=start_at) as stream:
+                    logger.info(f"Catálogo {model.__name__} sincronizado por change stream")
+                    failures = 0
+                    async for change in stream:
+                        self._apply_change(model, change)
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAM_UNSUPPORTED:
+                    logger.info(f"Change streams indisponíveis, catálogo {model.__name__} usará polling")
+                    await self._poll(model)
+                    return
+                logger.warning(f"Change stream de {model.__name__} falhou: {e}")
+            except PyMongoError as e:
+                logger.warning(f"Change stream de {model.__name__} interrompido: {e}")
+            stale = True
+            failures += 1
+            await asyncio.sleep(min(self.poll_interval * 2 ** (failures - 1), MAX_RETRY_INTERVAL))
+
+    def _apply_change(self, model: type[Document], change: dict):
+        operation = change["operationType"]
+        if operation == "delete":
+            self.discard(model, change["documentKey"]["_id"])
+        elif operation in ("insert", "update", "replace") and change.get("fullDocument"):
+            self.put(model.model_validate(change["fullDocument"]))
+        elif operation in ("drop", "rename", "invalidate"):
+            self._entries[model] = {}
+
+    async def _poll(self, model: type[Document]):
+        collection = model.get_pymongo_collection()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                changed = await model.find({"updated_at": {"$gt": self._watermarks[model]}}).to_list()
+                for doc in changed:
+                    self.put(doc)
+                # updated_at não registra exclusões; catálogos pequenos permitem comparar os ids
+                current_ids = set(await collection.distinct("_id"))
+                for document_id in set(self._entries[model]) - current_ids:
+                    self.discard(model, document_id)
+            except PyMongoError as e:
+                logger.warning(f"Polling do catálogo {model.__name__} falhou: {e}")
+
+
+catalog_cache = CatalogCache([Java, Softwares, MinecraftMap], poll_interval=settings.catalog_poll_interval)
@@ -0,0 +1,170 @@
+import re
+
+from beanie.odm.utils.dump import get_dict
+
+from core.config import settings
+from models.servers_properties import (
+    PINNED_FIELDS,
+    PROPERTIES_DEFAULTS,
+    PROPERTIES_DEFAULTS_VERSION,
+    ServersProperties,
+)
+
+# Armazenamento compacto de ServersProperties: só os campos diferentes do padrão
+# da versão são gravados. A leitura materializa os padrões (ver
+# ServersProperties.materialize_defaults) e os filtros/agregações sobre campos
+# omitidos precisam passar por translate_filter/field_expr.
+
+COMPARISONS = {
+    "$eq": lambda value, target: value == target,
+    "$ne": lambda value, target: value != target,
+    "$gt": lambda value, target: value > target,
+    "$gte": lambda value, target: value >= target,
+    "$lt": lambda value, target: value < target,
+    "$lte": lambda value, target: value <= target,
+    "$in": lambda value, target: value in target,
+    "$nin": lambda value, target: value not in target,
+}
+
+
+def compact(properties: ServersProperties) -> dict:
+    """Documento a gravar, sem os campos iguais ao padrão da versão atual"""
+    document = get_dict(properties, to_db=True)
+    if document.get("_id") is None:
+        document.pop("_id", None)
+    defaults = PROPERTIES_DEFAULTS[PROPERTIES_DEFAULTS_VERSION]
+    document = {
+        key: value
+        for key, value in document.items()
+        if key in PINNED_FIELDS or key not in defaults or defaults[key] != value
+    }
+    document["defaults_version"] = PROPERTIES_DEFAULTS_VERSION
+    return document
+
+
+async def insert(properties: ServersProperties) -> ServersProperties:
+    if not settings.properties_compact_storage:
+        return await properties.insert()
+    properties.defaults_version = PROPERTIES_DEFAULTS_VERSION
+    result = await ServersProperties.get_pymongo_collection().insert_one(compact(properties))
+    properties.id = result.inserted_id
+    return properties
+
+
+async def replace(properties: ServersProperties) -> ServersProperties:
+    """Regrava o documento inteiro (campos que voltaram ao padrão são removidos)"""
+    if not settings.properties_compact_storage:
+        return await properties.save()
+    properties.defaults_version = PROPERTIES_DEFAULTS_VERSION
+    await ServersProperties.get_pymongo_collection().replace_one({"_id": properties.id}, compact(properties))
+    return properties
+
+
+def _matches_default(condition, default) -> bool:
+    """Avalia em Python se o valor padrão satisfaz a condição de um campo"""
+    if not isinstance(condition, dict):
+        return default == condition
+    for operator, target in condition.items():
+        if operator == "$options":
+            continue
+        if operator == "$regex":
+            flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+            if not isinstance(default, str) or not re.search(target, default, flags):
+                return False
+        elif operator == "$exists":
+            if not target:
+                return False
+        elif operator in COMPARISONS:
+            try:
+                if not COMPARISONS[operator](default, target):
+                    return False
+            except TypeError:
+                return False
+        else:
+            raise ValueError(f"Operador {operator} não suportado em campos compactados")
+    return True
+
+
+def _may_match_missing(condition) -> bool:
+    """Se a condição, no MongoDB, também casa documentos sem o campo"""
+    if not isinstance(condition, dict):
+        return condition is None
+    return any(
+        operator in ("$ne", "$nin", "$exists")
+        or (operator == "$eq" and target is None)
+        or (operator == "$in" and None in target)
+        for operator, target in condition.items()
+    )
+
+
+def _stored(key: str, condition) -> dict | None:
+    """Condição restrita aos documentos que gravaram o campo (None se nunca casa)"""
+    if not _may_match_missing(condition):
+        return {key: condition}
+    if not isinstance(condition, dict):
+        condition = {"$eq": condition}
+    if condition.get("$exists", True) is False:
+        return None
+    return {key: {**condition, "$exists": True}}
+
+
+def translate_filter(query: dict) -> dict:
+    """Traduz um filtro para considerar documentos que omitem campos com valor padrão.
+
+    Ex.: {"hardcore": False} também precisa casar documentos sem `hardcore` cuja
+    versão de padrões tem hardcore=False, e {"hardcore": {"$ne": False}} não pode
+    casar esses documentos só porque o campo falta.
+    """
+    translated = []
+    for key, condition in query.items():
+        if key in ("$and", "$or", "$nor"):
+            translated.append({key: [translate_filter(item) for item in condition]})
+            continue
+        has_default = any(key in defaults for defaults in PROPERTIES_DEFAULTS.values())
+        if key.startswith("$") or key in PINNED_FIELDS or not has_default:
+            translated.append({key: condition})
+            continue
+
+        versions = [
+            version
+            for version, defaults in PROPERTIES_DEFAULTS.items()
+            if key in defaults and _matches_default(condition, defaults[key])
+        ]
+        branches = [branch for branch in (
+            _stored(key, condition),
+            {key: {"$exists": False}, "defaults_version": {"$in": versions}} if versions else None,
+        ) if branch]
+        if not branches:
+            translated.append({key: {"$in": []}})  # nenhum documento tem o campo ausente de fato
+        elif len(branches) == 1:
+            translated.append(branches[0])
+        else:
+            translated.append({"$or": branches})
+
+    if len(translated) == 1:
+        return translated[0]
+    return {"$and": translated} if translated else {}
+
+
+def field_expr(field: str):
+    """Expressão de agregação com o valor efetivo de um campo (padrão quando omitido)"""
+    if field in PINNED_FIELDS:
+        return f"${field}"
+    defaults = {version: values[field] for version, values in PROPERTIES_DEFAULTS.items() if field in values}
+    if len(set(map(repr, defaults.values()))) <= 1:
+        default = next(iter(defaults.values()), None)
+        return {"$ifNull": [f"${field}", {"$literal": default}]}
+    return {"$ifNull": [f"${field}", {"$switch": {
+        "branches": [
+            {"case": {"$eq": ["$defaults_version", version]}, "then": {"$literal": value}}
+            for version, value in defaults.items()
+        ],
+        "default": None,
+    }}]}
+
+
+def materialize(document: dict | None) -> dict | None:
+    """Preenche os padrões em um documento bruto (ex.: resultado de $lookup)"""
+    if not document or "defaults_version" not in document:
+        return document
+    return {**PROPERTIES_DEFAULTS[document["defaults_version"]], **document}
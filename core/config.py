@@ -1,4 +1,5 @@
 from typing import Optional
+import socket
 from pydantic import BaseModel, field_validator
 from pydantic_settings import BaseSettings
 import os
@@ -10,6 +11,76 @@ class Settings(BaseSettings):
     mongodb_url: str = "mongodb://localhost:27017"
     database_name: str = "servidores_db"
     environment: str = "development"
+    catalog_poll_interval: float = 5.0  # segundos, usado quando não há change streams
+    servers_dir: str = "servers"
+    job_host: str = socket.gethostname()
+    job_concurrency: int = 2  # jobs simultâneos por host
+    admission_enabled: bool = True
+    admission_client_rate: float = 50.0  # tokens por segundo por cliente
+    admission_client_burst: float = 200.0
+    admission_route_rate: float = 500.0  # tokens por segundo por rota (todos os clientes)
+    admission_route_burst: float = 2000.0
+    admission_heavy_cost: int = 20  # custo a partir do qual a rota é considerada pesada
+    admission_max_heavy: int = 4  # agregações pesadas simultâneas
+    admission_route_costs: dict[str, int] = {}  # sobrescreve/adiciona padrões de custo
+    sort_unindexed_policy: str = "reject"  # reject (400) ou fallback (ordena por _id)
+    sort_auto_index: bool = False  # cria índices compostos (filtro, ordenação, _id) sob demanda
+    summary_sample_size: int = 10000  # documentos amostrados pelos resumos com approx=true
+    index_advisor_enabled: bool = False  # registra os formatos de consulta para o index advisor
+    startup_create_indexes: bool = False  # índices são criados por `python manage.py migrate`
+    migration_batch_size: int = 1000
+    migration_pause_seconds: float = 0.1  # pausa entre lotes/índices das migrações
+    properties_compact_storage: bool = True  # omite campos com valor padrão em server_properties
+    properties_override_limit: int = 8  # acima disso o servidor ganha um template próprio
+    status_flush_interval: float = 1.0  # segundos entre gravações do buffer de status
+    status_flush_size: int = 1000  # grava antes do intervalo ao atingir esse número de servidores
+    rcon_host: str = "127.0.0.1"  # usado quando o servidor não tem ip_address
+    rcon_timeout: float = 5.0
+    rcon_pool_size: int = 2  # conexões por servidor
+    rcon_pipeline_depth: int = 16  # comandos simultâneos por conexão
+    rcon_fanout: int = 32  # servidores atendidos ao mesmo tempo no broadcast
+    slp_enabled: bool = False  # roda o poller de status na API (ou use `python -m core.status_poller`)
+    slp_interval: float = 60.0  # segundos entre consultas de um servidor online
+    slp_max_interval: float = 600.0  # teto do intervalo para servidores offline
+    slp_jitter: float = 0.1
+    slp_concurrency: int = 500
+    slp_timeout: float = 3.0
+    slp_refresh_interval: float = 60.0  # recarga da lista de servidores
+    slp_latency_delta_ms: int = 20  # variação mínima de latência que gera escrita
+    hibernation_enabled: bool = False  # hiberna servidores vazios (pause_when_empty_seconds > 0)
+    hibernation_check_interval: float = 30.0
+    hibernation_bind_host: str = "0.0.0.0"
+    hibernation_wake_message: str = "Servidor iniciando, conecte novamente em alguns segundos"
+    placement_auto_assign: bool = False  # aloca node/porta ao criar servidores sem ip_address
+    placement_player_cap: int = 200  # jogadores considerados na estimativa de footprint
+    placement_base_memory_mb: int = 768
+    placement_base_cpu: float = 0.5
+    placement_cpu_overcommit: float = 1.5  # CPU é compartilhável; memória não tem overcommit
+    java_dir: str = "/opt/java"  # instalações em <java_dir>/<versão principal>/bin/java
+    java_installations: dict[str, str] = {}  # versão principal -> binário, tem precedência sobre java_dir
+    launch_heap_ratio: float = 0.85  # fração da memória do servidor usada como heap
+    launch_min_heap_mb: int = 1024
+    launch_zgc_min_heap_mb: int = 12288  # a partir daqui usa ZGC (Java 21+)
+    launch_ready_timeout: float = 300.0  # segundos esperando o servidor responder após o start
+    runtime_cache_dir: str = "runtimes"  # JDKs baixados dos documentos Java
+    runtime_auto_install: bool = True  # o start instala o runtime do java_id se faltar
+    runtime_download_timeout: float = 60.0
+    backup_dir: str = "backups"  # store de chunks endereçado por sha256
+    backup_compression_level: int = 3  # nível do zstd
+    backup_block_size: int = 1024 * 1024  # blocos dos arquivos que não são regiões
+    backup_workers: int = 8  # arquivos processados/restaurados em paralelo
+    backup_lease_seconds: int = 120  # backup "running" sem heartbeat há mais que isso é considerado interrompido
+    maps_dir: str = "maps"  # mundos importados, instalados nos servidores por hardlink
+    map_upload_max_bytes: int = 2 * 1024**3
+    map_extract_max_bytes: int = 8 * 1024**3  # limites contra zip bombs
+    map_extract_max_files: int = 200_000
+    map_extract_max_ratio: float = 200.0
+    map_analysis_workers: int = os.cpu_count() or 2  # processos analisando regiões em paralelo
+    map_analysis_sample_every: int = 8  # descomprime 1 a cada N chunks para estimar a compressão
+    metrics_enabled: bool = True  # amostra CPU/memória/IO dos servidores via /proc
+    metrics_interval: float = 10.0
+    metrics_flush_interval: float = 60.0
+    metrics_flush_size: int = 5000  # amostras no buffer antes de um flush antecipado
     
     @field_validator("mongodb_url")
     @classmethod
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import logging
+import time
+
+from beanie import PydanticObjectId
+from pymongo.errors import PyMongoError
+
+from core import slp
+from core.config import settings
+from core.jobs import job_queue
+from core.property_templates import effective_properties
+from core.supervisor import supervisor
+from models.servers import Server
+from models.servers_properties import ServersProperties
+
+logger = logging.getLogger(__name__)
+
+HANDSHAKE_TIMEOUT = 5.0
+
+
+class HibernationProxy:
+    """Listener leve na porta de um servidor hibernado.
+
+    Responde aos pings da lista de servidores com os dados em cache (MOTD,
+    capacidade, versão) e, quando um jogador tenta entrar, desconecta-o com
+    um aviso e acorda o servidor real.
+    """
+
+    def __init__(self, server_id: PydanticObjectId, port: int, motd: str, max_players: int, version: str | None):
+        self.server_id = server_id
+        self.port = port
+        self.motd = motd
+        self.max_players = max_players
+        self.version = version
+        self.hibernated_at = time.time()
+        self._listener: asyncio.Server | None = None
+
+    async def open(self):
+        self._listener = await asyncio.start_server(self._handle, settings.hibernation_bind_host, self.port)
+
+    async def close(self):
+        if self._listener:
+            self._listener.close()
+            await self._listener.wait_closed()
+            self._listener = None
+
+    def status(self, protocol: int) -> dict:
+        return {
+            # Repete o protocolo do cliente para o servidor aparecer como compatível
+            "version": {"name": self.version or "Hibernando", "protocol": protocol},
+            "players": {"max": self.max_players, "online": 0, "sample": []},
+            "description": {"text": self.motd},
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            await asyncio.wait_for(self._converse(reader, writer), HANDSHAKE_TIMEOUT)
+        except (slp.SlpError, asyncio.IncompleteReadError, TimeoutError, ConnectionError, IndexError, UnicodeDecodeError):
+            pass
+        finally:
+            writer.close()
+
+    async def _converse(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        packet_id, payload = await slp.read_packet(reader)
+        if packet_id != 0x00:
+            return
+        protocol, position = slp.unpack_varint(payload)
+        _, position = slp.unpack_string(payload, position)
+        next_state, _ = slp.unpack_varint(payload, position + 2)
+
+        if next_state == 1:
+            await slp.read_packet(reader)  # status request
+            writer.write(slp.pack_packet(0x00, slp.pack_string(json.dumps(self.status(protocol)))))
+            await writer.drain()
+            packet_id, payload = await slp.read_packet(reader)
+            if packet_id == 0x01:
+                writer.write(slp.pack_packet(0x01, payload))
+                await writer.drain()
+        else:
+            # Login: o cliente recebe a mensagem e o servidor começa a subir
+            message = json.dumps({"text": settings.hibernation_wake_message})
+            writer.write(slp.pack_packet(0x00, slp.pack_string(message)))
+            await writer.drain()
+            await hibernation.wake(self.server_id)
+
+
+class HibernationController:
+    """Hiberna servidores vazios e os acorda na primeira tentativa de login.
+
+    Um servidor rodando neste processo sem jogadores por mais de
+    `pause_when_empty_seconds` (das propriedades efetivas; <= 0 desativa) é
+    parado por um job `hibernate`, que deixa um HibernationProxy na porta.
+    """
+
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self._proxies: dict[str, HibernationProxy] = {}
+        self._empty_since: dict[str, float] = {}
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        await self.restore()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        proxies, self._proxies = self._proxies, {}
+        await asyncio.gather(*(proxy.close() for proxy in proxies.values()), return_exceptions=True)
+
+    def is_hibernating(self, server_id) -> bool:
+        return str(server_id) in self._proxies
+
+    async def restore(self):
+        """Reabre os proxies dos servidores que estavam hibernados (ex.: após um restart)"""
+        for server in await Server.find(Server.status == "hibernating").to_list():
+            properties = await effective_properties(server)
+            if properties:
+                await self.open_proxy(server.id, properties)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self.check()
+            except PyMongoError as e:
+                logger.error(f"Falha na verificação de hibernação: {e}")
+
+    async def check(self):
+        now = time.monotonic()
+        running = supervisor.running()
+        for key in set(self._empty_since) - set(running):
+            self._empty_since.pop(key)
+
+        for key in running:
+            server = await Server.get(key)
+            properties = await effective_properties(server) if server else None
+            if not properties or properties.pause_when_empty_seconds <= 0:
+                continue
+            try:
+                result = await slp.ping("127.0.0.1", properties.server_port, settings.slp_timeout)
+            except (slp.SlpError, OSError, TimeoutError):
+                continue  # subindo ou travado: não conta como vazio
+            if result["players_online"]:
+                self._empty_since.pop(key, None)
+                continue
+
+            empty_since = self._empty_since.setdefault(key, now)
+            if now - empty_since >= properties.pause_when_empty_seconds:
+                self._empty_since.pop(key)
+                logger.info(f"Servidor {key} vazio há {now - empty_since:.0f}s, hibernando")
+                await job_queue.submit(
+                    "hibernate",
+                    server_id=server.id,
+                    params={"version": result["version"]},
+                    idempotency_key=f"hibernate:{key}:{empty_since}",
+                )
+
+    async def open_proxy(self, server_id, properties: ServersProperties, version: str | None = None):
+        key = str(server_id)
+        if key in self._proxies:
+            return
+        proxy = HibernationProxy(PydanticObjectId(server_id), properties.server_port, properties.motd, properties.max_players, version)
+        try:
+            await proxy.open()
+        except OSError as e:
+            logger.error(f"Não foi possível abrir o proxy de hibernação na porta {proxy.port}: {e}")
+            return
+        self._proxies[key] = proxy
+
+    async def close_proxy(self, server_id):
+        """Libera a porta para o servidor real (chamado pelo job de start)"""
+        proxy = self._proxies.pop(str(server_id), None)
+        if proxy:
+            await proxy.close()
+
+    async def wake(self, server_id):
+        proxy = self._proxies.get(str(server_id))
+        if not proxy:
+            return
+        logger.info(f"Login no servidor hibernado {server_id}, iniciando")
+        await job_queue.submit(
+            "start",
+            server_id=proxy.server_id,
+            idempotency_key=f"wake:{server_id}:{proxy.hibernated_at}",
+        )
+
+
+hibernation = HibernationController(settings.hibernation_check_interval)
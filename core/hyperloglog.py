@@ -0,0 +1,42 @@
+import hashlib
+import math
+
+# 2^12 registradores: erro padrão relativo de 1.04 / sqrt(4096) ≈ 1.6%.
+# Em ~95% dos casos a estimativa fica dentro de ±3.25% do valor exato.
+PRECISION = 12
+REGISTERS = 1 << PRECISION
+STANDARD_ERROR = 1.04 / math.sqrt(REGISTERS)
+
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+
+
+def _hash64(value) -> int:
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+
+
+def register_for(value) -> tuple[int, int]:
+    """Retorna (índice do registrador, posição do primeiro bit 1) para um valor"""
+    hashed = _hash64(value)
+    index = hashed >> (64 - PRECISION)
+    remaining = hashed & ((1 << (64 - PRECISION)) - 1)
+    rank = (64 - PRECISION) - remaining.bit_length() + 1
+    return index, rank
+
+
+def estimate(registers: list[int]) -> int:
+    """Estimativa de cardinalidade HyperLogLog com correção para cardinalidades pequenas"""
+    raw = _ALPHA * REGISTERS * REGISTERS / sum(2.0 ** -register for register in registers)
+    zeros = registers.count(0)
+    if raw <= 2.5 * REGISTERS and zeros:
+        # Linear counting: mais preciso enquanto há muitos registradores vazios
+        return round(REGISTERS * math.log(REGISTERS / zeros))
+    return round(raw)
+
+
+def build(values) -> list[int]:
+    registers = [0] * REGISTERS
+    for value in values:
+        index, rank = register_for(value)
+        if rank > registers[index]:
+            registers[index] = rank
+    return registers
@@ -0,0 +1,197 @@
+import logging
+from collections import Counter
+from typing import NamedTuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte", "$ne", "$nin", "$regex", "$exists"}
+
+# Chave de índice como no pymongo: (campo, direção)
+IndexKey = tuple[str, int | str]
+
+
+class QueryShape(NamedTuple):
+    collection: str
+    equality: tuple[str, ...]
+    sort: tuple[tuple[str, int], ...]  # (campo, 1 ou -1)
+    range: tuple[str, ...]
+    source: str  # find, aggregate, count, distinct ou lookup
+
+    def candidate_keys(self) -> list[IndexKey]:
+        """Chaves de índice na ordem ESR (igualdade, ordenação, intervalo).
+
+        Os campos de ordenação mantêm a direção pedida: com mais de um campo,
+        {a: 1, b: -1} só é atendido por um índice (a: 1, b: -1) ou (a: -1, b: 1).
+        """
+        keys = [(field, 1) for field in self.equality]
+        fields = set(self.equality)
+        for field, direction in [*self.sort, *((field, 1) for field in self.range)]:
+            if field not in fields:
+                fields.add(field)
+                keys.append((field, direction))
+        return keys
+
+
+def _split_filter(query: dict | None) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    equality, ranges = set(), set()
+    for key, value in (query or {}).items():
+        if key.startswith("$"):
+            # $or/$and/$expr não são decompostos: o planner precisa de um índice por ramo
+            continue
+        if isinstance(value, dict) and any(op in RANGE_OPERATORS for op in value):
+            ranges.add(key)
+        else:
+            equality.add(key)
+    return tuple(sorted(equality)), tuple(sorted(ranges - equality))
+
+
+def _sort_keys(sort: dict | None) -> tuple[tuple[str, int], ...]:
+    # {"$meta": "textScore"} e afins não são ordenações por índice
+    return tuple(
+        (key, -1 if direction < 0 else 1)
+        for key, direction in (sort or {}).items()
+        if not key.startswith("$") and isinstance(direction, (int, float))
+    )
+
+
+def shapes_from_command(command_name: str, command: dict) -> list[QueryShape]:
+    collection = command.get(command_name)
+    if not isinstance(collection, str):
+        return []
+
+    if command_name == "find":
+        equality, ranges = _split_filter(command.get("filter"))
+        return [QueryShape(collection, equality, _sort_keys(command.get("sort")), ranges, "find")]
+
+    if command_name == "count":
+        equality, ranges = _split_filter(command.get("query"))
+        return [QueryShape(collection, equality, (), ranges, "count")]
+
+    if command_name == "distinct":
+        equality, ranges = _split_filter(command.get("query"))
+        return [QueryShape(collection, equality, (), ranges, "distinct")]
+
+    if command_name != "aggregate":
+        return []
+
+    shapes = []
+    pipeline = command.get("pipeline", [])
+    # Só o $match/$sort inicial pode usar índice da coleção de origem
+    if pipeline and "$match" in pipeline[0]:
+        equality, ranges = _split_filter(pipeline[0]["$match"])
+        sort = _sort_keys(pipeline[1].get("$sort")) if len(pipeline) > 1 else ()
+        shapes.append(QueryShape(collection, equality, sort, ranges, "aggregate"))
+    elif pipeline and "$sort" in pipeline[0]:
+        shapes.append(QueryShape(collection, (), _sort_keys(pipeline[0]["$sort"]), (), "aggregate"))
+
+    def lookups(stages):
+        for stage in stages:
+            if "$lookup" in stage:
+                lookup = stage["$lookup"]
+                if "foreignField" in lookup and lookup["foreignField"] != "_id":
+                    shapes.append(QueryShape(lookup["from"], (lookup["foreignField"],), (), (), "lookup"))
+            if "$facet" in stage:
+                for sub_pipeline in stage["$facet"].values():
+                    lookups(sub_pipeline)
+
+    lookups(pipeline)
+    return shapes
+
+
+class QueryShapeRecorder(monitoring.CommandListener):
+    """Listener do pymongo que registra os formatos de consulta emitidos pelas rotas"""
+
+    def __init__(self):
+        self.shapes: Counter[QueryShape] = Counter()
+
+    def started(self, event):
+        try:
+            for shape in shapes_from_command(event.command_name, event.command):
+                self.shapes[shape] += 1
+        except Exception:
+            logger.debug("Não foi possível registrar o comando", exc_info=True)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def reset(self):
+        self.shapes.clear()
+
+
+def is_covered(index: list[IndexKey], shape: QueryShape) -> bool:
+    """O índice atende o formato se começa pelos campos de igualdade (em qualquer ordem)
+    e segue com os campos de ordenação na direção pedida (ou toda invertida), ou,
+    sem ordenação, com o primeiro campo de intervalo"""
+    equality = set(shape.equality)
+    if {field for field, _ in index[:len(equality)]} != equality:
+        return False
+    rest = [key for key in shape.candidate_keys() if key[0] not in equality]
+    if not rest:
+        return True
+    sort = [key for key in shape.sort if key[0] not in equality]
+    if not sort:
+        return len(index) > len(equality) and index[len(equality)][0] == rest[0][0]
+    keys = index[len(equality):len(equality) + len(sort)]
+    if [field for field, _ in keys] != [field for field, _ in sort]:
+        return False
+    directions, wanted = [direction for _, direction in keys], [direction for _, direction in sort]
+    return directions == wanted or directions == [-direction for direction in wanted]
+
+
+async def advise(database, recorder: QueryShapeRecorder) -> dict:
+    """Compara os formatos registrados com os índices existentes e seu uso ($indexStats)"""
+    report = {}
+    by_collection: dict[str, list[tuple[QueryShape, int]]] = {}
+    for shape, count in recorder.shapes.items():
+        if shape.candidate_keys():
+            by_collection.setdefault(shape.collection, []).append((shape, count))
+
+    for collection_name in sorted(set(by_collection) | set(await database.list_collection_names())):
+        collection = database[collection_name]
+        info = await collection.index_information()
+        indexes = {name: [tuple(key) for key in index["key"]] for name, index in info.items()}
+        usage = {
+            stats["name"]: stats["accesses"]["ops"]
+            async for stats in await collection.aggregate([{"$indexStats": {}}])
+        }
+
+        recommended: dict[tuple[str, ...], dict] = {}
+        for shape, count in by_collection.get(collection_name, []):
+            if any(is_covered(index, shape) for index in indexes.values()):
+                continue
+            keys = tuple(shape.candidate_keys())
+            entry = recommended.setdefault(keys, {"keys": list(keys), "queries": 0, "sources": set()})
+            entry["queries"] += count
+            entry["sources"].add(shape.source)
+
+        report[collection_name] = {
+            "existing": [
+                {"name": name, "keys": keys, "ops": usage.get(name, 0)}
+                for name, keys in indexes.items()
+            ],
+            "recommended": [
+                {**entry, "sources": sorted(entry["sources"])}
+                for entry in sorted(recommended.values(), key=lambda item: -item["queries"])
+            ],
+            "unused": [name for name in indexes if name != "_id_" and usage.get(name, 0) == 0],
+        }
+    return report
+
+
+async def apply_recommendations(database, report: dict) -> list[dict]:
+    created = []
+    for collection_name, entry in report.items():
+        for recommendation in entry["recommended"]:
+            keys = [(field, direction) for field, direction in recommendation["keys"]]
+            name = await database[collection_name].create_index(keys)
+            created.append({"collection": collection_name, "index": name})
+            logger.info(f"Índice {name} criado em {collection_name}")
+    return created
+
+
+query_recorder = QueryShapeRecorder()
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from datetime import datetime
+
+from beanie import PydanticObjectId
+from pymongo.errors import DuplicateKeyError
+
+from core.config import settings
+from models.jobs import Job
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """Fila de jobs assíncrona em processo, persistida na coleção `jobs`.
+
+    Cada host executa no máximo `concurrency` jobs ao mesmo tempo e nunca dois
+    jobs do mesmo servidor simultaneamente. Jobs interrompidos por um restart
+    voltam para a fila no próximo startup.
+    """
+
+    def __init__(self, host: str, concurrency: int):
+        self.host = host
+        self.concurrency = concurrency
+        self.handlers = {}
+        self._queue: asyncio.Queue[PydanticObjectId] = asyncio.Queue()
+        self._server_locks: dict[PydanticObjectId, asyncio.Lock] = {}
+        self._workers: list[asyncio.Task] = []
+
+    def handler(self, job_type: str):
+        """Decorator que registra a função executada para um tipo de job"""
+        def decorator(func):
+            self.handlers[job_type] = func
+            return func
+        return decorator
+
+    async def start(self):
+        # Jobs que estavam rodando quando o processo caiu são reexecutados
+        await Job.find({"host": self.host, "status": "running"}).update({"$set": {"status": "queued"}})
+        pending = await Job.find({"host": self.host, "status": "queued"}).sort("created_at").to_list()
+        for job in pending:
+            self._queue.put_nowait(job.id)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, job_type: str, server_id=None, params: dict | None = None, idempotency_key: str | None = None) -> Job:
+        if job_type not in self.handlers:
+            raise ValueError(f"Tipo de job desconhecido: {job_type}")
+
+        if idempotency_key:
+            existing = await Job.find_one(Job.idempotency_key == idempotency_key)
+            if existing:
+                return existing
+
+        job = Job(
+            type=job_type,
+            server_id=server_id,
+            host=self.host,
+            params=params or {},
+            idempotency_key=idempotency_key,
+        )
+        try:
+            await job.insert()
+        except DuplicateKeyError:
+            # Requisição concorrente com a mesma chave venceu a corrida
+            return await Job.find_one(Job.idempotency_key == idempotency_key)
+
+        self._queue.put_nowait(job.id)
+        return job
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = await Job.get(job_id)
+                if job and job.status == "queued":
+                    await self._run(job)
+            except Exception:
+                logger.exception(f"Erro inesperado ao processar o job {job_id}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job):
+        lock = self._server_locks.setdefault(job.server_id, asyncio.Lock())
+        async with lock:
+            await job.set({
+                Job.status: "running",
+                Job.started_at: datetime.utcnow(),
+                Job.attempts: job.attempts + 1,
+            })
+            try:
+                result = await self.handlers[job.type](job)
+            except Exception as e:
+                logger.warning(f"Job {job.id} ({job.type}) falhou: {e}")
+                await job.set({Job.status: "failed", Job.error: str(e), Job.finished_at: datetime.utcnow()})
+            else:
+                await job.set({Job.status: "succeeded", Job.result: result or {}, Job.finished_at: datetime.utcnow()})
+
+
+job_queue = JobQueue(host=settings.job_host, concurrency=settings.job_concurrency)
@@ -0,0 +1,310 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import shutil
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from core import slp
+from core.catalog_cache import catalog_cache
+from core.config import settings
+from core.placement import estimate_footprint, software_factor
+from core.property_templates import effective_properties
+from core.runtimes import runtime_manager
+from pymongo import ReturnDocument
+from models.java_links import Java
+from models.launch_profiles import LaunchProfile, LaunchRecord
+from models.nodes import Node
+from models.servers import Server
+from models.softwares import Softwares
+
+logger = logging.getLogger(__name__)
+
+MAX_LAUNCH_RECORDS = 20
+
+# Flags do Aikar para G1 (https://docs.papermc.io/paper/aikars-flags); acima de
+# 12 GB de heap algumas proporções mudam
+G1_FLAGS = [
+    "-XX:+ParallelRefProcEnabled",
+    "-XX:MaxGCPauseMillis=200",
+    "-XX:+UnlockExperimentalVMOptions",
+    "-XX:+DisableExplicitGC",
+    "-XX:+AlwaysPreTouch",
+    "-XX:G1HeapWastePercent=5",
+    "-XX:G1MixedGCCountTarget=4",
+    "-XX:G1MixedGCLiveThresholdPercent=90",
+    "-XX:G1RSetUpdatingPauseTimePercent=5",
+    "-XX:SurvivorRatio=32",
+    "-XX:+PerfDisableSharedMem",
+    "-XX:MaxTenuringThreshold=1",
+]
+G1_SIZED_FLAGS = {
+    False: ["-XX:G1NewSizePercent=30", "-XX:G1MaxNewSizePercent=40", "-XX:G1HeapRegionSize=8M",
+            "-XX:G1ReservePercent=20", "-XX:InitiatingHeapOccupancyPercent=15"],
+    True: ["-XX:G1NewSizePercent=40", "-XX:G1MaxNewSizePercent=50", "-XX:G1HeapRegionSize=16M",
+           "-XX:G1ReservePercent=15", "-XX:InitiatingHeapOccupancyPercent=20"],
+}
+GC_FLAGS = {
+    "ZGC": ["-XX:+UseZGC", "-XX:+AlwaysPreTouch", "-XX:+DisableExplicitGC"],
+    "Shenandoah": ["-XX:+UseShenandoahGC", "-XX:+AlwaysPreTouch", "-XX:+DisableExplicitGC"],
+    "Parallel": ["-XX:+UseParallelGC"],
+    "Serial": ["-XX:+UseSerialGC"],
+}
+
+# extra_flags aceitos nos overrides. Opções que executam comandos ou carregam
+# código (-XX:OnError, -XX:OnOutOfMemoryError, -javaagent, -agentlib, -cp,
+# -Djava.*/-Dlog4j.*...) não casam com nenhum padrão.
+EXTRA_FLAG_PATTERNS = [re.compile(pattern) for pattern in (
+    r"-XX:[+-](AlwaysPreTouch|DisableExplicitGC|ParallelRefProcEnabled|PerfDisableSharedMem|UseStringDeduplication"
+    r"|UseLargePages|UseTransparentHugePages|UseNUMA|UnlockExperimentalVMOptions|ZGenerational)",
+    r"-XX:(MaxGCPauseMillis|G1NewSizePercent|G1MaxNewSizePercent|G1HeapRegionSize|G1ReservePercent|G1HeapWastePercent"
+    r"|G1MixedGCCountTarget|G1MixedGCLiveThresholdPercent|G1RSetUpdatingPauseTimePercent|InitiatingHeapOccupancyPercent"
+    r"|SurvivorRatio|MaxTenuringThreshold|ParallelGCThreads|ConcGCThreads|ReservedCodeCacheSize|MaxDirectMemorySize"
+    r"|MetaspaceSize|MaxMetaspaceSize|SoftMaxHeapSize)=\d+[kKmMgG]?",
+    r"-Xss\d+[kKmM]",
+    r"-D(paper|purpur|spigot|bukkit|aikars|using\.aikars|com\.mojang|terminal)\.[\w.-]+(=[\w.:/-]*)?",
+    r"-Dfile\.encoding=[\w-]+",
+    r"-DIReallyKnowWhatIAmDoingISwear(=true)?",
+)]
+
+
+def validate_extra_flags(flags: list[str]) -> list[str]:
+    rejected = [flag for flag in flags if not any(pattern.fullmatch(flag) for pattern in EXTRA_FLAG_PATTERNS)]
+    if rejected:
+        raise ValueError(f"Flags não permitidas: {', '.join(rejected)}")
+    return flags
+
+
+def allowed_java_paths() -> set[str]:
+    """Binários que podem ser escolhidos nos overrides: JAVA_INSTALLATIONS e o cache de runtimes"""
+    paths = set(settings.java_installations.values())
+    paths.update(os.path.join(runtime["directory"], runtime["java"]) for runtime in runtime_manager.installed())
+    return {os.path.realpath(path) for path in paths}
+
+
+def validate_java_path(path: str) -> str:
+    if os.path.realpath(path) not in allowed_java_paths():
+        raise ValueError("java_path deve ser um binário de JAVA_INSTALLATIONS ou do cache de runtimes")
+    return path
+
+
+def validate_overrides(overrides: dict) -> dict:
+    """Valida os overrides antes de gravar (ValueError se houver algo não permitido)"""
+    if overrides.get("java_path"):
+        validate_java_path(overrides["java_path"])
+    if overrides.get("extra_flags"):
+        validate_extra_flags(overrides["extra_flags"])
+    return overrides
+
+
+def _safe_overrides(server_id, overrides: dict) -> dict:
+    """Descarta overrides gravados que deixaram de ser permitidos (ex.: runtime removido)"""
+    try:
+        return validate_overrides(overrides)
+    except ValueError as e:
+        logger.warning(f"Overrides do perfil do servidor {server_id} ignorados: {e}")
+        return {key: value for key, value in overrides.items() if key not in ("java_path", "extra_flags")}
+
+
+@dataclass
+class LaunchSpec:
+    java_path: str
+    java_major: int | None
+    xms_mb: int
+    xmx_mb: int
+    gc: str
+    jvm_flags: list[str] = field(default_factory=list)
+
+    def command(self, jar: str = "server.jar") -> list[str]:
+        return [self.java_path, f"-Xms{self.xms_mb}M", f"-Xmx{self.xmx_mb}M", *self.jvm_flags, "-jar", jar, "nogui"]
+
+    @property
+    def flags_hash(self) -> str:
+        return hashlib.sha1(" ".join(self.command()).encode()).hexdigest()[:12]
+
+
+def java_major(version: str | None) -> int | None:
+    """"8", "8u401", "1.8.0_392", "17.0.10", "11.70.15" -> versão principal"""
+    match = re.match(r"(\d+)(?:\.(\d+))?", version or "")
+    if not match:
+        return None
+    major = int(match.group(1))
+    return int(match.group(2) or 0) if major == 1 else major
+
+
+def java_binary(major: int | None) -> str:
+    """Binário do Java da versão pedida: JAVA_INSTALLATIONS, depois JAVA_DIR/<major>/bin/java, depois o PATH"""
+    if major is not None:
+        configured = settings.java_installations.get(str(major))
+        if configured:
+            return configured
+        candidate = os.path.join(settings.java_dir, str(major), "bin", "java")
+        if os.path.exists(candidate):
+            return candidate
+        logger.warning(f"Java {major} não encontrado em {settings.java_dir}, usando o java do PATH")
+    return shutil.which("java") or "java"
+
+
+def host_memory_mb() -> int:
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return 4096
+
+
+def choose_gc(major: int | None, heap_mb: int) -> str:
+    if heap_mb <= 1024:
+        return "Serial"
+    # ZGC geracional (Java 21+) compensa em heaps grandes; abaixo disso G1 com as flags do Aikar
+    if major and major >= 21 and heap_mb >= settings.launch_zgc_min_heap_mb:
+        return "ZGC"
+    return "G1"
+
+
+def gc_flags(gc: str, heap_mb: int, major: int | None) -> list[str]:
+    if gc == "G1":
+        return ["-XX:+UseG1GC", *G1_FLAGS, *G1_SIZED_FLAGS[heap_mb > 12288]]
+    flags = list(GC_FLAGS[gc])
+    if gc == "ZGC" and major and 21 <= major < 23:
+        # Modo geracional: opcional no 21 e 22, padrão a partir do 23
+        flags.insert(1, "-XX:+ZGenerational")
+    return flags
+
+
+def compute(
+    max_players: int,
+    view_distance: int,
+    simulation_distance: int,
+    software: Softwares | None,
+    java: Java | None,
+    memory_limit_mb: int,
+    reserved_mb: int | None = None,
+    java_path: str | None = None,
+) -> LaunchSpec:
+    """Perfil automático: heap a partir da reserva do node (ou da estimativa de
+    footprint), limitado pela memória do host, e GC conforme heap e versão do Java"""
+    factor = software_factor(software.name, software.plugins_enabled, software.mods_enabled) if software else 1.0
+    footprint_mb = reserved_mb or estimate_footprint(max_players, view_distance, simulation_distance, factor).memory_mb
+    # A JVM usa memória além do heap (metaspace, threads, buffers)
+    heap_mb = int(min(footprint_mb, memory_limit_mb) * settings.launch_heap_ratio) // 256 * 256
+    heap_mb = max(heap_mb, settings.launch_min_heap_mb)
+
+    major = java_major(java.version) if java else None
+    gc = choose_gc(major, heap_mb)
+    flags = gc_flags(gc, heap_mb, major)
+    if software and any(fork in software.name.lower() for fork in ("paper", "purpur", "pufferfish")):
+        flags += ["-Dusing.aikars.flags=https://mcflags.emc.gs", "-Daikars.new.flags=true"]
+    return LaunchSpec(java_path or java_binary(major), major, heap_mb, heap_mb, gc, flags)
+
+
+def apply_overrides(spec: LaunchSpec, overrides: dict) -> LaunchSpec:
+    xmx_mb = overrides.get("xmx_mb") or spec.xmx_mb
+    xms_mb = min(overrides.get("xms_mb") or xmx_mb, xmx_mb)
+    gc = overrides.get("gc") or spec.gc
+    flags = spec.jvm_flags
+    if gc != spec.gc or xmx_mb != spec.xmx_mb:
+        # Troca só as flags de GC (-XX), mantendo as propriedades (-D)
+        flags = [*gc_flags(gc, xmx_mb, spec.java_major), *(flag for flag in flags if not flag.startswith("-XX:"))]
+    return LaunchSpec(
+        java_path=overrides.get("java_path") or spec.java_path,
+        java_major=spec.java_major,
+        xms_mb=xms_mb,
+        xmx_mb=xmx_mb,
+        gc=gc,
+        jvm_flags=[*flags, *overrides.get("extra_flags", [])],
+    )
+
+
+async def resolve(server: Server) -> tuple[LaunchSpec, LaunchProfile]:
+    """Calcula o perfil do servidor, aplica os overrides e grava o resultado"""
+    properties = await effective_properties(server)
+    if not properties:
+        raise ValueError("Propriedades do servidor não encontradas")
+    software = await catalog_cache.fetch(Softwares, server.software_id)
+    java = await catalog_cache.fetch(Java, server.java_id)
+    node = await Node.get(server.node_id) if server.node_id else None
+    memory_limit_mb = node.memory_mb if node else host_memory_mb()
+
+    spec = compute(
+        properties.max_players,
+        properties.view_distance,
+        properties.simulation_distance,
+        software,
+        java,
+        memory_limit_mb,
+        server.memory_reserved_mb,
+        # Runtime do cache compartilhado, se o documento Java já foi instalado
+        runtime_manager.path(java) if java else None,
+    )
+    profile = await LaunchProfile.find_one(LaunchProfile.server_id == server.id)
+    spec = apply_overrides(spec, _safe_overrides(server.id, profile.overrides) if profile else {})
+
+    # Só os campos calculados: um save() do documento inteiro sobrescreveria
+    # launches gravados em paralelo por record_launch
+    document = await LaunchProfile.get_pymongo_collection().find_one_and_update(
+        {"server_id": server.id},
+        {
+            "$set": {
+                "java_path": spec.java_path,
+                "java_major": spec.java_major,
+                "xms_mb": spec.xms_mb,
+                "xmx_mb": spec.xmx_mb,
+                "gc": spec.gc,
+                "jvm_flags": spec.jvm_flags,
+                "command": spec.command(),
+                "updated_at": datetime.utcnow(),
+            },
+            "$setOnInsert": {"overrides": {}, "launches": []},
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return spec, LaunchProfile.model_validate(document)
+
+
+async def record_launch(server_id, spec: LaunchSpec, started_at: datetime, ready_seconds: float | None):
+    record = LaunchRecord(
+        started_at=started_at,
+        ready_seconds=ready_seconds,
+        java_major=spec.java_major,
+        gc=spec.gc,
+        xmx_mb=spec.xmx_mb,
+        flags_hash=spec.flags_hash,
+    )
+    await LaunchProfile.find_one(LaunchProfile.server_id == server_id).update({
+        "$push": {"launches": {"$each": [record.model_dump()], "$slice": -MAX_LAUNCH_RECORDS}}
+    })
+
+
+async def measure_startup(server_id, spec: LaunchSpec, port: int, started: float, started_at: datetime):
+    """Espera o servidor responder ao Server List Ping e registra o tempo de startup"""
+    ready_seconds = None
+    deadline = started + settings.launch_ready_timeout
+    while time.monotonic() < deadline:
+        try:
+            await slp.ping("127.0.0.1", port, timeout=2.0)
+            ready_seconds = round(time.monotonic() - started, 2)
+            break
+        except (slp.SlpError, OSError, TimeoutError):
+            await asyncio.sleep(1.0)
+    await record_launch(server_id, spec, started_at, ready_seconds)
+    logger.info(f"Servidor {server_id} pronto em {ready_seconds}s ({spec.gc}, {spec.xmx_mb} MB)")
+
+
+async def startup_stats() -> list[dict]:
+    """Tempo médio de startup por combinação de perfil (GC, Java, heap)"""
+    return await LaunchProfile.aggregate([
+        {"$unwind": "$launches"},
+        {"$group": {
+            "_id": {"gc": "$launches.gc", "java_major": "$launches.java_major", "xmx_mb": "$launches.xmx_mb"},
+            "launches": {"$sum": 1},
+            "failed": {"$sum": {"$cond": [{"$eq": ["$launches.ready_seconds", None]}, 1, 0]}},
+            "avg_ready_seconds": {"$avg": "$launches.ready_seconds"},
+            "min_ready_seconds": {"$min": "$launches.ready_seconds"},
+            "max_ready_seconds": {"$max": "$launches.ready_seconds"},
+        }},
+        {"$sort": {"avg_ready_seconds": 1}},
+    ]).to_list()
@@ -0,0 +1,262 @@
+import asyncio
+import fnmatch
+import hashlib
+import logging
+import os
+import shutil
+import stat
+import tarfile
+import tempfile
+import zipfile
+from collections.abc import AsyncIterator
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+WRITE_BUFFER = 1 << 20
+
+# Só viram hardlink os arquivos que o servidor substitui por arquivo novo +
+# rename (ou apenas lê): gravar no lugar um arquivo com hardlink alteraria o
+# mapa da biblioteca e os outros servidores que o instalaram. Todo o resto
+# (regiões, session.lock, uid.dat, stats/, advancements/, data/...) é copiado,
+# com reflink quando o sistema de arquivos suporta.
+LINK_PATTERNS = ("level.dat", "level.dat_old", "playerdata/*.dat", "datapacks/*", "icon.png")
+
+FICLONE = 0x40049409  # ioctl de reflink (Btrfs, XFS, ...)
+
+
+class MapImportError(Exception):
+    pass
+
+
+class MapTooLargeError(MapImportError):
+    pass
+
+
+def map_directory(map_id) -> str:
+    return os.path.join(settings.maps_dir, str(map_id))
+
+
+def _append(f, digest, data: bytes):
+    digest.update(data)
+    f.write(data)
+
+
+async def receive(chunks: AsyncIterator[bytes]) -> tuple[str, str, int]:
+    """Grava o corpo da requisição em um arquivo temporário, calculando o sha256.
+
+    Os pedaços são agrupados em blocos de até 1 MiB e gravados em uma thread,
+    então a memória usada não depende do tamanho do upload.
+    Retorna (caminho, sha256, bytes).
+    """
+    directory = os.path.join(settings.maps_dir, ".uploads")
+    os.makedirs(directory, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=directory)
+    digest, size, buffer = hashlib.sha256(), 0, bytearray()
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > settings.map_upload_max_bytes:
+                    raise MapTooLargeError(f"Upload maior que {settings.map_upload_max_bytes} bytes")
+                buffer += chunk
+                if len(buffer) >= WRITE_BUFFER:
+                    data, buffer = bytes(buffer), bytearray()
+                    await asyncio.to_thread(_append, f, digest, data)
+            if buffer:
+                await asyncio.to_thread(_append, f, digest, bytes(buffer))
+    except BaseException:
+        os.remove(path)
+        raise
+    if not size:
+        os.remove(path)
+        raise MapImportError("Corpo da requisição vazio")
+    return path, digest.hexdigest(), size
+
+
+class _Limits:
+    """Contadores do limite de descompressão (proteção contra zip bombs)"""
+
+    def __init__(self, archive_size: int):
+        self.archive_size = max(archive_size, 1)
+        self.files = 0
+        self.bytes = 0
+
+    def file(self):
+        self.files += 1
+        if self.files > settings.map_extract_max_files:
+            raise MapImportError(f"Mais de {settings.map_extract_max_files} arquivos no pacote")
+
+    def add(self, count: int):
+        self.bytes += count
+        if self.bytes > settings.map_extract_max_bytes:
+            raise MapImportError(f"Conteúdo descompactado maior que {settings.map_extract_max_bytes} bytes")
+        if self.bytes > settings.map_extract_max_ratio * self.archive_size and self.bytes > WRITE_BUFFER:
+            raise MapImportError("Taxa de compressão suspeita no pacote")
+
+
+def _target(destination: str, name: str) -> str:
+    root = os.path.realpath(destination)
+    target = os.path.realpath(os.path.join(destination, name))
+    # "./" (tar -C mundo .) resolve para a própria raiz
+    if target != root and not target.startswith(root + os.sep):
+        raise MapImportError(f"Caminho inválido no pacote: {name}")
+    return target
+
+
+def _copy(source, target: str, limits: _Limits, declared: int | None = None):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    written = 0
+    with open(target, "wb") as f:
+        while data := source.read(WRITE_BUFFER):
+            written += len(data)
+            # O tamanho declarado no cabeçalho não é confiável: conta o que sai de fato
+            if declared is not None and written > declared:
+                raise MapImportError(f"Tamanho real maior que o declarado: {target}")
+            limits.add(len(data))
+            f.write(data)
+
+
+def _extract_zip(archive: str, destination: str, limits: _Limits):
+    with zipfile.ZipFile(archive) as zf:
+        for info in zf.infolist():
+            target = _target(destination, info.filename)
+            if info.is_dir():
+                os.makedirs(target, exist_ok=True)
+                continue
+            if stat.S_ISLNK(info.external_attr >> 16):
+                continue  # mapas não precisam de links simbólicos
+            limits.file()
+            if info.compress_size and info.file_size / info.compress_size > settings.map_extract_max_ratio:
+                raise MapImportError(f"Taxa de compressão suspeita: {info.filename}")
+            with zf.open(info) as source:
+                _copy(source, target, limits, info.file_size)
+
+
+def _extract_tar(archive: str, destination: str, limits: _Limits):
+    with tarfile.open(archive) as tf:
+        for member in tf:  # iteração lazy: não lê o índice inteiro antes
+            if member.issym() or member.islnk():
+                continue
+            try:
+                member = tarfile.data_filter(member, destination)
+            except tarfile.FilterError as e:
+                raise MapImportError(f"Entrada inválida no pacote: {e}")
+            target = _target(destination, member.name)
+            if member.isdir():
+                os.makedirs(target, exist_ok=True)
+            elif member.isfile():
+                limits.file()
+                with tf.extractfile(member) as source:
+                    _copy(source, target, limits, member.size)
+
+
+def extract(archive: str, destination: str) -> int:
+    """Extrai um .zip ou .tar(.gz/.bz2/.xz) com limites de arquivos, bytes e compressão"""
+    limits = _Limits(os.path.getsize(archive))
+    try:
+        if zipfile.is_zipfile(archive):
+            _extract_zip(archive, destination, limits)
+        elif tarfile.is_tarfile(archive):
+            _extract_tar(archive, destination, limits)
+        else:
+            raise MapImportError("O upload não é um arquivo .zip ou .tar")
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+        raise MapImportError(f"Pacote corrompido: {e}")
+    return limits.files
+
+
+def find_world(root: str) -> str:
+    """Diretório mais raso com level.dat (pacotes costumam ter uma pasta no topo)"""
+    for directory, dirs, files in os.walk(root):
+        dirs.sort()
+        if "level.dat" in files:
+            return directory
+    raise MapImportError("level.dat não encontrado no pacote")
+
+
+def measure(directory: str) -> tuple[int, int]:
+    """(arquivos, bytes) de um diretório"""
+    files = size = 0
+    for path, _, names in os.walk(directory):
+        for name in names:
+            files += 1
+            size += os.lstat(os.path.join(path, name)).st_size
+    return files, size
+
+
+def import_archive(archive: str, map_id) -> tuple[int, int]:
+    """Extrai o pacote e move o mundo para `<maps_dir>/<map_id>`; retorna (arquivos, bytes)"""
+    staging = tempfile.mkdtemp(prefix=".import-", dir=settings.maps_dir)
+    try:
+        extract(archive, staging)
+        world = find_world(staging)
+        destination = map_directory(map_id)
+        shutil.rmtree(destination, ignore_errors=True)
+        os.replace(world, destination)
+        return measure(destination)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def _linkable(relative: str) -> bool:
+    return any(fnmatch.fnmatchcase(relative, pattern) for pattern in LINK_PATTERNS)
+
+
+def _clone(path: str, target: str) -> bool:
+    """Cópia copy-on-write; False se o sistema de arquivos não suporta"""
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    with open(path, "rb") as source, open(target, "wb") as destination:
+        try:
+            fcntl.ioctl(destination.fileno(), FICLONE, source.fileno())
+        except OSError:
+            return False
+    shutil.copystat(path, target)
+    return True
+
+
+def install(map_id, world: str) -> dict:
+    """Instala o mapa no diretório do mundo de um servidor.
+
+    Arquivos em LINK_PATTERNS viram hardlinks para o mapa da biblioteca; os
+    demais são clonados por reflink ou copiados. O mundo anterior é
+    substituído só no final.
+    """
+    source = map_directory(map_id)
+    if not os.path.isdir(source):
+        raise MapImportError("Arquivos do mapa não encontrados, faça o upload novamente")
+    staging = f"{world}.installing"
+    shutil.rmtree(staging, ignore_errors=True)
+    linked = cloned = copied = 0
+    for directory, _, names in os.walk(source):
+        target_dir = os.path.join(staging, os.path.relpath(directory, source))
+        os.makedirs(target_dir, exist_ok=True)
+        for name in names:
+            path, target = os.path.join(directory, name), os.path.join(target_dir, name)
+            if _linkable(os.path.relpath(path, source).replace(os.sep, "/")):
+                try:
+                    os.link(path, target)
+                    linked += 1
+                    continue
+                except OSError:
+                    pass
+            if _clone(path, target):
+                cloned += 1
+            else:
+                shutil.copy2(path, target)
+                copied += 1
+
+    if os.path.exists(world):
+        old = f"{world}.old"
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(world, old)
+        os.replace(staging, world)
+        shutil.rmtree(old, ignore_errors=True)
+    else:
+        os.makedirs(os.path.dirname(world), exist_ok=True)
+        os.replace(staging, world)
+    return {"linked": linked, "cloned": cloned, "copied": copied}
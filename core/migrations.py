@@ -0,0 +1,159 @@
+import asyncio
+import importlib
+import logging
+import pkgutil
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from core.config import settings
+from models.migrations import MigrationRecord
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_PACKAGE = "migrations"
+
+
+class MigrationContext:
+    """Operações disponíveis para as migrações, com throttling e checkpoints.
+
+    O progresso de cada etapa é salvo no documento da migração, de forma que
+    uma execução interrompida continua de onde parou. As chaves do checkpoint
+    incluem a versão da migração, a coleção e os campos do filtro.
+    """
+
+    def __init__(self, record: MigrationRecord):
+        self.record = record
+
+    async def _save(self):
+        steps = [step for step in self.record.checkpoint.values() if isinstance(step, dict)]
+        self.record.processed = sum(step.get("processed", 0) for step in steps)
+        self.record.total = sum(step.get("total", 0) for step in steps)
+        await self.record.set({
+            MigrationRecord.checkpoint: self.record.checkpoint,
+            MigrationRecord.processed: self.record.processed,
+            MigrationRecord.total: self.record.total,
+        })
+
+    async def build_index(self, collection, index):
+        """Cria um índice (pymongo.IndexModel) se ainda não existir, um de cada vez"""
+        name = index.document["name"]
+        if name in await collection.index_information():
+            return False
+        logger.info(f"Criando índice {name} em {collection.name}...")
+        await collection.create_indexes([index])
+        # Pausa entre builds para não disputar I/O com o tráfego
+        await asyncio.sleep(settings.migration_pause_seconds)
+        return True
+
+    async def rewrite(self, collection, query: dict, transform, batch_size: int | None = None):
+        """Reescreve documentos em lotes ordenados por _id.
+
+        `transform(documento)` retorna o update ($set/$unset) a aplicar ou None.
+        """
+        batch_size = batch_size or settings.migration_batch_size
+        key = f"rewrite:{self.record.version}:{collection.name}:{sorted(query)}"
+        step = self.record.checkpoint.get(key, {})
+        if step.get("done"):
+            return
+
+        last_id = step.get("last_id")
+        processed = step.get("processed", 0)
+        total = processed + await collection.count_documents(
+            {**query, "_id": {"$gt": last_id}} if last_id else query
+        )
+        while True:
+            batch_query = {**query, "_id": {"$gt": last_id}} if last_id else query
+            batch = await collection.find(batch_query).sort("_id", 1).limit(batch_size).to_list()
+            if not batch:
+                break
+
+            operations = []
+            for document in batch:
+                update = transform(document)
+                if update:
+                    operations.append(UpdateOne({"_id": document["_id"]}, update))
+            if operations:
+                await collection.bulk_write(operations, ordered=False)
+
+            last_id = batch[-1]["_id"]
+            processed += len(batch)
+            self.record.checkpoint[key] = {"last_id": last_id, "processed": processed, "total": total}
+            await self._save()
+            logger.info(f"{collection.name}: {processed}/{total} documentos")
+            await asyncio.sleep(settings.migration_pause_seconds)
+
+        self.record.checkpoint[key] = {"done": True, "processed": processed, "total": total}
+        await self._save()
+
+    async def update_many(self, collection, query: dict, update: dict):
+        """Update em massa executado uma única vez (registrado no checkpoint)"""
+        key = f"update:{self.record.version}:{collection.name}:{sorted(query)}:{sorted(update)}"
+        if self.record.checkpoint.get(key):
+            return
+        result = await collection.update_many(query, update)
+        self.record.checkpoint[key] = {"done": True, "processed": result.modified_count, "total": result.modified_count}
+        await self._save()
+
+
+def discover() -> list:
+    package = importlib.import_module(MIGRATIONS_PACKAGE)
+    modules = [
+        importlib.import_module(f"{MIGRATIONS_PACKAGE}.{info.name}")
+        for info in pkgutil.iter_modules(package.__path__)
+        if info.name[:4].isdigit()
+    ]
+    return sorted(modules, key=lambda module: module.VERSION)
+
+
+async def run_migrations(target: int | None = None):
+    """Executa as migrações pendentes (ou interrompidas) até `target`"""
+    for module in discover():
+        if target is not None and module.VERSION > target:
+            break
+
+        record = await MigrationRecord.find_one(MigrationRecord.version == module.VERSION)
+        if record and record.status == "completed":
+            continue
+        if not record:
+            record = MigrationRecord(version=module.VERSION, name=module.NAME)
+            await record.insert()
+
+        logger.info(f"Migração {module.VERSION:04d}: {module.NAME}")
+        await record.set({
+            MigrationRecord.status: "running",
+            MigrationRecord.started_at: record.started_at or datetime.utcnow(),
+            MigrationRecord.error: None,
+        })
+        try:
+            await module.run(MigrationContext(record))
+        except BaseException as e:
+            await record.set({MigrationRecord.status: "failed", MigrationRecord.error: repr(e)})
+            raise
+        await record.set({MigrationRecord.status: "completed", MigrationRecord.finished_at: datetime.utcnow()})
+
+
+async def sync_indexes(models):
+    """Cria, um de cada vez, os índices declarados nos modelos que ainda não existem"""
+    context = MigrationContext(MigrationRecord(version=0, name="indexes"))
+    created = 0
+    for model in models:
+        collection = model.get_pymongo_collection()
+        for index in model.get_settings().indexes:
+            created += await context.build_index(collection, index.index)
+    logger.info(f"{created} índices criados")
+
+
+async def migration_status() -> list[dict]:
+    records = {record.version: record for record in await MigrationRecord.find_all().to_list()}
+    status = []
+    for module in discover():
+        record = records.get(module.VERSION)
+        status.append({
+            "version": module.VERSION,
+            "name": module.NAME,
+            "status": record.status if record else "pending",
+            "processed": record.processed if record else 0,
+            "total": record.total if record else 0,
+        })
+    return status
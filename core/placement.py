@@ -0,0 +1,486 @@
+import asyncio
+import logging
+import random
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from beanie import PydanticObjectId
+
+from core.catalog_cache import catalog_cache
+from core.config import settings
+from core.property_templates import effective_properties, patch_server_properties
+from models.nodes import Node
+from models.servers import Server
+from models.softwares import Softwares
+
+logger = logging.getLogger(__name__)
+
+# Servidores com esses status têm processo rodando e não são movidos pelo rebalance
+PINNED_STATUSES = {"online", "hibernating"}
+
+# Softwares otimizados (forks do Paper) gastam menos que o vanilla
+OPTIMIZED_SOFTWARES = ("paper", "purpur", "pufferfish", "airplane", "folia")
+
+CAS_ATTEMPTS = 5
+
+
+@dataclass(frozen=True)
+class Footprint:
+    cpu: float
+    memory_mb: int
+
+
+def software_factor(name: str = "", plugins_enabled: bool = False, mods_enabled: bool = False) -> float:
+    if mods_enabled:
+        return 1.8
+    if any(fork in name.lower() for fork in OPTIMIZED_SOFTWARES):
+        return 0.8
+    return 0.95 if plugins_enabled else 1.0
+
+
+def estimate_footprint(max_players: int, view_distance: int, simulation_distance: int, factor: float = 1.0) -> Footprint:
+    """Estimativa de CPU/RAM de um servidor cheio.
+
+    A memória cresce com os chunks carregados por jogador ((2*view+1)²) e a CPU
+    com os chunks que recebem tick ((2*simulation+1)²). A capacidade é
+    limitada por `placement_player_cap`, já que max_players costuma ser só um teto.
+    """
+    players = min(max_players, settings.placement_player_cap)
+    loaded_chunks = (2 * view_distance + 1) ** 2
+    ticking_chunks = (2 * simulation_distance + 1) ** 2
+    memory_mb = factor * (settings.placement_base_memory_mb + players * loaded_chunks * 0.05)
+    cpu = factor * (settings.placement_base_cpu + players * ticking_chunks * 0.00003)
+    return Footprint(cpu=round(cpu, 2), memory_mb=int(memory_mb))
+
+
+class PortBitmap:
+    """Bitmap das portas de um node: bit i = porta `start + i` em uso"""
+
+    def __init__(self, start: int, end: int, data: bytes = b""):
+        self.start = start
+        self.size = end - start + 1
+        length = (self.size + 7) // 8
+        self._bits = bytearray(data[:length].ljust(length, b"\x00"))
+
+    def __contains__(self, port: int) -> bool:
+        return 0 <= port - self.start < self.size
+
+    def is_set(self, port: int) -> bool:
+        index = port - self.start
+        return bool(self._bits[index >> 3] & (1 << (index & 7)))
+
+    def set(self, port: int):
+        index = port - self.start
+        if not 0 <= index < self.size:
+            raise ValueError(f"Porta {port} fora da faixa do node")
+        self._bits[index >> 3] |= 1 << (index & 7)
+
+    def clear(self, port: int):
+        index = port - self.start
+        if 0 <= index < self.size:
+            self._bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+    def allocate(self) -> int | None:
+        """Marca e retorna a primeira porta livre (pula bytes cheios)"""
+        for position, byte in enumerate(self._bits):
+            if byte == 0xFF:
+                continue
+            for bit in range(8):
+                index = position * 8 + bit
+                if index >= self.size:
+                    return None
+                if not byte & (1 << bit):
+                    self._bits[position] |= 1 << bit
+                    return self.start + index
+        return None
+
+    @property
+    def used(self) -> int:
+        return sum(bin(byte).count("1") for byte in self._bits)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self._bits)
+
+
+@dataclass
+class NodeState:
+    node_id: PydanticObjectId | str
+    name: str
+    address: str
+    cpu_cores: float
+    memory_mb: int
+    ports: PortBitmap
+    used_cpu: float = 0
+    used_memory_mb: int = 0
+
+    @classmethod
+    def from_node(cls, node: Node) -> "NodeState":
+        return cls(
+            node_id=node.id,
+            name=node.name,
+            address=node.address,
+            cpu_cores=node.cpu_cores,
+            memory_mb=node.memory_mb,
+            ports=PortBitmap(node.port_range_start, node.port_range_end, node.port_bitmap),
+            used_cpu=node.allocated_cpu,
+            used_memory_mb=node.allocated_memory_mb,
+        )
+
+    def empty_copy(self) -> "NodeState":
+        return NodeState(
+            self.node_id, self.name, self.address, self.cpu_cores, self.memory_mb,
+            PortBitmap(self.ports.start, self.ports.start + self.ports.size - 1),
+        )
+
+    def fits(self, footprint: Footprint) -> bool:
+        return (
+            self.used_cpu + footprint.cpu <= self.cpu_cores * settings.placement_cpu_overcommit
+            and self.used_memory_mb + footprint.memory_mb <= self.memory_mb
+            and self.ports.used < self.ports.size
+        )
+
+    def share_after(self, footprint: Footprint) -> float:
+        """Fração do recurso dominante ocupada depois de receber o servidor"""
+        return max(
+            (self.used_cpu + footprint.cpu) / (self.cpu_cores * settings.placement_cpu_overcommit),
+            (self.used_memory_mb + footprint.memory_mb) / self.memory_mb,
+        )
+
+    def reserve(self, footprint: Footprint, port: int | None = None) -> int:
+        if port is None:
+            port = self.ports.allocate()
+            if port is None:
+                raise PlacementError(f"Node {self.name} sem portas livres")
+        else:
+            self.ports.set(port)
+        self.used_cpu = round(self.used_cpu + footprint.cpu, 2)
+        self.used_memory_mb += footprint.memory_mb
+        return port
+
+    def release(self, footprint: Footprint, port: int | None):
+        if port is not None:
+            self.ports.clear(port)
+        self.used_cpu = max(round(self.used_cpu - footprint.cpu, 2), 0)
+        self.used_memory_mb = max(self.used_memory_mb - footprint.memory_mb, 0)
+
+    def utilization(self) -> dict:
+        return {
+            "node": self.name,
+            "cpu": f"{self.used_cpu:.1f}/{self.cpu_cores}",
+            "memory_mb": f"{self.used_memory_mb}/{self.memory_mb}",
+            "ports_used": self.ports.used,
+            "dominant_share": round(self.share_after(Footprint(0, 0)), 3),
+        }
+
+
+class PlacementError(Exception):
+    pass
+
+
+@dataclass
+class Assignment:
+    key: str
+    footprint: Footprint
+    node_id: PydanticObjectId | str | None = None
+    port: int | None = None
+    pinned: bool = False
+    moved: bool = field(default=False, compare=False)
+
+
+class PlacementState:
+    """Estado de capacidade dos nodes, usado tanto no modo real quanto na simulação"""
+
+    def __init__(self, nodes: list[NodeState]):
+        self.nodes = {str(node.node_id): node for node in nodes}
+
+    def choose(self, footprint: Footprint) -> NodeState | None:
+        """Best fit: o node que fica mais cheio (no recurso dominante) e ainda comporta o servidor"""
+        candidates = [node for node in self.nodes.values() if node.fits(footprint)]
+        return max(candidates, key=lambda node: node.share_after(footprint), default=None)
+
+    def place(self, assignment: Assignment) -> bool:
+        node = self.choose(assignment.footprint)
+        if node is None:
+            return False
+        assignment.port = node.reserve(assignment.footprint)
+        assignment.node_id = node.node_id
+        return True
+
+    def rebalance(
+        self, assignments: list[Assignment], mode: str = "overflow"
+    ) -> tuple[list[Assignment], list[Assignment], list[Assignment]]:
+        """Recalcula a distribuição em estados vazios dos mesmos nodes.
+
+        - overflow: cada servidor fica no seu node se couber (decrescente por
+          tamanho); só os que sobram são realocados, com best fit.
+        - pack: best fit decrescente do zero, consolidando em menos nodes.
+        Servidores `pinned` (rodando) são reservados primeiro e nunca saem do
+        node e da porta atuais; se a porta já estiver ocupada ou o node não
+        existir mais, viram conflito em vez de serem movidos.
+        Retorna (atribuições, servidores sem lugar, conflitos).
+        """
+        fresh = PlacementState([node.empty_copy() for node in self.nodes.values()])
+        ordered = sorted(assignments, key=lambda a: (a.footprint.memory_mb, a.footprint.cpu), reverse=True)
+        pending = set()
+        conflicts = []
+        for assignment in sorted(ordered, key=lambda a: not a.pinned):
+            current = fresh.nodes.get(str(assignment.node_id))
+            port_free = current and assignment.port in current.ports and not current.ports.is_set(assignment.port)
+            if assignment.pinned:
+                if not port_free:
+                    conflicts.append(assignment)
+                if current and assignment.port in current.ports:
+                    # Mesmo em conflito o processo continua lá e consome o node
+                    current.reserve(assignment.footprint, assignment.port)
+                elif current:
+                    current.used_cpu = round(current.used_cpu + assignment.footprint.cpu, 2)
+                    current.used_memory_mb += assignment.footprint.memory_mb
+                continue
+            keep = mode == "overflow" and current and current.fits(assignment.footprint)
+            if keep and port_free:
+                current.reserve(assignment.footprint, assignment.port)
+            else:
+                pending.add(assignment.key)
+
+        placed, unplaced = [], []
+        for assignment in ordered:
+            if assignment.key not in pending:
+                placed.append(assignment)
+                continue
+            previous = (assignment.node_id, assignment.port)
+            if fresh.place(assignment):
+                assignment.moved = (assignment.node_id, assignment.port) != previous
+                placed.append(assignment)
+            else:
+                unplaced.append(assignment)
+        self.nodes = fresh.nodes
+        return placed, unplaced, conflicts
+
+    def report(self) -> dict:
+        return {"nodes": [node.utilization() for node in self.nodes.values()]}
+
+
+# Modo real (MongoDB)
+
+_lock = asyncio.Lock()
+
+
+async def server_footprint(server: Server) -> Footprint:
+    properties = await effective_properties(server)
+    if not properties:
+        raise PlacementError("Propriedades do servidor não encontradas")
+    software = await catalog_cache.fetch(Softwares, server.software_id)
+    factor = software_factor(software.name, software.plugins_enabled, software.mods_enabled) if software else 1.0
+    return estimate_footprint(properties.max_players, properties.view_distance, properties.simulation_distance, factor)
+
+
+def _allocation(node: Node) -> dict:
+    return {
+        "port_bitmap": node.port_bitmap,
+        "allocated_cpu": node.allocated_cpu,
+        "allocated_memory_mb": node.allocated_memory_mb,
+    }
+
+
+def _state_allocation(state: NodeState) -> dict:
+    return {
+        "port_bitmap": state.ports.to_bytes(),
+        "allocated_cpu": state.used_cpu,
+        "allocated_memory_mb": state.used_memory_mb,
+    }
+
+
+async def _compare_and_set(node_id, expected: dict, allocation: dict) -> bool:
+    """Grava a alocação do node se ela ainda for `expected` (compare-and-set)"""
+    result = await Node.get_pymongo_collection().update_one(
+        {"_id": node_id, **expected},
+        {"$set": {**allocation, "updated_at": datetime.utcnow()}},
+    )
+    return result.matched_count == 1
+
+
+async def _commit_node(node: Node, state: NodeState) -> bool:
+    """Grava a reserva no node se ninguém o alterou desde a leitura"""
+    return await _compare_and_set(node.id, _allocation(node), _state_allocation(state))
+
+
+async def _assign_port(server: Server, port: int):
+    """Grava a porta reservada como server_port do servidor.
+
+    O server.properties gerado, o proxy de hibernação e as sondas de startup
+    usam as propriedades efetivas; sem isso todos os servidores de um node
+    tentariam a porta do template.
+    """
+    try:
+        await patch_server_properties(server, {"server_port": port})
+    except ValueError as e:
+        logger.warning(f"Porta {port} não gravada nas propriedades do servidor {server.id}: {e}")
+
+
+async def place(server: Server, node_id: PydanticObjectId | None = None) -> Node:
+    """Escolhe um node (ou usa `node_id`), reserva recursos e uma porta e atualiza o servidor.
+
+    A reserva nova é gravada antes de liberar a anterior: se não houver
+    espaço, o servidor continua alocado onde estava.
+    """
+    footprint = await server_footprint(server)
+    previous = Footprint(server.cpu_reserved or 0, server.memory_reserved_mb or 0) if server.node_id else None
+    async with _lock:
+        for _ in range(CAS_ATTEMPTS):
+            if node_id:
+                nodes = [node for node in [await Node.get(node_id)] if node and node.is_active]
+            else:
+                nodes = await Node.find(Node.is_active == True).to_list()
+            state = PlacementState([NodeState.from_node(node) for node in nodes])
+            current = state.nodes.get(str(server.node_id)) if previous else None
+            if current:
+                # No mesmo node a reserva antiga não conta contra a nova
+                current.release(previous, server.port)
+            target = state.nodes.get(str(node_id)) if node_id else state.choose(footprint)
+            if target is None or not target.fits(footprint):
+                raise PlacementError("Nenhum node com capacidade para o servidor")
+            port = target.reserve(footprint)
+            node = next(node for node in nodes if node.id == target.node_id)
+            if await _commit_node(node, target):
+                break
+        else:
+            raise PlacementError("Conflito de concorrência ao reservar o node, tente novamente")
+        if previous and target is not current:
+            await _release(server)
+
+    await _assign_port(server, port)
+    await server.set({
+        Server.node_id: node.id,
+        Server.ip_address: node.address,
+        Server.port: port,
+        Server.cpu_reserved: footprint.cpu,
+        Server.memory_reserved_mb: footprint.memory_mb,
+        Server.updated_at: datetime.utcnow(),
+    })
+    return node
+
+
+async def _release(server: Server):
+    footprint = Footprint(server.cpu_reserved or 0, server.memory_reserved_mb or 0)
+    for _ in range(CAS_ATTEMPTS):
+        node = await Node.get(server.node_id)
+        if not node:
+            break
+        state = NodeState.from_node(node)
+        state.release(footprint, server.port)
+        if await _commit_node(node, state):
+            break
+    server.node_id = None
+
+
+async def release(server: Server):
+    """Devolve a capacidade e a porta do servidor ao node"""
+    if not server.node_id:
+        return
+    async with _lock:
+        await _release(server)
+    await server.set({Server.node_id: None, Server.cpu_reserved: None, Server.memory_reserved_mb: None})
+
+
+async def rebalance(mode: str = "overflow", apply: bool = False) -> dict:
+    """Replaneja a distribuição dos servidores já alocados; sem `apply` é só simulação"""
+    async with _lock:
+        nodes = await Node.find(Node.is_active == True).to_list()
+        state = PlacementState([NodeState.from_node(node) for node in nodes])
+        servers = {str(server.id): server for server in await Server.find(Server.node_id != None).to_list()}
+        assignments = [
+            Assignment(
+                key=str(server.id),
+                footprint=Footprint(server.cpu_reserved or 0, server.memory_reserved_mb or 0),
+                node_id=server.node_id,
+                port=server.port,
+                pinned=server.status in PINNED_STATUSES,
+            )
+            for server in servers.values()
+        ]
+        placed, unplaced, conflicts = state.rebalance(assignments, mode)
+        moves = [assignment for assignment in placed if assignment.moved]
+
+        if apply:
+            # Mesmo CAS do place(): um place() concorrente (outro processo) não é sobrescrito
+            committed = []
+            for node in nodes:
+                allocation = _state_allocation(state.nodes[str(node.id)])
+                if allocation == _allocation(node):
+                    continue
+                if not await _compare_and_set(node.id, _allocation(node), allocation):
+                    for done, done_allocation in committed:
+                        await _compare_and_set(done.id, done_allocation, _allocation(done))
+                    raise PlacementError("Nodes alterados durante o rebalance, tente novamente")
+                committed.append((node, allocation))
+            for assignment in moves:
+                node_state = state.nodes[str(assignment.node_id)]
+                await Server.find_one(Server.id == PydanticObjectId(assignment.key)).update({"$set": {
+                    "node_id": node_state.node_id,
+                    "ip_address": node_state.address,
+                    "port": assignment.port,
+                    "updated_at": datetime.utcnow(),
+                }})
+                await _assign_port(servers[assignment.key], assignment.port)
+
+    return {
+        "mode": mode,
+        "applied": apply,
+        "moves": [
+            {"server_id": a.key, "node": state.nodes[str(a.node_id)].name, "port": a.port}
+            for a in moves
+        ],
+        "unplaced": [a.key for a in unplaced],
+        # Servidores rodando cuja porta colide ou cujo node não está ativo: ficam onde estão
+        "conflicts": [{"server_id": a.key, "node_id": str(a.node_id), "port": a.port} for a in conflicts],
+        **state.report(),
+    }
+
+
+# Simulação (sem banco)
+
+def simulate(nodes: list[dict], servers: int, seed: int | None = None, mode: str = "online") -> dict:
+    """Aloca uma frota sintética em nodes fictícios e reporta a ocupação.
+
+    `nodes`: [{"name", "cpu_cores", "memory_mb", "ports"}]. Os servidores têm
+    max_players/distâncias/softwares sorteados.
+    """
+    rng = random.Random(seed)
+    state = PlacementState([
+        NodeState(
+            node_id=spec["name"],
+            name=spec["name"],
+            address=spec.get("address", spec["name"]),
+            cpu_cores=spec["cpu_cores"],
+            memory_mb=spec["memory_mb"],
+            ports=PortBitmap(25565, 25565 + spec.get("ports", 100) - 1),
+        )
+        for spec in nodes
+    ])
+    softwares = [("Vanilla", False, False), ("Paper", True, False), ("Spigot", True, False), ("Fabric", False, True)]
+    assignments = []
+    for index in range(servers):
+        view_distance = rng.choice([6, 8, 10, 12, 16])
+        footprint = estimate_footprint(
+            rng.choice([5, 10, 20, 20, 50, 100]),
+            view_distance,
+            min(view_distance, rng.choice([6, 8, 10])),
+            software_factor(*rng.choice(softwares)),
+        )
+        assignments.append(Assignment(key=f"server-{index}", footprint=footprint))
+
+    if mode == "pack":
+        # Best fit decrescente: conhece a frota inteira antes de alocar
+        placed, unplaced, _ = state.rebalance(assignments, "pack")
+    else:
+        # Online: servidores chegam um a um, como em place()
+        placed, unplaced = [], []
+        for assignment in assignments:
+            (placed if state.place(assignment) else unplaced).append(assignment)
+    return {
+        "servers": servers,
+        "placed": len(placed),
+        "unplaced": len(unplaced),
+        "nodes_used": sum(1 for node in state.nodes.values() if node.used_memory_mb),
+        **state.report(),
+    }
@@ -0,0 +1,92 @@
+import hashlib
+import json
+from datetime import datetime
+
+from pymongo.errors import DuplicateKeyError
+
+from core import compact_properties
+from core.config import settings
+from models.servers import Server
+from models.servers_properties import ServersProperties
+
+# Templates de propriedades: documentos de ServersProperties deduplicados pelo
+# hash do conteúdo e compartilhados entre servidores. Cada servidor guarda só o
+# delta (Server.properties_overrides); o template nunca é alterado por um patch
+# de servidor (copy-on-write).
+
+
+def content_hash(properties: ServersProperties) -> str:
+    """SHA-256 dos valores de configuração (independe de _id, datas e compactação)"""
+    payload = json.dumps(properties.config_values(), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+async def get_or_create_template(properties: ServersProperties) -> ServersProperties:
+    """Retorna o template com o mesmo conteúdo, criando-o se ainda não existir"""
+    digest = content_hash(properties)
+    template = await ServersProperties.find_one({"content_hash": digest})
+    if template:
+        return template
+
+    properties.id = None
+    properties.content_hash = digest
+    try:
+        return await compact_properties.insert(properties)
+    except DuplicateKeyError:
+        # Outro request criou o mesmo template ao mesmo tempo
+        return await ServersProperties.find_one({"content_hash": digest})
+
+
+def with_overrides(template: ServersProperties, overrides: dict) -> ServersProperties:
+    """Propriedades efetivas: template + delta do servidor (valida os campos)"""
+    unknown = set(overrides) - set(template.config_values())
+    if unknown:
+        raise ValueError(f"Campos de propriedades inválidos: {', '.join(sorted(unknown))}")
+    data = template.model_dump(exclude={"id", "revision_id", "content_hash"})
+    return ServersProperties.model_validate({**data, **overrides})
+
+
+def diff(template: ServersProperties, properties: ServersProperties) -> dict:
+    """Campos de `properties` que diferem do template"""
+    base = template.config_values()
+    return {
+        field: value
+        for field, value in properties.config_values().items()
+        if base[field] != value
+    }
+
+
+async def effective_properties(server: Server) -> ServersProperties | None:
+    template = await ServersProperties.get(server.server_properties_id)
+    if not template:
+        return None
+    return with_overrides(template, server.properties_overrides)
+
+
+def normalize_overrides(template: ServersProperties, overrides: dict) -> dict:
+    """Valida um delta e remove os campos iguais ao template"""
+    return diff(template, with_overrides(template, overrides))
+
+
+async def patch_server_properties(server: Server, update: dict) -> ServersProperties:
+    """Aplica um patch às propriedades de um servidor sem tocar no template.
+
+    O delta fica no servidor; se passar de `properties_override_limit` campos,
+    o servidor passa a apontar para um template próprio (deduplicado por hash).
+    """
+    template = await ServersProperties.get(server.server_properties_id)
+    if not template:
+        raise ValueError("Propriedades do servidor não encontradas")
+
+    properties = with_overrides(template, {**server.properties_overrides, **update})
+    overrides = diff(template, properties)
+    if len(overrides) > settings.properties_override_limit:
+        template = await get_or_create_template(properties.model_copy())
+        overrides = diff(template, properties)
+
+    await server.set({
+        Server.server_properties_id: template.id,
+        Server.properties_overrides: overrides,
+        Server.updated_at: datetime.utcnow(),
+    })
+    return properties
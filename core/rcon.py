@@ -0,0 +1,263 @@
+import asyncio
+import itertools
+import logging
+import struct
+from collections import deque
+
+from core.config import settings
+from core.property_templates import effective_properties
+from models.servers import Server
+
+logger = logging.getLogger(__name__)
+
+# Protocolo RCON (Source RCON, usado pelo Minecraft): pacotes little-endian
+# <tamanho:int32><id:int32><tipo:int32><corpo>\x00\x00
+SERVERDATA_AUTH = 3
+SERVERDATA_EXECCOMMAND = 2
+SERVERDATA_AUTH_RESPONSE = 2
+SERVERDATA_RESPONSE_VALUE = 0
+
+# O Minecraft divide respostas longas em pacotes de 4096 bytes sem indicar o
+# último. Cada comando é seguido de um pacote marcador (RESPONSE_VALUE vazio):
+# como o servidor responde em ordem, a resposta ao marcador encerra a do
+# comando. O vanilla responde a tipos desconhecidos com id -1.
+MAX_PACKET = 4096 + 10
+
+
+class RconError(Exception):
+    pass
+
+
+class RconAuthError(RconError):
+    pass
+
+
+class RconDisabledError(RconError):
+    pass
+
+
+def encode_packet(request_id: int, packet_type: int, body: str) -> bytes:
+    payload = struct.pack("<ii", request_id, packet_type) + body.encode("utf-8") + b"\x00\x00"
+    return struct.pack("<i", len(payload)) + payload
+
+
+async def read_packet(reader: asyncio.StreamReader) -> tuple[int, int, str]:
+    (length,) = struct.unpack("<i", await reader.readexactly(4))
+    if length < 10 or length > MAX_PACKET:
+        raise RconError(f"Pacote RCON inválido ({length} bytes)")
+    payload = await reader.readexactly(length)
+    request_id, packet_type = struct.unpack("<ii", payload[:8])
+    return request_id, packet_type, payload[8:-2].decode("utf-8", errors="replace")
+
+
+class RconConnection:
+    """Conexão RCON autenticada com pipelining.
+
+    Vários comandos podem estar em andamento ao mesmo tempo; as respostas são
+    associadas aos comandos pelo id do pacote.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count(1)
+        self._pending: dict[int, asyncio.Future] = {}
+        self._fragments: dict[int, list[str]] = {}
+        self._order: deque[tuple[int, int]] = deque()  # (id do comando, id do marcador)
+        self._reader_task: asyncio.Task | None = None
+        self.closed = False
+
+    @classmethod
+    async def connect(cls, host: str, port: int, password: str, timeout: float) -> "RconConnection":
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        connection = cls(reader, writer)
+        try:
+            await asyncio.wait_for(connection._authenticate(password), timeout)
+        except BaseException:
+            await connection.close()
+            raise
+        connection._reader_task = asyncio.create_task(connection._read_loop())
+        return connection
+
+    async def _authenticate(self, password: str):
+        request_id = next(self._ids)
+        self._writer.write(encode_packet(request_id, SERVERDATA_AUTH, password))
+        await self._writer.drain()
+        while True:
+            response_id, packet_type, _ = await read_packet(self._reader)
+            if packet_type != SERVERDATA_AUTH_RESPONSE:
+                continue  # alguns servidores mandam um RESPONSE_VALUE vazio antes
+            if response_id == -1:
+                raise RconAuthError("Senha RCON recusada")
+            if response_id == request_id:
+                return
+
+    async def _read_loop(self):
+        try:
+            while True:
+                response_id, _, body = await read_packet(self._reader)
+                if not self._order:
+                    continue
+                request_id, marker_id = self._order[0]
+                if response_id == request_id:
+                    self._fragments.setdefault(request_id, []).append(body)
+                elif response_id in (marker_id, -1):
+                    self._order.popleft()
+                    future = self._pending.pop(request_id, None)
+                    body = "".join(self._fragments.pop(request_id, []))
+                    if future is not None and not future.done():
+                        future.set_result(body)
+                # outros ids: pacotes extras de um marcador já tratado
+        except (asyncio.IncompleteReadError, ConnectionError, RconError) as e:
+            self._fail_pending(RconError(f"Conexão RCON encerrada: {e}"))
+        finally:
+            self.closed = True
+
+    def _fail_pending(self, error: Exception):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+        self._fragments.clear()
+        self._order.clear()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    async def command(self, command: str, timeout: float) -> str:
+        if self.closed:
+            raise RconError("Conexão RCON fechada")
+        request_id, marker_id = next(self._ids), next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self._order.append((request_id, marker_id))
+        try:
+            self._writer.write(
+                encode_packet(request_id, SERVERDATA_EXECCOMMAND, command)
+                + encode_packet(marker_id, SERVERDATA_RESPONSE_VALUE, "")
+            )
+            await self._writer.drain()
+            return await asyncio.wait_for(future, timeout)
+        except TimeoutError:
+            # O servidor responde em ordem: os próximos comandos ficariam presos
+            # atrás deste, então a conexão é descartada
+            await self.close()
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+            self._fragments.pop(request_id, None)
+
+    async def close(self):
+        self.closed = True
+        if self._reader_task:
+            self._reader_task.cancel()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+        self._fail_pending(RconError("Conexão RCON fechada"))
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+
+class RconPool:
+    """Até `size` conexões para um servidor, cada uma com até `depth` comandos em pipeline"""
+
+    def __init__(self, host: str, port: int, password: str, size: int, depth: int, timeout: float):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.size = size
+        self.depth = depth
+        self.timeout = timeout
+        self._connections: list[RconConnection] = []
+        self._slots = asyncio.Semaphore(size * depth)
+        self._lock = asyncio.Lock()
+
+    @property
+    def config(self) -> tuple:
+        return self.host, self.port, self.password
+
+    async def _acquire(self) -> RconConnection:
+        async with self._lock:
+            self._connections = [c for c in self._connections if not c.closed]
+            available = [c for c in self._connections if c.in_flight < self.depth]
+            if available and (min(c.in_flight for c in available) == 0 or len(self._connections) >= self.size):
+                return min(available, key=lambda c: c.in_flight)
+            connection = await RconConnection.connect(self.host, self.port, self.password, self.timeout)
+            self._connections.append(connection)
+            return connection
+
+    async def command(self, command: str) -> str:
+        async with self._slots:
+            connection = await self._acquire()
+            return await connection.command(command, self.timeout)
+
+    async def close(self):
+        connections, self._connections = self._connections, []
+        await asyncio.gather(*(c.close() for c in connections), return_exceptions=True)
+
+
+class RconClient:
+    """Envio de comandos RCON aos servidores, com um pool de conexões por servidor.
+
+    Host, porta e senha vêm do servidor e das suas propriedades efetivas; se
+    mudarem, o pool antigo é fechado e outro é aberto.
+    """
+
+    def __init__(self, pool_size: int, depth: int, timeout: float, fanout: int):
+        self.pool_size = pool_size
+        self.depth = depth
+        self.timeout = timeout
+        self.fanout = fanout
+        self._pools: dict[str, RconPool] = {}
+
+    async def _pool(self, server: Server) -> RconPool:
+        properties = await effective_properties(server)
+        if not properties:
+            raise RconError("Propriedades do servidor não encontradas")
+        if not properties.enable_rcon:
+            raise RconDisabledError("RCON desabilitado nas propriedades do servidor")
+
+        key = str(server.id)
+        config = (server.ip_address or settings.rcon_host, properties.rcon_port, properties.rcon_password)
+        pool = self._pools.get(key)
+        if pool and pool.config != config:
+            await pool.close()
+            pool = None
+        if not pool:
+            pool = self._pools[key] = RconPool(*config, self.pool_size, self.depth, self.timeout)
+        return pool
+
+    async def execute(self, server: Server, command: str) -> str:
+        pool = await self._pool(server)
+        return await pool.command(command)
+
+    async def broadcast(self, servers: list[Server], command: str, concurrency: int | None = None) -> dict[str, dict]:
+        """Executa o comando em vários servidores, no máximo `concurrency` por vez"""
+        semaphore = asyncio.Semaphore(concurrency or self.fanout)
+
+        async def run(server: Server) -> dict:
+            async with semaphore:
+                try:
+                    return {"response": await self.execute(server, command)}
+                except TimeoutError:
+                    return {"error": "Tempo esgotado"}
+                except (RconError, OSError) as e:
+                    return {"error": str(e)}
+
+        results = await asyncio.gather(*(run(server) for server in servers))
+        return {str(server.id): result for server, result in zip(servers, results)}
+
+    async def discard(self, server_id):
+        pool = self._pools.pop(str(server_id), None)
+        if pool:
+            await pool.close()
+
+    async def close(self):
+        pools, self._pools = self._pools, {}
+        await asyncio.gather(*(pool.close() for pool in pools.values()), return_exceptions=True)
+
+
+rcon = RconClient(settings.rcon_pool_size, settings.rcon_pipeline_depth, settings.rcon_timeout, settings.rcon_fanout)
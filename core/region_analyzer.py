@@ -0,0 +1,148 @@
+import logging
+import mmap
+import multiprocessing
+import os
+import struct
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SECTOR = 4096
+
+# Byte de compressão no cabeçalho de cada chunk; o bit 128 indica que os dados
+# estão em um arquivo .mcc separado (chunks grandes demais para a região)
+COMPRESSION = {1: "gzip", 2: "deflate", 3: "none", 4: "lz4", 127: "custom"}
+EXTERNAL = 128
+
+
+def _decompressed_size(kind: str, data: bytes) -> int | None:
+    if kind == "deflate":
+        return len(zlib.decompress(data))
+    if kind == "gzip":
+        return len(zlib.decompress(data, 31))
+    if kind == "none":
+        return len(data)
+    return None  # lz4/custom: sem descompressor na stdlib, fica fora da amostra
+
+
+def analyze_region(path: str, sample_every: int) -> dict:
+    """Estatísticas de um arquivo de região (roda nos processos do pool).
+
+    O arquivo é mapeado em memória: só a tabela de localização (primeiros
+    4 KiB) e o cabeçalho de 5 bytes de cada chunk são lidos, e apenas um a
+    cada `sample_every` chunks é descomprimido para estimar a compressão.
+    """
+    result = {"chunks": 0, "compression": Counter(), "sampled": 0, "compressed": 0, "uncompressed": 0, "corrupt": 0}
+    size = os.path.getsize(path)
+    if size < 2 * SECTOR:
+        return result  # região vazia (o jogo cria arquivos de 0 bytes)
+    # Setores já reivindicados: dois chunks apontando para os mesmos setores
+    # indicam uma tabela corrompida, e só o primeiro é contado
+    used = bytearray(-(-size // SECTOR))
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for index, location in enumerate(struct.unpack_from(">1024I", data)):
+            if not location:
+                continue
+            first, count = location >> 8, location & 0xFF
+            start, end = first * SECTOR, min(first + count, len(used))
+            if start < 2 * SECTOR or start + 5 > size or not count or any(used[first:end]):
+                result["corrupt"] += 1
+                continue
+            used[first:end] = b"\x01" * (end - first)
+            length, code = struct.unpack_from(">IB", data, start)
+            kind = COMPRESSION.get(code & ~EXTERNAL, "unknown")
+            result["chunks"] += 1
+            result["compression"][kind] += 1
+            if code & EXTERNAL or index % sample_every or start + 4 + length > size or length < 1:
+                continue
+            payload = data[start + 5:start + 4 + length]
+            try:
+                uncompressed = _decompressed_size(kind, payload)
+            except zlib.error:
+                result["corrupt"] += 1
+                continue
+            if uncompressed is not None:
+                result["sampled"] += 1
+                result["compressed"] += len(payload)
+                result["uncompressed"] += uncompressed
+    return result
+
+
+def dimension_of(world: str, directory: str) -> tuple[str, str] | None:
+    """(dimensão, tipo) de um diretório com .mca: tipo é region, entities ou poi"""
+    parts = os.path.relpath(directory, world).split(os.sep)
+    kind, parents = parts[-1], parts[:-1]
+    if kind not in ("region", "entities", "poi"):
+        return None
+    if not parents:
+        return "minecraft:overworld", kind
+    if parents == ["DIM-1"]:
+        return "minecraft:the_nether", kind
+    if parents == ["DIM1"]:
+        return "minecraft:the_end", kind
+    if len(parents) == 3 and parents[0] == "dimensions":
+        return f"{parents[1]}:{parents[2]}", kind
+    return None
+
+
+def analyze_world(world: str) -> dict:
+    """Percorre o mundo e analisa as regiões em paralelo em um pool de processos.
+
+    Retorna um dict no formato de models.minecraft_maps.RegionStats.
+    """
+    dimensions: dict[str, dict] = {}
+    regions: list[tuple[str, str]] = []
+    for directory, dirs, files in os.walk(world):
+        dirs.sort()
+        located = dimension_of(world, directory)
+        if not located:
+            continue
+        name, kind = located
+        stats = dimensions.setdefault(name, {"region_files": 0, "chunks": 0, "bytes": 0})
+        for file in files:
+            if not file.endswith(".mca"):
+                continue
+            path = os.path.join(directory, file)
+            stats["bytes"] += os.path.getsize(path)
+            if kind == "region":
+                stats["region_files"] += 1
+                regions.append((name, path))
+
+    sample_every = max(1, settings.map_analysis_sample_every)
+    if regions:
+        # spawn: o worker não herda o estado do processo da API (event loop, conexões)
+        context = multiprocessing.get_context("spawn")
+        workers = min(settings.map_analysis_workers, len(regions))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            results = list(pool.map(
+                analyze_region,
+                [path for _, path in regions],
+                [sample_every] * len(regions),
+                chunksize=max(1, len(regions) // (workers * 4)),
+            ))
+    else:
+        results = []
+
+    compression, sampled, compressed, uncompressed, corrupt = Counter(), 0, 0, 0, 0
+    for (name, _), result in zip(regions, results):
+        dimensions[name]["chunks"] += result["chunks"]
+        compression.update(result["compression"])
+        sampled += result["sampled"]
+        compressed += result["compressed"]
+        uncompressed += result["uncompressed"]
+        corrupt += result["corrupt"]
+
+    return {
+        "generated_chunks": sum(stats["chunks"] for stats in dimensions.values()),
+        "region_files": len(regions),
+        "dimensions": {name: stats for name, stats in dimensions.items() if stats["bytes"] or stats["region_files"]},
+        "compression": dict(compression),
+        "dominant_compression": compression.most_common(1)[0][0] if compression else None,
+        "sampled_chunks": sampled,
+        "compression_ratio": round(uncompressed / compressed, 3) if compressed else None,
+        "corrupt_chunks": corrupt,
+    }
@@ -0,0 +1,367 @@
+import asyncio
+import logging
+import math
+import os
+import re
+import time
+from datetime import datetime, timedelta
+
+from beanie import PydanticObjectId
+from pymongo.errors import PyMongoError
+
+from core.config import settings
+from core.startup import lazy_import
+from core.supervisor import supervisor
+from models.server_metrics import ServerMetric, ServerMetricRollup
+
+logger = logging.getLogger(__name__)
+
+# Carregado só quando a primeira amostra é gravada no buffer
+numpy = lazy_import("numpy")
+
+FIELDS = ("timestamp", "cpu_percent", "rss_mb", "swap_mb", "threads", "read_bps", "write_bps")
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+RESOLUTIONS = {"1m": 60, "1h": 3600}
+DATE_UNITS = {"1m": "minute", "1h": "hour"}
+RANGE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_range(value: str) -> int:
+    """'15m', '6h', '7d' -> segundos"""
+    match = re.fullmatch(r"(\d+)([smhd])", value.strip())
+    if not match or int(match[1]) == 0:
+        raise ValueError("range deve ser um número seguido de s, m, h ou d (ex.: 15m, 6h, 7d)")
+    return int(match[1]) * RANGE_UNITS[match[2]]
+
+
+def read_process(pid: int) -> dict | None:
+    """Lê /proc/<pid>/stat, status e io; None se o processo não existe mais"""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            stat = f.read()
+        with open(f"/proc/{pid}/status", "rb") as f:
+            status = f.read()
+    except (FileNotFoundError, ProcessLookupError):
+        return None
+    # O nome do processo (campo 2) pode ter espaços: os campos começam após o último ")"
+    fields = stat[stat.rindex(b")") + 2:].split()
+    reading = {
+        "cpu_ticks": int(fields[11]) + int(fields[12]),  # utime + stime
+        "threads": int(fields[17]),
+        "start": int(fields[19]),  # distingue um pid reutilizado
+        "rss_kb": 0,
+        "swap_kb": 0,
+        "read_bytes": None,
+        "write_bytes": None,
+    }
+    for line in status.splitlines():
+        if line.startswith(b"VmRSS:"):
+            reading["rss_kb"] = int(line.split()[1])
+        elif line.startswith(b"VmSwap:"):
+            reading["swap_kb"] = int(line.split()[1])
+    try:
+        with open(f"/proc/{pid}/io", "rb") as f:
+            for line in f:
+                key, _, value = line.partition(b":")
+                if key in (b"read_bytes", b"write_bytes"):
+                    reading[key.decode()] = int(value)
+    except OSError:
+        pass  # io exige o mesmo usuário (ou CAP_SYS_PTRACE)
+    return reading
+
+
+class SampleBuffer:
+    """Amostras em uma matriz NumPy pré-alocada (uma linha por amostra, colunas em FIELDS).
+
+    O buffer não cria um objeto por valor amostrado; a matriz só é alocada
+    na primeira amostra.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.length = 0
+        self.servers: list[PydanticObjectId] = []
+        self._data = None
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def full(self) -> bool:
+        return self.length >= self.capacity
+
+    def append(self, server_id: PydanticObjectId, values: tuple[float, ...]):
+        if self._data is None:
+            self._data = numpy.full((self.capacity, len(FIELDS)), numpy.nan)
+        self._data[self.length] = values
+        self.servers.append(server_id)
+        self.length += 1
+
+    def rows(self) -> list[list[float]]:
+        return self._data[:self.length].tolist() if self.length else []
+
+
+def _value(value: float) -> float | None:
+    return None if math.isnan(value) else value
+
+
+def period_start(timestamp: float, resolution: str) -> datetime:
+    """Início (UTC) do período de `resolution` que contém `timestamp`"""
+    seconds = RESOLUTIONS[resolution]
+    return datetime.utcfromtimestamp(timestamp - timestamp % seconds)
+
+
+def rollup_pipeline(resolution: str, start: datetime, end: datetime) -> list[dict]:
+    """Agrega as amostras brutas de [start, end) por servidor e período e grava com $merge.
+
+    Cada período é recalculado inteiro a partir de server_metrics, então
+    executar de novo (períodos em aberto, amostras atrasadas) só substitui.
+    """
+    return [
+        {"$match": {"meta.resolution": "raw", "timestamp": {"$gte": start, "$lt": end}}},
+        {"$group": {
+            "_id": {
+                "server_id": "$meta.server_id",
+                "timestamp": {"$dateTrunc": {"date": "$timestamp", "unit": DATE_UNITS[resolution]}},
+            },
+            "samples": {"$sum": 1},
+            "cpu_avg": {"$avg": "$cpu_percent"},
+            "cpu_max": {"$max": "$cpu_percent"},
+            "rss_avg_mb": {"$avg": "$rss_mb"},
+            "rss_max_mb": {"$max": "$rss_mb"},
+            "threads_max": {"$max": "$threads"},
+            "read_bps": {"$avg": "$read_bps"},
+            "write_bps": {"$avg": "$write_bps"},
+        }},
+        {"$project": {
+            "_id": 0,
+            "timestamp": "$_id.timestamp",
+            "meta": {"server_id": "$_id.server_id", "resolution": {"$literal": resolution}},
+            "samples": 1,
+            "cpu_avg": {"$round": ["$cpu_avg", 2]},
+            "cpu_max": {"$round": ["$cpu_max", 2]},
+            "rss_avg_mb": {"$round": ["$rss_avg_mb", 1]},
+            "rss_max_mb": {"$round": ["$rss_max_mb", 1]},
+            "threads_max": 1,
+            "read_bps": {"$round": ["$read_bps", 1]},
+            "write_bps": {"$round": ["$write_bps", 1]},
+        }},
+        {"$merge": {
+            "into": ServerMetricRollup.get_collection_name(),
+            "on": ["meta.server_id", "meta.resolution", "timestamp"],
+            "whenMatched": "replace",
+            "whenNotMatched": "insert",
+        }},
+    ]
+
+
+async def rollup(resolution: str, start: datetime, end: datetime):
+    """Recalcula os rollups de `resolution` dos períodos entre `start` e `end`"""
+    await ServerMetric.aggregate(rollup_pipeline(resolution, start, end)).to_list()
+
+
+class ResourceSampler:
+    """Mede o consumo dos processos Java supervisionados a partir do /proc.
+
+    A cada `interval` segundos lê stat, status e io de todos os processos em
+    uma única passada (em uma thread), guarda as amostras em um SampleBuffer e
+    grava em lote na coleção time-series a cada `flush_interval` segundos ou
+    quando o buffer enche. Depois de cada flush os rollups são recalculados a
+    partir das amostras gravadas: os de 1 minuto até o minuto em aberto, os de
+    1 hora quando a hora fecha (e a hora em aberto no stop).
+    """
+
+    def __init__(self, interval: float, flush_interval: float, flush_size: int):
+        self.interval = interval
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._buffer = SampleBuffer(flush_size)
+        # Por resolução, o início do primeiro período ainda não recalculado por completo
+        self._rolled: dict[str, datetime] = {}
+        self._previous: dict[str, tuple[int, float, dict]] = {}
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    @staticmethod
+    def available() -> bool:
+        return os.path.isdir("/proc/self")
+
+    def start(self):
+        if not self.available():
+            logger.warning("Sem /proc neste sistema, amostragem de recursos desativada")
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+        await self.update_rollups(time.time(), final=True)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        last_flush = loop.time()
+        while True:
+            started = loop.time()
+            try:
+                await self.sample()
+                if self._buffer.full or loop.time() - last_flush >= self.flush_interval:
+                    await self.flush()
+                    await self.update_rollups(time.time())
+                    last_flush = loop.time()
+            except Exception:
+                logger.exception("Falha na amostragem de recursos")
+            await asyncio.sleep(max(0.0, self.interval - (loop.time() - started)))
+
+    async def sample(self) -> int:
+        """Uma passada por todos os processos em execução; retorna as amostras geradas"""
+        pids = {key: server.process.pid for key, server in supervisor.running().items()}
+        if not pids:
+            self._previous.clear()
+            return 0
+        now, readings = await asyncio.to_thread(
+            lambda: (time.time(), {key: read_process(pid) for key, pid in pids.items()})
+        )
+
+        samples = 0
+        for key, reading in readings.items():
+            previous = self._previous.pop(key, None)
+            if reading is None:
+                continue
+            pid = pids[key]
+            self._previous[key] = (pid, now, reading)
+            # A primeira leitura (ou um processo novo) só serve de base para as taxas
+            if not previous or previous[0] != pid or previous[2]["start"] != reading["start"]:
+                continue
+            elapsed = now - previous[1]
+            if elapsed <= 0:
+                continue
+            cpu = (reading["cpu_ticks"] - previous[2]["cpu_ticks"]) / CLOCK_TICKS / elapsed * 100
+            read = write = None
+            if reading["read_bytes"] is not None and previous[2]["read_bytes"] is not None:
+                read = (reading["read_bytes"] - previous[2]["read_bytes"]) / elapsed
+                write = (reading["write_bytes"] - previous[2]["write_bytes"]) / elapsed
+            rss, swap = reading["rss_kb"] / 1024, reading["swap_kb"] / 1024
+            server_id = PydanticObjectId(key)
+
+            if self._buffer.full:
+                await self.flush()
+            self._buffer.append(server_id, (
+                now, cpu, rss, swap, reading["threads"],
+                math.nan if read is None else read,
+                math.nan if write is None else write,
+            ))
+            samples += 1
+
+        for key in set(self._previous) - set(pids):
+            del self._previous[key]
+        return samples
+
+    async def update_rollups(self, now: float, final: bool = False):
+        """Recalcula os rollups dos períodos que podem ter recebido amostras desde a última vez.
+
+        Amostras chegam ao banco até `flush_interval + interval` segundos depois
+        de medidas: só os períodos anteriores a esse atraso são considerados
+        fechados. Na primeira execução o período anterior também é refeito,
+        cobrindo o que uma execução interrompida não chegou a agregar.
+        """
+        settled = now - self.flush_interval - self.interval
+        end_open = datetime.utcfromtimestamp(now + 1)
+        for resolution, seconds in RESOLUTIONS.items():
+            closed = period_start(settled, resolution)
+            start = self._rolled.get(resolution, closed - timedelta(seconds=seconds))
+            # Minutos em aberto são baratos e recalculados a cada flush; horas só quando fecham
+            end = end_open if resolution == "1m" or final else closed
+            if end <= start:
+                continue
+            try:
+                await rollup(resolution, start, end)
+            except PyMongoError as e:
+                logger.error(f"Falha ao calcular os rollups de {resolution}: {e}")
+                continue
+            self._rolled[resolution] = closed
+
+    async def flush(self) -> int:
+        async with self._lock:
+            buffer, self._buffer = self._buffer, SampleBuffer(self.flush_size)
+            documents = [
+                {
+                    "timestamp": datetime.utcfromtimestamp(row[0]),
+                    "meta": {"server_id": server_id, "resolution": "raw"},
+                    "cpu_percent": round(row[1], 2),
+                    "rss_mb": round(row[2], 1),
+                    "swap_mb": round(row[3], 1),
+                    "threads": int(row[4]),
+                    "read_bps": _value(row[5]),
+                    "write_bps": _value(row[6]),
+                }
+                for server_id, row in zip(buffer.servers, buffer.rows())
+            ]
+            try:
+                if documents:
+                    await ServerMetric.get_pymongo_collection().insert_many(documents, ordered=False)
+            except PyMongoError as e:
+                # Métricas são descartáveis: não acumula indefinidamente se o banco cair
+                logger.error(f"Falha ao gravar {len(documents)} amostras: {e}")
+                return 0
+            return len(documents)
+
+
+def resolution_for(seconds: int) -> str:
+    """Resolução padrão para um intervalo: amostras até 2h, minutos até 2 dias"""
+    if seconds <= 2 * 3600:
+        return "raw"
+    if seconds <= 2 * 86400:
+        return "1m"
+    return "1h"
+
+
+async def series(server_id: PydanticObjectId, seconds: int, resolution: str | None = None) -> dict:
+    resolution = resolution or resolution_for(seconds)
+    since = datetime.utcnow() - timedelta(seconds=seconds)
+    match = {"meta.server_id": server_id, "timestamp": {"$gte": since}}
+    if resolution == "raw":
+        cursor = ServerMetric.get_pymongo_collection().find(match, {"_id": 0, "meta": 0}).sort("timestamp", 1)
+        points = await cursor.to_list(None)
+    else:
+        match["meta.resolution"] = resolution
+        cursor = ServerMetricRollup.get_pymongo_collection().find(match, {"_id": 0, "meta": 0}).sort("timestamp", 1)
+        points = await cursor.to_list(None)
+    return {"server_id": str(server_id), "resolution": resolution, "points": points}
+
+
+TOP_METRICS = ("cpu_avg", "cpu_max", "rss_max_mb", "read_bps", "write_bps")
+
+
+async def top(seconds: int, by: str = "cpu_avg", limit: int = 10, server_ids: list | None = None) -> list[dict]:
+    """Servidores com maior consumo no intervalo, ordenados por `by`"""
+    if by not in TOP_METRICS:
+        raise ValueError(f"by deve ser um de {', '.join(TOP_METRICS)}")
+    since = datetime.utcnow() - timedelta(seconds=seconds)
+    match: dict = {"timestamp": {"$gte": since}}
+    if server_ids is not None:
+        match["meta.server_id"] = {"$in": server_ids}
+    if resolution_for(seconds) == "raw":
+        model, cpu, cpu_max, rss = ServerMetric, "$cpu_percent", "$cpu_percent", "$rss_mb"
+    else:
+        model, cpu, cpu_max, rss = ServerMetricRollup, "$cpu_avg", "$cpu_max", "$rss_max_mb"
+        match["meta.resolution"] = "1m"
+    return await model.aggregate([
+        {"$match": match},
+        {"$group": {
+            "_id": "$meta.server_id",
+            "cpu_avg": {"$avg": cpu},
+            "cpu_max": {"$max": cpu_max},
+            "rss_max_mb": {"$max": rss},
+            "read_bps": {"$avg": "$read_bps"},
+            "write_bps": {"$avg": "$write_bps"},
+        }},
+        {"$sort": {by: -1}},
+        {"$limit": limit},
+        {"$project": {"_id": 0, "server_id": {"$toString": "$_id"}, **{field: 1 for field in TOP_METRICS}}},
+    ]).to_list()
+
+
+resource_sampler = ResourceSampler(settings.metrics_interval, settings.metrics_flush_interval, settings.metrics_flush_size)
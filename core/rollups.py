@@ -0,0 +1,99 @@
+import logging
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from models.operators import Operator
+from models.rollups import Rollup
+from models.servers import Server
+from models.users import User
+
+logger = logging.getLogger(__name__)
+
+# Entidade -> (modelo de origem, campo de data usado nos histogramas)
+ENTITIES = {
+    "servers": (Server, "created_at"),
+    "users": (User, "created_at"),
+    "operators": (Operator, "granted_at"),
+}
+
+GRANULARITIES = ("day", "month")
+
+
+def truncate(timestamp: datetime, granularity: str) -> datetime:
+    if granularity == "month":
+        return datetime(timestamp.year, timestamp.month, 1)
+    return datetime(timestamp.year, timestamp.month, timestamp.day)
+
+
+async def record(entity: str, timestamp: datetime, delta: int = 1):
+    """Atualiza os rollups diário e mensal de uma entidade (delta=-1 em exclusões)"""
+    operations = [
+        UpdateOne(
+            {"entity": entity, "granularity": granularity, "bucket": truncate(timestamp, granularity)},
+            {"$inc": {"total": delta}},
+            upsert=True,
+        )
+        for granularity in GRANULARITIES
+    ]
+    await Rollup.get_pymongo_collection().bulk_write(operations, ordered=False)
+
+
+async def backfill(entity: str):
+    """Recalcula os rollups de uma entidade a partir da coleção de origem.
+
+    Só pode rodar sem escritas concorrentes (migração 0004 e populate.py): o
+    $merge substitui os buckets, então um record feito durante o cálculo seria
+    perdido ou contado duas vezes.
+    """
+    model, field = ENTITIES[entity]
+    await Rollup.find(Rollup.entity == entity).delete()
+    for granularity in GRANULARITIES:
+        await model.aggregate([
+            {"$match": {field: {"$type": "date"}}},
+            {
+                "$group": {
+                    "_id": {"$dateTrunc": {"date": f"${field}", "unit": granularity}},
+                    "total": {"$sum": 1}
+                }
+            },
+            {
+                "$project": {
+                    "_id": 0,
+                    "entity": {"$literal": entity},
+                    "granularity": {"$literal": granularity},
+                    "bucket": "$_id",
+                    "total": 1
+                }
+            },
+            {
+                "$merge": {
+                    "into": Rollup.get_collection_name(),
+                    "on": ["entity", "granularity", "bucket"],
+                    "whenMatched": "replace",
+                    "whenNotMatched": "insert"
+                }
+            }
+        ]).to_list()
+    logger.info(f"Rollups de {entity} recalculados")
+
+
+async def histogram(entity: str, granularity: str = "month", start: datetime | None = None, end: datetime | None = None) -> list[dict]:
+    """Histograma a partir dos rollups, do período mais recente para o mais antigo"""
+    query = {"entity": entity, "granularity": granularity, "total": {"$gt": 0}}
+    if start or end:
+        query["bucket"] = {}
+        if start:
+            query["bucket"]["$gte"] = truncate(start, granularity)
+        if end:
+            query["bucket"]["$lt"] = end
+    rollups = await Rollup.find(query).sort([("bucket", -1)]).to_list()
+
+    result = []
+    for rollup in rollups:
+        period = {"year": rollup.bucket.year, "month": rollup.bucket.month}
+        if granularity == "day":
+            period["day"] = rollup.bucket.day
+        result.append({"_id": period, "count": rollup.total})
+    return result
+
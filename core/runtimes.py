@@ -0,0 +1,198 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import urllib.request
+import zipfile
+from datetime import datetime
+
+from core.config import settings
+from models.java_links import Java
+from models.servers import Server
+
+logger = logging.getLogger(__name__)
+
+MARKER = ".runtime.json"
+CHUNK_SIZE = 1 << 20
+
+
+class RuntimeInstallError(Exception):
+    pass
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", value)[:50]
+
+
+def _download(url: str, destination: str) -> str:
+    """Baixa `url` para `destination` e retorna o sha256 do conteúdo"""
+    digest = hashlib.sha256()
+    with urllib.request.urlopen(url, timeout=settings.runtime_download_timeout) as response, open(destination, "wb") as f:
+        while chunk := response.read(CHUNK_SIZE):
+            digest.update(chunk)
+            f.write(chunk)
+    return digest.hexdigest()
+
+
+def _extract(archive: str, destination: str):
+    if zipfile.is_zipfile(archive):
+        with zipfile.ZipFile(archive) as zf:
+            bad = zf.testzip()
+            if bad:
+                raise RuntimeInstallError(f"Arquivo corrompido no zip: {bad}")
+            for member in zf.namelist():
+                target = os.path.realpath(os.path.join(destination, member))
+                if not target.startswith(os.path.realpath(destination) + os.sep):
+                    raise RuntimeInstallError(f"Caminho inválido no zip: {member}")
+            zf.extractall(destination)
+            # zipfile não preserva o bit de execução
+            for info in zf.infolist():
+                mode = info.external_attr >> 16
+                if mode:
+                    os.chmod(os.path.join(destination, info.filename), mode & 0o7777)
+    elif tarfile.is_tarfile(archive):
+        with tarfile.open(archive) as tf:
+            tf.extractall(destination, filter="data")
+    else:
+        raise RuntimeInstallError("O link não aponta para um arquivo .zip ou .tar(.gz)")
+
+
+def _find_java(root: str) -> str:
+    """Caminho relativo do binário java dentro da instalação extraída"""
+    name = "java.exe" if os.name == "nt" else "java"
+    for directory, _, files in sorted(os.walk(root)):
+        if name in files and os.path.basename(directory) == "bin":
+            return os.path.relpath(os.path.join(directory, name), root)
+    raise RuntimeInstallError("bin/java não encontrado no arquivo baixado")
+
+
+class RuntimeManager:
+    """Cache compartilhado de JDKs, um diretório por documento Java.
+
+    Cada runtime é baixado e extraído uma única vez em
+    `<cache_dir>/<java_id>-<versão>`. Pedidos simultâneos para o mesmo Java
+    aguardam a mesma instalação, e a extração acontece em um diretório
+    temporário renomeado no final, para que outro processo nunca veja uma
+    instalação pela metade.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self._installing: dict[str, asyncio.Task] = {}
+
+    def directory(self, java: Java) -> str:
+        return os.path.join(self.cache_dir, f"{java.id}-{_slug(java.version)}")
+
+    def _read_marker(self, directory: str) -> dict | None:
+        try:
+            with open(os.path.join(directory, MARKER)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def path(self, java: Java) -> str | None:
+        """Binário java já instalado para esse documento (None se não instalado)"""
+        directory = self.directory(java)
+        marker = self._read_marker(directory)
+        if not marker or marker.get("link") != java.link:
+            return None
+        binary = os.path.join(directory, marker["java"])
+        return binary if os.access(binary, os.X_OK) else None
+
+    async def ensure(self, java: Java) -> str:
+        """Instala o runtime se necessário e retorna o caminho do binário java"""
+        binary = self.path(java)
+        if binary:
+            return binary
+        key = str(java.id)
+        task = self._installing.get(key)
+        if task is None:
+            task = asyncio.create_task(asyncio.to_thread(self._install, java))
+            self._installing[key] = task
+            task.add_done_callback(lambda _: self._installing.pop(key, None))
+        return await asyncio.shield(task)
+
+    def _install(self, java: Java) -> str:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        directory = self.directory(java)
+        staging = tempfile.mkdtemp(prefix=".install-", dir=self.cache_dir)
+        archive = os.path.join(staging, "download")
+        root = os.path.join(staging, "runtime")
+        try:
+            logger.info(f"Baixando {java.name} ({java.version}) de {java.link}")
+            digest = _download(java.link, archive)
+            if java.sha256 and digest != java.sha256.lower():
+                raise RuntimeInstallError(f"sha256 não confere: esperado {java.sha256}, obtido {digest}")
+            os.makedirs(root)
+            _extract(archive, root)
+            relative = _find_java(root)
+            with open(os.path.join(root, MARKER), "w") as f:
+                json.dump({
+                    "java_id": str(java.id),
+                    "version": java.version,
+                    "link": java.link,
+                    "sha256": digest,
+                    "java": relative,
+                    "installed_at": datetime.utcnow().isoformat(),
+                }, f)
+
+            # Substitui uma instalação antiga (link alterado) ou perde a corrida
+            # para outro processo que terminou antes
+            if os.path.exists(directory) and self.path(java) is None:
+                shutil.rmtree(directory, ignore_errors=True)
+            try:
+                os.rename(root, directory)
+            except OSError:
+                if self.path(java) is None:
+                    raise
+            logger.info(f"Runtime {java.name} instalado em {directory}")
+            return os.path.join(directory, relative)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def installed(self) -> list[dict]:
+        if not os.path.isdir(self.cache_dir):
+            return []
+        runtimes = []
+        for name in sorted(os.listdir(self.cache_dir)):
+            directory = os.path.join(self.cache_dir, name)
+            marker = self._read_marker(directory)
+            if marker:
+                runtimes.append({**marker, "directory": directory})
+        return runtimes
+
+    def stale(self, current: dict[str, Java]) -> list[dict]:
+        """Runtimes instalados que não correspondem a `current` (java_id -> documento).
+
+        Inclui os de documentos não referenciados e os de documentos cuja versão
+        foi editada depois da instalação (o diretório `<id>-<versão>` mudou).
+        """
+        stale = []
+        for runtime in self.installed():
+            if runtime["java_id"] in self._installing:
+                continue
+            java = current.get(runtime["java_id"])
+            if java and os.path.realpath(runtime["directory"]) == os.path.realpath(self.directory(java)):
+                continue
+            stale.append(runtime)
+        return stale
+
+    async def collect_garbage(self, dry_run: bool = False) -> list[dict]:
+        """Remove runtimes de documentos Java que nenhum servidor referencia ou que ficaram desatualizados"""
+        referenced = [java_id for java_id in await Server.distinct("java_id") if java_id]
+        current = {str(java.id): java for java in await Java.find({"_id": {"$in": referenced}}).to_list()}
+        removed = []
+        for runtime in self.stale(current):
+            removed.append(runtime)
+            if not dry_run:
+                await asyncio.to_thread(shutil.rmtree, runtime["directory"], True)
+                logger.info(f"Runtime removido: {runtime['directory']}")
+        return removed
+
+
+runtime_manager = RuntimeManager(settings.runtime_cache_dir)
@@ -2,39 +2,55 @@ import os
 import subprocess
 import urllib.request
 
+from core.config import settings
+
 # Só será implementado no TB3
 
+DEFAULT_SERVER_JAR_URL = "https://launcher.mojang.com/v1/objects/a028f00e678ee5c6aef0e29656dca091b5df11c7/server.jar"
+
 class Server:
-    """Classe para gerenciar um servidor de Minecraft."""
+    """Classe para gerenciar um servidor de Minecraft.
+
+    Todos os caminhos são relativos ao diretório do servidor (sem os.chdir),
+    para que várias instâncias possam ser operadas a partir de threads.
+    """
     def __init__(self, name, properties_dict=None):
         self.name = name
         self.version = "1.8"
-        self.path = name
+        self.path = os.path.join(settings.servers_dir, name)
         self.process = None
         self.running = False
         self.properties_dict = properties_dict
     
     @staticmethod
     def server_exists(name) -> bool:
-        return os.path.exists(name)
+        return os.path.exists(os.path.join(settings.servers_dir, name))
 
     def __enter__(self):
         os.makedirs(self.path, exist_ok=True)
-        os.chdir(self.path)
         return self
     
     def __exit__(self, exc_type, exc_value, traceback):
-        os.chdir("..")
         pass
 
-    def download_server_jar(self):
-        url = "https://launcher.mojang.com/v1/objects/a028f00e678ee5c6aef0e29656dca091b5df11c7/server.jar"
-        filename = "server.jar"
-        urllib.request.urlretrieve(url, filename)
+    def file_path(self, filename):
+        return os.path.join(self.path, filename)
+
+    def has_server_jar(self) -> bool:
+        return os.path.exists(self.file_path("server.jar"))
+
+    def download_server_jar(self, url=DEFAULT_SERVER_JAR_URL):
+        filename = self.file_path("server.jar")
+        # Baixa para um arquivo temporário para não deixar um jar incompleto
+        urllib.request.urlretrieve(url, filename + ".part")
+        os.replace(filename + ".part", filename)
 
-    def run_core(self):
+    def run_core(self, command=None):
+        command = command or ["java", "-jar", "server.jar", "nogui"]
+        # Só marca como rodando depois que o processo existe: um Popen que falha
+        # (java ausente, cwd inválido) não pode deixar running=True sem processo
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, text=True, cwd=self.path)
         self.running = True
-        self.process = subprocess.Popen(["java", "-jar", "server.jar", "nogui"], stdin=subprocess.PIPE, text=True)
 
     def stop_core(self):
         self.running = False
@@ -58,10 +74,10 @@ class Server:
             self.process.stdin.flush()
 
     def eula(self):
-        with open("eula.txt", "w") as f:
+        with open(self.file_path("eula.txt"), "w") as f:
             f.write("eula=true\n")
     
     def properties(self, properties_dict):
-        with open("server.properties", "w") as f:
+        with open(self.file_path("server.properties"), "w") as f:
             for key, value in properties_dict.items():
                 f.write(f"{key}={value}\n")
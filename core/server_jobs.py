@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+
+from core import backups, launch_profiles, map_imports, region_analyzer
+from core.catalog_cache import catalog_cache
+from core.config import settings
+from core.hibernation import hibernation
+from core.jobs import job_queue
+from core.runtimes import RuntimeInstallError, runtime_manager
+from core.property_templates import effective_properties
+from core.rcon import RconError, rcon
+from core.server import DEFAULT_SERVER_JAR_URL
+from core.status_buffer import status_buffer
+from core.supervisor import supervisor
+from models.backups import Backup
+from models.java_links import Java
+from models.minecraft_maps import MinecraftMap, RegionStats
+from models.jobs import Job
+from models.servers import Server
+from models.softwares import Softwares
+
+logger = logging.getLogger(__name__)
+
+# Handlers dos jobs de ciclo de vida. As operações de core.server.Server são
+# bloqueantes e rodam em threads para não prender o event loop.
+
+# Medições de startup em andamento (referência para as tasks não serem coletadas)
+_startup_probes: set[asyncio.Task] = set()
+
+
+async def _load_server(job: Job) -> Server:
+    server = await Server.get(job.server_id)
+    if not server:
+        raise ValueError("Servidor não encontrado")
+    return server
+
+
+async def _write_properties(server: Server):
+    properties = await effective_properties(server)
+    if not properties:
+        raise ValueError("Propriedades do servidor não encontradas")
+    core = supervisor.get(server.id)
+    with core:
+        await asyncio.to_thread(core.properties, properties.to_properties_file())
+    return properties
+
+
+async def _download(server: Server):
+    software = await Softwares.get(server.software_id)
+    url = software.link if software and software.link.endswith(".jar") else DEFAULT_SERVER_JAR_URL
+    core = supervisor.get(server.id)
+    with core:
+        await asyncio.to_thread(core.download_server_jar, url)
+
+
+async def _install_runtime(server: Server):
+    if not settings.runtime_auto_install:
+        return
+    java = await Java.get(server.java_id)
+    if not java:
+        return
+    try:
+        await runtime_manager.ensure(java)
+    except (RuntimeInstallError, OSError) as e:
+        # Sem o runtime do cache, o perfil usa JAVA_INSTALLATIONS/JAVA_DIR/PATH
+        logger.warning(f"Runtime {java.name} não instalado: {e}")
+
+
+def _set_status(server: Server, status: str):
+    status_buffer.record(server.id, status)
+
+
+@job_queue.handler("download")
+async def download_job(job: Job):
+    server = await _load_server(job)
+    await _download(server)
+    return {"server_jar": supervisor.get(server.id).file_path("server.jar")}
+
+
+@job_queue.handler("apply_properties")
+async def apply_properties_job(job: Job):
+    server = await _load_server(job)
+    await _write_properties(server)
+    return {"server_properties_id": str(server.server_properties_id)}
+
+
+@job_queue.handler("start")
+async def start_job(job: Job):
+    server = await _load_server(job)
+    core = supervisor.get(server.id)
+    if core.running:
+        return {"already_running": True}
+
+    # Um servidor hibernado tem o proxy ocupando a porta
+    await hibernation.close_proxy(server.id)
+    await _install_runtime(server)
+    spec, _ = await launch_profiles.resolve(server)
+    with core:
+        await asyncio.to_thread(core.eula)
+        if not core.has_server_jar():
+            await _download(server)
+        properties = await _write_properties(server)
+        started, started_at = time.monotonic(), datetime.utcnow()
+        await asyncio.to_thread(core.run_core, spec.command())
+    _set_status(server, "online")
+
+    # O tempo até o servidor aceitar conexões é medido em segundo plano
+    task = asyncio.create_task(launch_profiles.measure_startup(server.id, spec, properties.server_port, started, started_at))
+    _startup_probes.add(task)
+    task.add_done_callback(_startup_probes.discard)
+    return {"pid": core.process.pid, "gc": spec.gc, "xmx_mb": spec.xmx_mb, "java": spec.java_path}
+
+
+@job_queue.handler("stop")
+async def stop_job(job: Job):
+    server = await _load_server(job)
+    core = supervisor.get(server.id)
+    if hibernation.is_hibernating(server.id):
+        await hibernation.close_proxy(server.id)
+        _set_status(server, "offline")
+        return {"was_hibernating": True}
+    if not core.running:
+        return {"already_stopped": True}
+
+    if job.params.get("force"):
+        await asyncio.to_thread(core.kill_core)
+    else:
+        await asyncio.to_thread(core.stop_core)
+    _set_status(server, "offline")
+    return {"forced": bool(job.params.get("force"))}
+
+
+@job_queue.handler("hibernate")
+async def hibernate_job(job: Job):
+    server = await _load_server(job)
+    core = supervisor.get(server.id)
+    if not core.running:
+        return {"already_stopped": True}
+
+    properties = await effective_properties(server)
+    await asyncio.to_thread(core.stop_core)
+    if properties:
+        await hibernation.open_proxy(server.id, properties, job.params.get("version"))
+    _set_status(server, "hibernating" if hibernation.is_hibernating(server.id) else "offline")
+    return {"proxy_port": properties.server_port if properties else None}
+
+
+@job_queue.handler("install_runtime")
+async def install_runtime_job(job: Job):
+    java = await Java.get(job.params["java_id"])
+    if not java:
+        raise ValueError("Versão Java não encontrada")
+    return {"java": await runtime_manager.ensure(java)}
+
+
+async def _rcon_quiet(server: Server, command: str) -> bool:
+    try:
+        await rcon.execute(server, command)
+        return True
+    except (RconError, OSError, TimeoutError) as e:
+        logger.warning(f"RCON '{command}' falhou no servidor {server.id}: {e}")
+        return False
+
+
+@job_queue.handler("backup")
+async def backup_job(job: Job):
+    server = await _load_server(job)
+    world, level_name = await backups.world_path(server)
+    # Com o servidor rodando, o salvamento automático é pausado durante a
+    # leitura para não copiar regiões pela metade (melhor esforço via RCON)
+    paused = supervisor.get(server.id).running and await _rcon_quiet(server, "save-off")
+    try:
+        if paused:
+            await _rcon_quiet(server, "save-all flush")
+        backup = await backups.create_backup(server.id, world, level_name, server.map_id)
+    finally:
+        if paused:
+            await _rcon_quiet(server, "save-on")
+    return {
+        "backup_id": str(backup.id),
+        "files": backup.files,
+        "new_bytes": backup.new_bytes,
+        "stored_bytes": backup.stored_bytes,
+        "save_paused": paused,
+    }
+
+
+@job_queue.handler("restore")
+async def restore_job(job: Job):
+    server = await _load_server(job)
+    if supervisor.get(server.id).running or hibernation.is_hibernating(server.id):
+        raise ValueError("Pare o servidor antes de restaurar um backup")
+    backup = await Backup.get(job.params["backup_id"])
+    if not backup or backup.server_id != server.id:
+        raise ValueError("Backup não encontrado para este servidor")
+    world = os.path.join(supervisor.get(server.id).path, backup.level_name)
+    files = await backups.restore_backup(backup, world)
+    return {"backup_id": str(backup.id), "files": files, "world": world}
+
+
+@job_queue.handler("install_map")
+async def install_map_job(job: Job):
+    server = await _load_server(job)
+    if supervisor.get(server.id).running or hibernation.is_hibernating(server.id):
+        raise ValueError("Pare o servidor antes de instalar um mapa")
+    map_entry = await MinecraftMap.get(job.params["map_id"])
+    if not map_entry:
+        raise ValueError("Mapa não encontrado")
+    world, level_name = await backups.world_path(server)
+    result = await asyncio.to_thread(map_imports.install, map_entry.id, world)
+    await server.set({Server.map_id: map_entry.id})
+
+    # Chunks novos seguem region_file_compression; os do mapa ficam como estão
+    properties = await effective_properties(server)
+    stats = map_entry.region_stats
+    if properties and stats and stats.dominant_compression not in (None, properties.region_file_compression):
+        result["region_compression_mismatch"] = {
+            "map": stats.dominant_compression,
+            "server": properties.region_file_compression,
+        }
+    return {"map_id": str(map_entry.id), "world": world, **result}
+
+
+@job_queue.handler("analyze_map")
+async def analyze_map_job(job: Job):
+    map_entry = await MinecraftMap.get(job.params["map_id"])
+    if not map_entry:
+        raise ValueError("Mapa não encontrado")
+    directory = map_imports.map_directory(map_entry.id)
+    if not os.path.isdir(directory):
+        raise ValueError("Arquivos do mapa não encontrados")
+    stats = RegionStats(**await asyncio.to_thread(region_analyzer.analyze_world, directory))
+    await map_entry.set({MinecraftMap.region_stats: stats})
+    catalog_cache.put(map_entry)
+    return stats.model_dump(mode="json", exclude={"analyzed_at"})
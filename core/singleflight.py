@@ -0,0 +1,53 @@
+import asyncio
+import functools
+import json
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+
+def serialize(result) -> bytes:
+    """Serializa o resultado de uma rota para JSON (incluindo ObjectId de agregações)"""
+    return json.dumps(jsonable_encoder(result, custom_encoder={ObjectId: str})).encode()
+
+
+def _request_key(kwargs: dict) -> str:
+    return json.dumps(jsonable_encoder(kwargs, custom_encoder={ObjectId: str}), sort_keys=True)
+
+
+def single_flight(func):
+    """Coalesce chamadas concorrentes idênticas de uma rota.
+
+    Requisições com os mesmos parâmetros que chegam enquanto uma computação
+    está em andamento aguardam essa mesma computação e recebem o mesmo corpo
+    JSON já serializado. Usar abaixo do decorator da rota:
+
+        @router.get("/stats/summary")
+        @single_flight
+        async def get_summary(): ...
+    """
+    in_flight: dict[str, asyncio.Task] = {}
+
+    async def compute(*args, **kwargs) -> bytes:
+        return serialize(await func(*args, **kwargs))
+
+    def done(key: str, task: asyncio.Task):
+        in_flight.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # evita o aviso de exceção não consumida se ninguém aguardava
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        key = _request_key(kwargs)
+        task = in_flight.get(key)
+        if task is None:
+            # A computação roda em uma task própria, fora da requisição que a iniciou
+            task = in_flight[key] = asyncio.create_task(compute(*args, **kwargs))
+            task.add_done_callback(functools.partial(done, key))
+        # shield: o cancelamento de qualquer cliente (inclusive o primeiro) não
+        # cancela a computação compartilhada
+        body = await asyncio.shield(task)
+        return Response(content=body, media_type="application/json")
+
+    return wrapper
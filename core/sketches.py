@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from datetime import datetime
+
+from pymongo.errors import DuplicateKeyError
+
+from core import hyperloglog
+from models.operators import Operator
+from models.sketches import Sketch
+
+logger = logging.getLogger(__name__)
+
+# Sketch -> (modelo, campo cujos valores distintos são contados)
+SKETCHES = {
+    "operators.server_id": (Operator, "server_id"),
+    "operators.user_id": (Operator, "user_id"),
+}
+
+_ensured: set[str] = set()
+
+
+async def _scan(name: str) -> list[int]:
+    model, field = SKETCHES[name]
+    cursor = model.get_pymongo_collection().find({}, {field: 1, "_id": 0})
+    return hyperloglog.build([document.get(field) async for document in cursor])
+
+
+async def _ensure(name: str):
+    """Garante que o sketch existe e já contém os valores da coleção anteriores ao primeiro uso"""
+    if name in _ensured:
+        return
+    sketch = await Sketch.get_pymongo_collection().find_one({"name": name}, {"precision": 1, "seeded": 1})
+    if sketch and sketch.get("precision") != hyperloglog.PRECISION:
+        await rebuild(name)
+    elif not sketch or not sketch.get("seeded"):
+        await _seed(name)
+    _ensured.add(name)
+
+
+async def _seed(name: str):
+    """Cria o sketch e incorpora os valores existentes com $max.
+
+    Ao contrário do $set do rebuild, o $max comuta com `add` concorrentes:
+    nenhum valor registrado durante a varredura se perde.
+    """
+    collection = Sketch.get_pymongo_collection()
+    try:
+        await collection.insert_one({
+            "name": name,
+            "precision": hyperloglog.PRECISION,
+            "registers": [0] * hyperloglog.REGISTERS,
+            "seeded": False,
+            "rebuilt_at": datetime.utcnow(),
+        })
+    except DuplicateKeyError:
+        pass
+    registers = await _scan(name)
+    update = {"$set": {"seeded": True, "rebuilt_at": datetime.utcnow()}}
+    maxima = {f"registers.{index}": rank for index, rank in enumerate(registers) if rank}
+    if maxima:
+        update["$max"] = maxima
+    await collection.update_one({"name": name}, update)
+    logger.info(f"Sketch {name} inicializado a partir da coleção")
+
+
+async def add(name: str, value):
+    """Registra um valor no sketch. $max no registrador torna a atualização atômica."""
+    await _ensure(name)
+    index, rank = hyperloglog.register_for(value)
+    await Sketch.get_pymongo_collection().update_one(
+        {"name": name},
+        {"$max": {f"registers.{index}": rank}},
+    )
+
+
+async def cardinality(name: str) -> int:
+    await _ensure(name)
+    sketch = await Sketch.get_pymongo_collection().find_one({"name": name}, {"registers": 1})
+    return hyperloglog.estimate(sketch["registers"])
+
+
+async def rebuild(name: str) -> int:
+    """Recalcula o sketch a partir da coleção (necessário após exclusões, que o HLL não desfaz)"""
+    registers = await _scan(name)
+    await Sketch.get_pymongo_collection().update_one(
+        {"name": name},
+        {"$set": {
+            "precision": hyperloglog.PRECISION,
+            "registers": registers,
+            "seeded": True,
+            "rebuilt_at": datetime.utcnow(),
+        }},
+        upsert=True,
+    )
+    _ensured.add(name)
+    return hyperloglog.estimate(registers)
+
+
+async def main():
+    from database import init_db, close_db
+    import custom_logger
+
+    await init_db()
+    try:
+        for name in SKETCHES:
+            logger.info(f"{name}: ~{await rebuild(name)} valores distintos")
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import struct
+import time
+
+# Server List Ping (Minecraft 1.7+): handshake com next_state=1, status request
+# e ping/pong para medir a latência. Ver https://minecraft.wiki/w/Java_Edition_protocol/Server_List_Ping
+
+MAX_RESPONSE = 1 << 20
+
+
+class SlpError(Exception):
+    pass
+
+
+def pack_varint(value: int) -> bytes:
+    value &= 0xFFFFFFFF
+    result = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            result.append(byte | 0x80)
+        else:
+            result.append(byte)
+            return bytes(result)
+
+
+async def read_varint(reader: asyncio.StreamReader) -> int:
+    value = 0
+    for position in range(5):
+        (byte,) = await reader.readexactly(1)
+        value |= (byte & 0x7F) << (7 * position)
+        if not byte & 0x80:
+            return value - (1 << 32) if value & (1 << 31) else value
+    raise SlpError("VarInt muito longo")
+
+
+def pack_string(value: str) -> bytes:
+    data = value.encode("utf-8")
+    return pack_varint(len(data)) + data
+
+
+def pack_packet(packet_id: int, payload: bytes = b"") -> bytes:
+    data = pack_varint(packet_id) + payload
+    return pack_varint(len(data)) + data
+
+
+async def read_packet(reader: asyncio.StreamReader) -> tuple[int, bytes]:
+    length = await read_varint(reader)
+    if length <= 0 or length > MAX_RESPONSE:
+        raise SlpError(f"Pacote inválido ({length} bytes)")
+    data = await reader.readexactly(length)
+    # O id do pacote também é um VarInt, mas os usados aqui cabem em um byte
+    return data[0], data[1:]
+
+
+def unpack_varint(data: bytes, position: int = 0) -> tuple[int, int]:
+    """Lê um VarInt de `data`; retorna (valor, próxima posição)"""
+    value = 0
+    for shift in range(0, 35, 7):
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return (value - (1 << 32) if value & (1 << 31) else value), position
+    raise SlpError("VarInt muito longo")
+
+
+def unpack_string(data: bytes, position: int = 0) -> tuple[str, int]:
+    length, position = unpack_varint(data, position)
+    return data[position:position + length].decode("utf-8"), position + length
+
+
+async def _ping(host: str, port: int) -> dict:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        handshake = pack_varint(-1) + pack_string(host) + struct.pack(">H", port) + pack_varint(1)
+        writer.write(pack_packet(0x00, handshake) + pack_packet(0x00))
+        await writer.drain()
+        started = time.perf_counter()
+        packet_id, payload = await read_packet(reader)
+        if packet_id != 0x00:
+            raise SlpError(f"Resposta inesperada (pacote {packet_id:#x})")
+        status = json.loads(unpack_string(payload)[0])
+        latency = time.perf_counter() - started
+
+        # Alguns servidores não respondem ao ping: fica a latência do status
+        token = int(time.time() * 1000)
+        writer.write(pack_packet(0x01, struct.pack(">q", token)))
+        await writer.drain()
+        started = time.perf_counter()
+        try:
+            packet_id, payload = await asyncio.wait_for(read_packet(reader), timeout=latency * 4 + 0.5)
+            if packet_id == 0x01 and struct.unpack(">q", payload[:8])[0] == token:
+                latency = time.perf_counter() - started
+        except (TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+    players = status.get("players") or {}
+    return {
+        "players_online": players.get("online"),
+        "players_max": players.get("max"),
+        "version": (status.get("version") or {}).get("name"),
+        "latency_ms": round(latency * 1000),
+    }
+
+
+async def ping(host: str, port: int = 25565, timeout: float = 3.0) -> dict:
+    """Consulta o status de um servidor; levanta SlpError/OSError/TimeoutError se não responder"""
+    try:
+        return await asyncio.wait_for(_ping(host, port), timeout)
+    except (asyncio.IncompleteReadError, json.JSONDecodeError, UnicodeDecodeError, IndexError) as e:
+        raise SlpError(f"Resposta inválida: {e}") from e
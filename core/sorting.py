@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import time
+
+from beanie import Document
+from fastapi import HTTPException
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+INDEX_CACHE_TTL = 60  # segundos
+
+_index_cache: dict[str, tuple[float, list[list[str]]]] = {}
+_index_builds: dict[tuple, asyncio.Task] = {}
+
+
+async def index_keys(model: type[Document]) -> list[list[str]]:
+    """Campos (em ordem) de cada índice existente na coleção do modelo"""
+    name = model.get_collection_name()
+    cached = _index_cache.get(name)
+    if cached and time.monotonic() - cached[0] < INDEX_CACHE_TTL:
+        return cached[1]
+
+    info = await model.get_pymongo_collection().index_information()
+    keys = [[field for field, _ in index["key"]] for index in info.values()]
+    _index_cache[name] = (time.monotonic(), keys)
+    return keys
+
+
+def supports_sort(index: list[str], equality_fields: set[str], field: str, tiebreaker: bool = False) -> bool:
+    """Um índice atende a ordenação se o campo vem logo após um prefixo de filtros de igualdade.
+
+    Com `tiebreaker`, o campo precisa ser seguido de `_id`, para que o
+    desempate `(campo, _id)` também saia do índice sem SORT em memória.
+    """
+    for position, key in enumerate(index):
+        if key == field:
+            return not tiebreaker or index[position + 1:position + 2] == ["_id"]
+        if key not in equality_fields:
+            return False
+    return False
+
+
+def _build_index(model: type[Document], keys: tuple[str, ...]):
+    build_key = (model.get_collection_name(), keys)
+    if build_key in _index_builds:
+        return
+
+    async def build():
+        try:
+            await model.get_pymongo_collection().create_index([(key, 1) for key in keys])
+            _index_cache.pop(model.get_collection_name(), None)
+            logger.info(f"Índice de ordenação criado em {model.get_collection_name()}: {keys}")
+        except Exception as e:
+            logger.warning(f"Falha ao criar índice {keys}: {e}")
+            _index_builds.pop(build_key, None)
+
+    _index_builds[build_key] = asyncio.create_task(build())
+
+
+async def resolve_sort(
+    model: type[Document],
+    sortable: dict[str, str],
+    order_by: str,
+    desc: bool = False,
+    filters: dict | None = None,
+    filter_fields: list[str] | None = None,
+) -> list[tuple[str, int]]:
+    """Valida `order_by` e retorna a especificação de ordenação para `.sort()`.
+
+    Apenas campos declarados no modelo são aceitos. Ordenações sem índice que
+    as atenda são rejeitadas ou trocadas por `_id`, conforme
+    `settings.sort_unindexed_policy`, para evitar sorts em memória.
+    """
+    if order_by not in sortable:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Não é possível ordenar por '{order_by}'. Campos permitidos: {', '.join(sortable)}",
+        )
+
+    field = sortable[order_by]
+    direction = -1 if desc else 1
+    if field == "_id":
+        return [("_id", direction)]
+
+    equality_fields = {key for key, value in (filters or {}).items() if not isinstance(value, dict)}
+    indexes = await index_keys(model)
+
+    if any(supports_sort(index, equality_fields, field, tiebreaker=True) for index in indexes):
+        return [(field, direction), ("_id", direction)]
+
+    if settings.sort_auto_index:
+        # Cria em segundo plano o índice composto (filtros, ordenação, _id) usado por esta consulta
+        combined = tuple(key for key in (filter_fields or []) if key in equality_fields) + (field, "_id")
+        _build_index(model, combined)
+
+    if any(supports_sort(index, equality_fields, field) for index in indexes):
+        # Sem `_id` logo após o campo o desempate exigiria SORT em memória: fica só o campo
+        return [(field, direction)]
+
+    if settings.sort_unindexed_policy == "fallback":
+        logger.warning(f"Ordenação por '{order_by}' sem índice em {model.get_collection_name()}, usando _id")
+        return [("_id", direction)]
+
+    raise HTTPException(status_code=400, detail=f"Ordenação por '{order_by}' não possui índice")
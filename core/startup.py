@@ -0,0 +1,44 @@
+import importlib
+import importlib.util
+import logging
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+# Módulo -> segundos gastos no import (inclui dependências ainda não carregadas)
+IMPORT_TIMES: dict[str, float] = {}
+
+
+def timed_import(module_name: str):
+    """Importa na hora (routers precisam registrar as rotas) e só mede o tempo gasto"""
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    IMPORT_TIMES[module_name] = time.perf_counter() - start
+    return module
+
+
+def lazy_import(module_name: str):
+    """Adia o import de uma dependência pesada até o primeiro acesso a um atributo.
+
+    Usado para módulos que só parte das instâncias usa (ex.: numpy na
+    amostragem de métricas), tirando-os do tempo de startup.
+    """
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.find_spec(module_name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {module_name!r}", name=module_name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    loader.exec_module(module)
+    return module
+
+
+def log_import_times():
+    total = sum(IMPORT_TIMES.values())
+    slowest = sorted(IMPORT_TIMES.items(), key=lambda item: -item[1])[:5]
+    details = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in slowest)
+    logger.info(f"Imports dos routers: {total * 1000:.0f}ms ({details})")
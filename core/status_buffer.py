@@ -0,0 +1,121 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from beanie import PydanticObjectId
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from core.config import settings
+from core.user_profiles import sync_server_statuses
+from models.servers import Server
+
+logger = logging.getLogger(__name__)
+
+
+class StatusBuffer:
+    """Buffer write-behind para o status dos servidores.
+
+    Guarda só o último estado de cada servidor e grava tudo de uma vez com
+    bulk_write, a cada `flush_interval` segundos ou quando o buffer chega a
+    `flush_size` servidores. Leituras devem passar por `apply` para enxergar
+    os estados ainda não gravados. Depois de cada gravação o status também é
+    copiado para os perfis de usuário (read model de user_profiles).
+    """
+
+    def __init__(self, flush_interval: float, flush_size: int):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        # servidor -> (status, horário, outros campos)
+        self._pending: dict[PydanticObjectId, tuple[str, datetime, dict]] = {}
+        self._inflight: dict[PydanticObjectId, tuple[str, datetime, dict]] = {}
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Para o flush periódico e grava o que ainda estiver no buffer"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def record(self, server_id, status: str, at: datetime | None = None, **fields):
+        """Registra um novo estado; estados mais antigos que o atual são ignorados.
+
+        `fields` são outros campos do servidor gravados junto (ex.: players_online).
+        """
+        server_id = PydanticObjectId(server_id)
+        at = at or datetime.utcnow()
+        if at.tzinfo:
+            at = at.astimezone(timezone.utc).replace(tzinfo=None)
+        current = self.get(server_id)
+        if current and current[1] > at:
+            return
+        previous = self._pending.get(server_id)
+        self._pending[server_id] = (status, at, {**previous[2], **fields} if previous else fields)
+        if len(self._pending) >= self.flush_size:
+            self._wakeup.set()
+
+    def get(self, server_id) -> tuple[str, datetime, dict] | None:
+        server_id = PydanticObjectId(server_id)
+        return self._pending.get(server_id) or self._inflight.get(server_id)
+
+    def apply(self, server: Server) -> Server:
+        """Sobrepõe ao documento lido do banco o estado ainda não gravado"""
+        entry = self.get(server.id)
+        if entry and entry[1] >= server.updated_at:
+            server.status, server.updated_at = entry[:2]
+            for field, value in entry[2].items():
+                setattr(server, field, value)
+        return server
+
+    async def flush(self) -> int:
+        async with self._lock:
+            if not self._pending:
+                return 0
+            self._inflight, self._pending = self._pending, {}
+            operations = [
+                # O filtro em updated_at evita sobrescrever um estado mais novo
+                UpdateOne(
+                    {"_id": server_id, "updated_at": {"$lte": at}},
+                    {"$set": {**fields, "status": status, "updated_at": at}},
+                )
+                for server_id, (status, at, fields) in self._inflight.items()
+            ]
+            try:
+                await Server.get_pymongo_collection().bulk_write(operations, ordered=False)
+            except PyMongoError as e:
+                # Devolve ao buffer para a próxima tentativa (o update é idempotente)
+                logger.error(f"Falha ao gravar {len(operations)} status de servidores: {e}")
+                for server_id, (status, at, fields) in self._inflight.items():
+                    newer = self._pending.get(server_id)
+                    if newer:
+                        self._pending[server_id] = (newer[0], newer[1], {**fields, **newer[2]})
+                    else:
+                        self._pending[server_id] = (status, at, fields)
+                return 0
+            finally:
+                server_ids, self._inflight = list(self._inflight), {}
+            try:
+                # Lê o status gravado (o filtro em updated_at pode ter descartado parte do lote)
+                await sync_server_statuses(server_ids)
+            except PyMongoError as e:
+                logger.error(f"Falha ao atualizar o status nos perfis de {len(server_ids)} servidores: {e}")
+            return len(operations)
+
+
+status_buffer = StatusBuffer(settings.status_flush_interval, settings.status_flush_size)
@@ -0,0 +1,211 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from dataclasses import dataclass
+
+from beanie import PydanticObjectId
+from pymongo.errors import PyMongoError
+
+from core import slp
+from core.config import settings
+from core.status_buffer import status_buffer
+from models.servers import Server
+
+logger = logging.getLogger(__name__)
+
+# Status definidos fora do poller (manutenção manual, hibernação) que ele não sobrescreve
+PRESERVED_STATUSES = {"maintenance", "hibernating"}
+
+# Cada alvo criado recebe uma geração nova; entradas do heap de gerações
+# antigas (endereço alterado, servidor removido e readicionado) são descartadas
+_generations = itertools.count()
+
+
+@dataclass
+class Target:
+    server_id: PydanticObjectId
+    host: str
+    port: int
+    status: str
+    players_online: int | None = None
+    players_max: int | None = None
+    latency_ms: int | None = None
+    failures: int = 0
+    generation: int = 0
+
+
+class StatusPoller:
+    """Consulta periodicamente todos os servidores via Server List Ping.
+
+    Cada servidor tem o próximo horário agendado em um heap. Servidores
+    offline são consultados com intervalo crescente (até `max_interval`), e
+    todo intervalo recebe um jitter para espalhar a carga. Só mudanças são
+    gravadas, pelo buffer de status (bulk_write agrupado).
+    """
+
+    def __init__(self, interval: float, max_interval: float, jitter: float, concurrency: int, timeout: float):
+        self.interval = interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._targets: dict[PydanticObjectId, Target] = {}
+        self._schedule: list[tuple[float, int, PydanticObjectId]] = []
+        self._probes: set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self.probed = 0
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._refresh_loop()), asyncio.create_task(self._run())]
+
+    async def stop(self):
+        for task in self._tasks + list(self._probes):
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._probes, return_exceptions=True)
+        self._tasks = []
+
+    def next_interval(self, target: Target) -> float:
+        interval = min(self.interval * 2 ** target.failures, self.max_interval)
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def refresh(self):
+        """Sincroniza a lista de alvos com o banco (novos, removidos e endereços alterados)"""
+        documents = await Server.get_pymongo_collection().find(
+            {"is_active": True, "ip_address": {"$nin": [None, ""]}},
+            {"ip_address": 1, "port": 1, "status": 1, "players_online": 1, "players_max": 1, "latency_ms": 1},
+        ).to_list()
+        self.sync(documents)
+
+    def sync(self, documents: list[dict]):
+        """Substitui os alvos pelos `documents`; só alvos novos ou com endereço alterado são agendados"""
+        now = time.monotonic()
+        current = {}
+        for document in documents:
+            server_id = document["_id"]
+            target = self._targets.get(server_id)
+            if target and (target.host, target.port) == (document["ip_address"], document.get("port", 25565)):
+                if document.get("status") in PRESERVED_STATUSES or target.status in PRESERVED_STATUSES:
+                    target.status = document.get("status", target.status)
+                current[server_id] = target
+                continue
+            target = current[server_id] = Target(
+                server_id=server_id,
+                host=document["ip_address"],
+                port=document.get("port", 25565),
+                status=document.get("status", "offline"),
+                players_online=document.get("players_online"),
+                players_max=document.get("players_max"),
+                latency_ms=document.get("latency_ms"),
+                generation=next(_generations),
+            )
+            # Primeira consulta espalhada ao longo de um intervalo; a entrada do
+            # endereço antigo continua no heap, mas é ignorada pela geração
+            self._push(target, now + random.uniform(0, self.interval))
+        self._targets = current
+
+    def _push(self, target: Target, due: float):
+        heapq.heappush(self._schedule, (due, target.generation, target.server_id))
+        if self._schedule[0][1] == target.generation:
+            self._wakeup.set()  # novo primeiro da fila: o laço recalcula a espera
+
+    def _current(self, target: Target) -> bool:
+        return self._targets.get(target.server_id) is target
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except PyMongoError as e:
+                logger.error(f"Falha ao carregar os servidores para o poller: {e}")
+            await asyncio.sleep(settings.slp_refresh_interval)
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            while self._schedule and self._schedule[0][0] <= now:
+                _, generation, server_id = heapq.heappop(self._schedule)
+                target = self._targets.get(server_id)
+                if target is None or target.generation != generation:
+                    continue  # removido ou com endereço alterado desde o agendamento
+                await self._semaphore.acquire()
+                task = asyncio.create_task(self._probe(target))
+                self._probes.add(task)
+                task.add_done_callback(self._probes.discard)
+            delay = self._schedule[0][0] - time.monotonic() if self._schedule else 1.0
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=min(max(delay, 0.01), 1.0))
+            except TimeoutError:
+                pass
+
+    async def _probe(self, target: Target):
+        try:
+            try:
+                result = await slp.ping(target.host, target.port, self.timeout)
+            except (slp.SlpError, OSError, TimeoutError):
+                result = None
+            # O resultado de um endereço substituído durante a consulta é descartado
+            if self._current(target):
+                self.observe(target, result)
+        finally:
+            self._semaphore.release()
+            self.probed += 1
+            if self._current(target):
+                self._push(target, time.monotonic() + self.next_interval(target))
+
+    def observe(self, target: Target, result: dict | None):
+        """Atualiza o alvo e envia ao buffer só o que mudou"""
+        if result is None:
+            target.failures += 1
+            status, changes = "offline", {"players_online": None, "latency_ms": None}
+        else:
+            target.failures = 0
+            status = "online"
+            changes = {"players_online": result["players_online"], "players_max": result["players_max"]}
+            # Oscilações pequenas de latência não justificam uma escrita
+            if target.latency_ms is None or abs(result["latency_ms"] - target.latency_ms) > settings.slp_latency_delta_ms:
+                changes["latency_ms"] = result["latency_ms"]
+
+        if target.status in PRESERVED_STATUSES:
+            status = target.status
+        changes = {field: value for field, value in changes.items() if getattr(target, field) != value}
+        if status == target.status and not changes:
+            return
+        target.status = status
+        for field, value in changes.items():
+            setattr(target, field, value)
+        status_buffer.record(target.server_id, status, **changes)
+
+
+status_poller = StatusPoller(
+    settings.slp_interval,
+    settings.slp_max_interval,
+    settings.slp_jitter,
+    settings.slp_concurrency,
+    settings.slp_timeout,
+)
+
+
+async def main():
+    """Executa o poller em um processo separado da API"""
+    from database import init_db, close_db
+
+    await init_db()
+    status_buffer.start()
+    status_poller.start()
+    try:
+        while True:
+            await asyncio.sleep(60)
+            logger.info(f"{status_poller.probed} consultas, {len(status_poller._targets)} servidores")
+    finally:
+        await status_poller.stop()
+        await status_buffer.stop()
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
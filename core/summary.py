@@ -0,0 +1,64 @@
+from beanie import Document
+
+
+class SummaryBuilder:
+    """Compila as métricas de um endpoint de resumo em uma única agregação $facet.
+
+    Cada métrica vira um sub-pipeline do $facet, de forma que o endpoint faz um
+    round-trip e uma passada pela coleção, em vez de uma consulta por métrica.
+
+        summary = SummaryBuilder(Softwares)
+        summary.count("total")
+        summary.count("with_plugins", {"plugins_enabled": True})
+        result = await summary.run()
+
+    Com `sample_size` as métricas são calculadas sobre uma amostra aleatória
+    ($sample) em vez da coleção inteira.
+    """
+
+    def __init__(self, model: type[Document], sample_size: int | None = None):
+        self.model = model
+        self.sample_size = sample_size
+        self._facets: dict[str, list[dict]] = {}
+        self._post = {}
+
+    def facet(self, name: str, pipeline: list[dict], post=None):
+        """Adiciona um sub-pipeline arbitrário; `post` converte a lista de resultados"""
+        self._facets[name] = pipeline
+        self._post[name] = post or (lambda items: items)
+        return self
+
+    def count(self, name: str, match: dict | None = None):
+        pipeline = [{"$match": match}] if match else []
+        pipeline.append({"$count": "n"})
+        return self.facet(name, pipeline, lambda items: items[0]["n"] if items else 0)
+
+    def group_count(self, name: str, field: str):
+        """Contagem por valor de um campo, em ordem decrescente: {valor: contagem}"""
+        pipeline = [
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1}},
+        ]
+        return self.facet(name, pipeline, lambda items: {item["_id"]: item["count"] for item in items})
+
+    def distinct_count(self, name: str, field: str):
+        pipeline = [{"$group": {"_id": f"${field}"}}, {"$count": "n"}]
+        return self.facet(name, pipeline, lambda items: items[0]["n"] if items else 0)
+
+    def stats(self, name: str, accumulators: dict[str, dict], default: dict | None = None):
+        """Acumuladores sobre a coleção inteira, ex.: {"avg_size": {"$avg": "$size_mb"}}"""
+        pipeline = [
+            {"$group": {"_id": None, **accumulators}},
+            {"$project": {"_id": 0}},
+        ]
+        empty = default if default is not None else {key: 0 for key in accumulators}
+        return self.facet(name, pipeline, lambda items: items[0] if items else empty)
+
+    def pipeline(self) -> list[dict]:
+        sample = [{"$sample": {"size": self.sample_size}}] if self.sample_size else []
+        return [*sample, {"$facet": self._facets}]
+
+    async def run(self) -> dict:
+        result = await self.model.aggregate(self.pipeline()).to_list(1)
+        facets = result[0] if result else {}
+        return {name: post(facets.get(name, [])) for name, post in self._post.items()}
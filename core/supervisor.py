@@ -0,0 +1,24 @@
+from core.server import Server
+
+
+class Supervisor:
+    """Registro dos servidores de Minecraft supervisionados por este processo.
+
+    Mantém uma instância de core.server.Server por servidor, para que jobs
+    diferentes (start, stop, comandos) operem sobre o mesmo processo.
+    """
+
+    def __init__(self):
+        self._servers: dict[str, Server] = {}
+
+    def get(self, server_id) -> Server:
+        key = str(server_id)
+        if key not in self._servers:
+            self._servers[key] = Server(key)
+        return self._servers[key]
+
+    def running(self) -> dict[str, Server]:
+        return {key: server for key, server in self._servers.items() if server.running and server.process}
+
+
+supervisor = Supervisor()
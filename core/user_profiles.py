@@ -0,0 +1,156 @@
+import asyncio
+import logging
+
+from beanie import PydanticObjectId
+from pymongo import UpdateMany
+
+from models.operators import Operator
+from models.servers import Server
+from models.user_profiles import OperatorRoleSummary, OwnedServerSummary, UserProfile
+from models.users import User
+
+logger = logging.getLogger(__name__)
+
+
+async def build_user_profile(user: User) -> UserProfile:
+    """Monta o perfil denormalizado de um usuário a partir das coleções de origem"""
+    owned = await Server.find(Server.owner_id == user.id).to_list()
+    roles = await Operator.find(Operator.user_id == user.id).to_list()
+
+    role_server_ids = list({role.server_id for role in roles})
+    role_servers = {
+        server.id: server
+        for server in await Server.find({"_id": {"$in": role_server_ids}}).to_list()
+    }
+
+    owned_servers = [
+        OwnedServerSummary(
+            server_id=server.id,
+            name=server.name,
+            status=server.status,
+            ip_address=server.ip_address,
+            port=server.port,
+            created_at=server.created_at,
+        )
+        for server in owned
+    ]
+    operator_roles = []
+    for role in roles:
+        server = role_servers.get(role.server_id)
+        operator_roles.append(OperatorRoleSummary(
+            server_id=role.server_id,
+            server_name=server.name if server else None,
+            server_status=server.status if server else None,
+            permission_level=role.permission_level,
+            granted_at=role.granted_at,
+        ))
+
+    return UserProfile(
+        user_id=user.id,
+        username=user.username,
+        email=user.email,
+        created_at=user.created_at,
+        owned_servers_count=len(owned_servers),
+        operator_roles_count=len(operator_roles),
+        owned_servers=owned_servers,
+        operator_roles=operator_roles,
+    )
+
+
+async def refresh_user_profile(user_id: PydanticObjectId) -> UserProfile | None:
+    """Recalcula e grava o perfil de um usuário. Remove o perfil se o usuário não existe mais."""
+    existing = await UserProfile.find_one(UserProfile.user_id == user_id)
+    user = await User.get(user_id)
+    if not user:
+        if existing:
+            await existing.delete()
+        return None
+
+    profile = await build_user_profile(user)
+    if existing:
+        profile.id = existing.id
+    await profile.save()
+    return profile
+
+
+async def refresh_user_profiles(user_ids):
+    for user_id in {PydanticObjectId(user_id) for user_id in user_ids if user_id}:
+        await refresh_user_profile(user_id)
+
+
+async def refresh_profiles_for_server(server_id: PydanticObjectId, *extra_user_ids):
+    """Atualiza os perfis afetados por uma escrita em um servidor (dono e operadores)"""
+    user_ids = set(extra_user_ids)
+    server = await Server.get(server_id)
+    if server:
+        user_ids.add(server.owner_id)
+    operators = await Operator.find(Operator.server_id == server_id).to_list()
+    user_ids.update(operator.user_id for operator in operators)
+    # Perfis que ainda referenciam o servidor (ex.: servidor excluído ou dono alterado)
+    stale = await UserProfile.find({
+        "$or": [
+            {"owned_servers.server_id": server_id},
+            {"operator_roles.server_id": server_id},
+        ]
+    }).to_list()
+    user_ids.update(profile.user_id for profile in stale)
+    await refresh_user_profiles(user_ids)
+
+
+async def sync_server_statuses(server_ids) -> int:
+    """Copia o status atual dos servidores para os resumos nos perfis, em um único bulk_write.
+
+    Usado após gravações em lote de status (buffer de status), em que
+    recalcular o perfil inteiro de cada dono e operador seria caro demais.
+    """
+    servers = await Server.get_pymongo_collection().find(
+        {"_id": {"$in": list(server_ids)}}, {"status": 1}
+    ).to_list()
+    operations = []
+    for server in servers:
+        server_id, status = server["_id"], server.get("status")
+        operations += [
+            UpdateMany(
+                {"owned_servers": {"$elemMatch": {"server_id": server_id, "status": {"$ne": status}}}},
+                {"$set": {"owned_servers.$[server].status": status}},
+                array_filters=[{"server.server_id": server_id}],
+            ),
+            UpdateMany(
+                {"operator_roles": {"$elemMatch": {"server_id": server_id, "server_status": {"$ne": status}}}},
+                {"$set": {"operator_roles.$[role].server_status": status}},
+                array_filters=[{"role.server_id": server_id}],
+            ),
+        ]
+    if not operations:
+        return 0
+    result = await UserProfile.get_pymongo_collection().bulk_write(operations, ordered=False)
+    return result.modified_count
+
+
+async def rebuild_user_profiles() -> int:
+    """Reconstrói todos os perfis (backfill)"""
+    count = 0
+    async for user in User.find_all():
+        await refresh_user_profile(user.id)
+        count += 1
+
+    # Perfis órfãos de usuários excluídos
+    user_ids = await User.get_pymongo_collection().distinct("_id")
+    await UserProfile.find({"user_id": {"$nin": user_ids}}).delete()
+    return count
+
+
+async def main():
+    from database import init_db, close_db
+    import custom_logger
+
+    await init_db()
+    try:
+        count = await rebuild_user_profiles()
+        logger.info(f"{count} perfis de usuário reconstruídos")
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
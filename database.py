@@ -4,7 +4,9 @@ from beanie import init_beanie
 import os
 import logging
 
-from models import java_links, minecraft_maps, operators, servers_properties, servers, softwares, users
+from core.config import settings
+from core.index_advisor import query_recorder
+from models import java_links, minecraft_maps, operators, servers_properties, servers, softwares, users, user_profiles, jobs, rollups, sketches, migrations, nodes, launch_profiles, backups, server_metrics
 
 load_dotenv()
 DATABASE_URL = os.getenv("MONGODB_URL")
@@ -15,28 +17,53 @@ logger.setLevel(logging.INFO)
 
 _client: AsyncMongoClient | None = None
 
-async def init_db():
+DOCUMENT_MODELS = [
+    java_links.Java, 
+    minecraft_maps.MinecraftMap,
+    operators.Operator,
+    servers_properties.ServersProperties,
+    servers.Server,
+    softwares.Softwares,
+    users.User,
+    user_profiles.UserProfile,
+    jobs.Job,
+    rollups.Rollup,
+    sketches.Sketch,
+    migrations.MigrationRecord,
+    nodes.Node,
+    launch_profiles.LaunchProfile,
+    backups.Backup,
+    backups.BackupFile,
+    server_metrics.ServerMetric,
+    server_metrics.ServerMetricRollup
+]
+
+async def init_db(create_indexes: bool | None = None):
+    """Conecta ao MongoDB e inicializa o Beanie.
+
+    Por padrão não cria índices: isso fica a cargo de `python manage.py migrate`,
+    para que o startup não dependa do tamanho das coleções.
+    """
     global _client
-    _client = AsyncMongoClient(DATABASE_URL)
+    if create_indexes is None:
+        create_indexes = settings.startup_create_indexes
+    event_listeners = [query_recorder] if settings.index_advisor_enabled else []
+    _client = AsyncMongoClient(DATABASE_URL, event_listeners=event_listeners)
     logger.info(f"Using DATABASE_URL: {DATABASE_URL}")
     db = _client[DBNAME]
 
     await init_beanie(
         database=db,
-        document_models=[
-            java_links.Java, 
-            minecraft_maps.MinecraftMap,
-            operators.Operator,
-            servers_properties.ServersProperties,
-            servers.Server,
-            softwares.Softwares,
-            users.User
-        ],
+        document_models=DOCUMENT_MODELS,
+        skip_indexes=not create_indexes,
     )
 
+def get_database():
+    return _client[DBNAME]
+
 async def close_db():
     global _client
     if _client is not None:
-        _client.close()
+        await _client.close()
         logger.info(f"Closed DATABASE_URL: {DATABASE_URL}")
         _client = None
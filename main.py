@@ -1,7 +1,17 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from contextlib import asynccontextmanager
-from routers import home, java_links, minecraft_maps, server_operators, servers, servers_properties, softwares, users
 from database import init_db, close_db
+from core.catalog_cache import catalog_cache
+from core.jobs import job_queue
+from core.status_buffer import status_buffer
+from core.rcon import rcon
+from core.status_poller import status_poller
+from core.hibernation import hibernation
+from core.resource_sampler import resource_sampler
+from core.admission import admission
+from core.config import settings
+import core.server_jobs  # registra os handlers de ciclo de vida
+from core.startup import timed_import, log_import_times
 from fastapi_pagination import add_pagination
 import time
 import logging
@@ -11,8 +21,26 @@ logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    log_import_times()
     await init_db()
+    # Catálogos carregam em segundo plano; fetch consulta o banco até terminar
+    await catalog_cache.start(background=True)
+    status_buffer.start()
+    if settings.slp_enabled:
+        status_poller.start()
+    await job_queue.start()
+    if settings.hibernation_enabled:
+        await hibernation.start()
+    if settings.metrics_enabled:
+        resource_sampler.start()
     yield
+    await resource_sampler.stop()
+    await hibernation.stop()
+    await status_poller.stop()
+    await job_queue.stop()
+    await status_buffer.stop()
+    await rcon.close()
+    await catalog_cache.stop()
     await close_db()
 
 # FastAPI app instance
@@ -20,7 +48,10 @@ app = FastAPI(
     title="Alternos",
     description="API para gerenciamento de servidores de Minecraft usando FastAPI e MongoDB",
     version="2.0.0",
-    lifespan=lifespan)
+    lifespan=lifespan,
+    # Admissão roda depois do roteamento (balde pelo template da rota); o 429
+    # vira resposta dentro do log_requests, então recusas também são logadas
+    dependencies=[Depends(admission.admit)] if settings.admission_enabled else [])
 
 @app.middleware("http")
 async def log_requests(request, call_next):
@@ -31,13 +62,22 @@ async def log_requests(request, call_next):
     logger.info(await custom_logger.middle_logger(request, response, process_time))
     return response
 
-# Incluindo rotas
-app.include_router(home.router)
-app.include_router(users.router)
-app.include_router(java_links.router)
-app.include_router(minecraft_maps.router)
-app.include_router(server_operators.router)
-app.include_router(servers.router)
-app.include_router(servers_properties.router)
-app.include_router(softwares.router)
+# Incluindo rotas (o tempo de import de cada módulo é registrado no startup)
+ROUTERS = [
+    "home",
+    "users",
+    "backups",
+    "java_links",
+    "jobs",
+    "launch_profiles",
+    "nodes",
+    "minecraft_maps",
+    "server_operators",
+    "servers",
+    "servers_properties",
+    "softwares",
+    "admin",
+]
+for router_name in ROUTERS:
+    app.include_router(timed_import(f"routers.{router_name}").router)
 add_pagination(app)
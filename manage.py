@@ -0,0 +1,90 @@
+import argparse
+import asyncio
+import logging
+import subprocess
+import sys
+
+import custom_logger
+
+logger = logging.getLogger(__name__)
+
+
+async def migrate(target: int | None, status: bool):
+    """Executa as migrações pendentes e cria os índices declarados nos modelos"""
+    from database import DOCUMENT_MODELS, init_db, close_db
+    from core.migrations import migration_status, run_migrations, sync_indexes
+
+    await init_db()
+    try:
+        if status:
+            for migration in await migration_status():
+                print(f"{migration['version']:04d} {migration['status']:<10} "
+                      f"{migration['processed']}/{migration['total']}  {migration['name']}")
+            return
+        await run_migrations(target)
+        await sync_indexes(DOCUMENT_MODELS)
+    finally:
+        await close_db()
+
+
+def importtime(limit: int):
+    """Mostra os módulos com maior tempo de import acumulado ao importar a aplicação"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, module = line.removeprefix("import time:").split("|")
+        rows.append((int(cumulative), int(own), module.strip()))
+    total = max((row[0] for row in rows), default=0)
+    print(f"{'acumulado (ms)':>15} {'próprio (ms)':>13}  módulo")
+    for cumulative, own, module in sorted(rows, reverse=True)[:limit]:
+        print(f"{cumulative / 1000:>15.1f} {own / 1000:>13.1f}  {module}")
+    print(f"Total: {total / 1000:.1f} ms")
+
+
+def placement_sim(nodes: int, cpu: float, memory: int, ports: int, servers: int, seed: int | None, mode: str):
+    """Simula a alocação de uma frota sintética em nodes idênticos"""
+    from core.placement import simulate
+
+    specs = [{"name": f"node-{i}", "cpu_cores": cpu, "memory_mb": memory, "ports": ports} for i in range(nodes)]
+    report = simulate(specs, servers, seed, mode)
+    for node in report["nodes"]:
+        print(f"{node['node']:<12} cpu {node['cpu']:>12}  mem {node['memory_mb']:>14}  "
+              f"portas {node['ports_used']:>5}  ocupação {node['dominant_share']:.0%}")
+    print(f"Alocados: {report['placed']}/{report['servers']}  sem lugar: {report['unplaced']}  "
+          f"nodes usados: {report['nodes_used']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comandos administrativos da API Alternos")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subcommands.add_parser("migrate", help="executa migrações e cria os índices dos modelos")
+    migrate_parser.add_argument("--to", type=int, default=None, help="versão máxima a aplicar")
+    migrate_parser.add_argument("--status", action="store_true", help="lista as migrações e seu progresso")
+    importtime_parser = subcommands.add_parser("importtime", help="mede o tempo de import por módulo")
+    importtime_parser.add_argument("--limit", type=int, default=20)
+    sim_parser = subcommands.add_parser("placement-sim", help="simula o bin packing de servidores em nodes")
+    sim_parser.add_argument("--nodes", type=int, default=10)
+    sim_parser.add_argument("--cpu", type=float, default=16)
+    sim_parser.add_argument("--memory", type=int, default=65536, help="MB por node")
+    sim_parser.add_argument("--ports", type=int, default=100, help="portas por node")
+    sim_parser.add_argument("--servers", type=int, default=200)
+    sim_parser.add_argument("--seed", type=int, default=None)
+    sim_parser.add_argument("--mode", choices=["online", "pack"], default="online")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        asyncio.run(migrate(args.to, args.status))
+    elif args.command == "importtime":
+        importtime(args.limit)
+    elif args.command == "placement-sim":
+        placement_sim(args.nodes, args.cpu, args.memory, args.ports, args.servers, args.seed, args.mode)
+
+
+if __name__ == "__main__":
+    main()
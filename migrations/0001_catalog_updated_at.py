@@ -0,0 +1,17 @@
+from datetime import datetime
+
+VERSION = 1
+NAME = "Preenche updated_at nos catálogos (usado pelo polling do cache de catálogos)"
+
+
+async def run(ctx):
+    from models.java_links import Java
+    from models.minecraft_maps import MinecraftMap
+    from models.softwares import Softwares
+
+    for model in (Java, Softwares, MinecraftMap):
+        await ctx.rewrite(
+            model.get_pymongo_collection(),
+            {"updated_at": {"$exists": False}},
+            lambda document: {"$set": {"updated_at": document.get("created_at") or datetime.utcnow()}},
+        )
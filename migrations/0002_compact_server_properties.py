@@ -0,0 +1,18 @@
+VERSION = 2
+NAME = "Compacta server_properties removendo campos iguais ao padrão da versão"
+
+
+async def run(ctx):
+    from core.config import settings
+    from models.servers_properties import PINNED_FIELDS, PROPERTIES_DEFAULTS, ServersProperties
+
+    collection = ServersProperties.get_pymongo_collection()
+    # Documentos antigos estão completos: basta marcar a versão dos padrões
+    await ctx.update_many(collection, {"defaults_version": {"$exists": False}}, {"$set": {"defaults_version": 1}})
+    if not settings.properties_compact_storage:
+        return
+
+    for field, default in PROPERTIES_DEFAULTS[1].items():
+        if field in PINNED_FIELDS:
+            continue
+        await ctx.update_many(collection, {field: default, "defaults_version": 1}, {"$unset": {field: ""}})
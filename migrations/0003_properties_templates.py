@@ -0,0 +1,48 @@
+import asyncio
+
+from pymongo import UpdateOne
+
+VERSION = 3
+NAME = "Deduplica server_properties em templates com content_hash"
+
+
+async def run(ctx):
+    from core.config import settings
+    from core.property_templates import content_hash
+    from models.servers import Server
+    from models.servers_properties import ServersProperties
+
+    # Todas as etapas são idempotentes: uma execução interrompida é refeita do início
+    properties = ServersProperties.get_pymongo_collection()
+    servers = Server.get_pymongo_collection()
+
+    canonical = {}
+    hashes = {}
+    duplicates = []
+    async for document in properties.find({}).sort("_id", 1):
+        digest = content_hash(ServersProperties.model_validate(document))
+        if digest in canonical:
+            duplicates.append((document["_id"], canonical[digest]))
+        else:
+            canonical[digest] = document["_id"]
+            if document.get("content_hash") != digest:
+                hashes[document["_id"]] = digest
+
+    for position, (duplicate_id, template_id) in enumerate(duplicates, 1):
+        await servers.update_many(
+            {"server_properties_id": duplicate_id},
+            {"$set": {"server_properties_id": template_id}},
+        )
+        await properties.delete_one({"_id": duplicate_id})
+        if position % settings.migration_batch_size == 0:
+            await asyncio.sleep(settings.migration_pause_seconds)
+
+    operations = [
+        UpdateOne({"_id": properties_id}, {"$set": {"content_hash": digest}})
+        for properties_id, digest in hashes.items()
+    ]
+    for start in range(0, len(operations), settings.migration_batch_size):
+        await properties.bulk_write(operations[start:start + settings.migration_batch_size], ordered=False)
+        await asyncio.sleep(settings.migration_pause_seconds)
+
+    await ctx.update_many(servers, {"properties_overrides": {"$exists": False}}, {"$set": {"properties_overrides": {}}})
@@ -0,0 +1,11 @@
+VERSION = 4
+NAME = "Calcula os rollups dos histogramas a partir das coleções de origem"
+
+
+async def run(ctx):
+    from core import rollups
+
+    # Roda no `manage.py migrate`, antes da API aceitar escritas: depois disso os
+    # rollups são mantidos só pelo record das rotas. Idempotente (recalcula tudo).
+    for entity in rollups.ENTITIES:
+        await rollups.backfill(entity)
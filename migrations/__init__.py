@@ -0,0 +1,2 @@
+# Migrações versionadas executadas por `python manage.py migrate` (ver core/migrations.py).
+# Cada módulo NNNN_nome.py define VERSION, NAME e `async def run(ctx)`.
@@ -6,6 +6,15 @@ from .softwares import Softwares
 from .servers import Server
 from .operators import Operator
 from .minecraft_maps import MinecraftMap
+from .user_profiles import UserProfile
+from .jobs import Job
+from .rollups import Rollup
+from .sketches import Sketch
+from .migrations import MigrationRecord
+from .nodes import Node
+from .launch_profiles import LaunchProfile
+from .backups import Backup, BackupFile
+from .server_metrics import ServerMetric, ServerMetricRollup
 
 __all__ = [
     "User",
@@ -14,5 +23,16 @@ __all__ = [
     "Softwares",
     "Server",
     "Operator",
-    "MinecraftMap"
+    "MinecraftMap",
+    "UserProfile",
+    "Job",
+    "Rollup",
+    "Sketch",
+    "MigrationRecord",
+    "Node",
+    "LaunchProfile",
+    "Backup",
+    "BackupFile",
+    "ServerMetric",
+    "ServerMetricRollup"
 ]
\ No newline at end of file
@@ -0,0 +1,49 @@
+from beanie import Document
+from beanie.odm.fields import PydanticObjectId
+from pydantic import BaseModel, Field
+from pymongo import IndexModel
+from datetime import datetime
+
+class Backup(Document):
+    """Backup de um mundo; os arquivos ficam em BackupFile e os chunks no store"""
+    server_id: PydanticObjectId = Field(..., description="ID do servidor")
+    map_id: PydanticObjectId | None = Field(None, description="Mapa do servidor no momento do backup")
+    level_name: str
+    parent_id: PydanticObjectId | None = Field(None, description="Backup anterior usado como base incremental")
+    status: str = Field(default="running", description="running, completed, failed")
+    files: int = Field(default=0)
+    total_bytes: int = Field(default=0, description="Tamanho do mundo")
+    new_bytes: int = Field(default=0, description="Bytes lidos de arquivos alterados")
+    new_chunks: int = Field(default=0)
+    stored_bytes: int = Field(default=0, description="Bytes comprimidos gravados no store")
+    error: str | None = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    heartbeat_at: datetime = Field(default_factory=datetime.utcnow, description="Lease do backup em andamento")
+    finished_at: datetime | None = None
+    
+    class Settings:
+        name = "backups"
+        indexes = [
+            IndexModel([("server_id", 1), ("created_at", -1)]),
+            "status",
+        ]
+
+class BackupFile(Document):
+    """Manifesto de um arquivo dentro de um backup"""
+    backup_id: PydanticObjectId
+    path: str = Field(..., description="Caminho relativo ao diretório do mundo")
+    size: int
+    mtime_ns: int
+    mode: int
+    chunks: list[bytes] = Field(default_factory=list, description="sha256 dos chunks, em ordem")
+    
+    class Settings:
+        name = "backup_files"
+        indexes = [
+            IndexModel([("backup_id", 1), ("path", 1)], unique=True),
+        ]
+
+class BackupFileSummary(BaseModel):
+    path: str
+    size: int
+    mtime_ns: int
@@ -2,20 +2,25 @@ from beanie import Document, Link
 from beanie.odm.fields import PydanticObjectId
 from pydantic import Field
 from pydantic import BaseModel
+from datetime import datetime
 
 class Java(Document):
     name: str = Field(..., min_length=1, max_length=100)
     version: str = Field(..., min_length=1, max_length=50)
     link: str = Field(..., min_length=1, max_length=200)
+    sha256: str | None = Field(None, min_length=64, max_length=64, description="Checksum do arquivo do runtime (opcional)")
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
     
     class Settings:
         name = "java_versions"
         indexes = [
             "name",
             "version",
+            "updated_at",
         ]
 
 class JavaCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=50, description="Nome da Versão")
     version: str = Field(..., min_length=1, max_length=20, description="Número da Versão")
     link: str = Field(..., min_length=1, max_length=200, description="Link da instalação")
+    sha256: str | None = Field(None, min_length=64, max_length=64, description="Checksum do arquivo do runtime")
@@ -0,0 +1,35 @@
+from beanie import Document
+from beanie.odm.fields import PydanticObjectId
+from pydantic import Field
+from pymongo import IndexModel
+from datetime import datetime
+
+class Job(Document):
+    type: str = Field(..., description="Tipo do job (start, stop, download, apply_properties)")
+    server_id: PydanticObjectId | None = Field(None, description="ID do servidor alvo")
+    host: str = Field(..., description="Host responsável pela execução")
+    status: str = Field(default="queued", description="Status do job (queued, running, succeeded, failed)")
+    idempotency_key: str | None = Field(None, max_length=200)
+    params: dict = Field(default_factory=dict)
+    result: dict | None = None
+    error: str | None = None
+    attempts: int = Field(default=0)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    
+    class Settings:
+        name = "jobs"
+        indexes = [
+            IndexModel(
+                [("idempotency_key", 1)],
+                unique=True,
+                partialFilterExpression={"idempotency_key": {"$type": "string"}},
+            ),
+            IndexModel([("host", 1), ("status", 1), ("created_at", 1)]),
+            "server_id",
+        ]
+    
+    model_config = {
+        "arbitrary_types_allowed": True
+    }
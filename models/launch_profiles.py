@@ -0,0 +1,41 @@
+from beanie import Document
+from beanie.odm.fields import PydanticObjectId
+from pydantic import Field
+from pydantic import BaseModel
+from pymongo import IndexModel
+from datetime import datetime
+
+class LaunchRecord(BaseModel):
+    started_at: datetime
+    ready_seconds: float | None = Field(None, description="Tempo até responder ao Server List Ping (None = não ficou pronto)")
+    java_major: int | None = None
+    gc: str
+    xmx_mb: int
+    flags_hash: str
+
+class LaunchProfile(Document):
+    """Perfil de execução da JVM de um servidor (calculado + overrides manuais)"""
+    server_id: PydanticObjectId = Field(..., description="ID do servidor")
+    overrides: dict = Field(default_factory=dict, description="java_path, xms_mb, xmx_mb, gc, extra_flags")
+    java_path: str | None = None
+    java_major: int | None = None
+    xms_mb: int | None = None
+    xmx_mb: int | None = None
+    gc: str | None = None
+    jvm_flags: list[str] = Field(default_factory=list)
+    command: list[str] = Field(default_factory=list)
+    launches: list[LaunchRecord] = Field(default_factory=list, description="Últimas inicializações")
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    class Settings:
+        name = "launch_profiles"
+        indexes = [
+            IndexModel([("server_id", 1)], unique=True),
+        ]
+
+class LaunchProfileOverrides(BaseModel):
+    java_path: str | None = Field(None, description="Binário de JAVA_INSTALLATIONS ou do cache de runtimes")
+    xms_mb: int | None = Field(None, ge=256)
+    xmx_mb: int | None = Field(None, ge=256)
+    gc: str | None = Field(None, pattern="^(G1|ZGC|Shenandoah|Parallel|Serial)$")
+    extra_flags: list[str] | None = Field(None, description="Flags da allowlist de core.launch_profiles")
@@ -0,0 +1,21 @@
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel
+from datetime import datetime
+
+class MigrationRecord(Document):
+    version: int = Field(..., description="Versão da migração (prefixo numérico do módulo)")
+    name: str
+    status: str = Field(default="pending", description="Status (pending, running, completed, failed)")
+    checkpoint: dict = Field(default_factory=dict, description="Progresso salvo para retomar após interrupção")
+    processed: int = Field(default=0)
+    total: int = Field(default=0)
+    error: str | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    
+    class Settings:
+        name = "migrations"
+        indexes = [
+            IndexModel([("version", 1)], unique=True),
+        ]
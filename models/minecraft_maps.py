@@ -2,15 +2,37 @@ from beanie import Document, Link
 from beanie.odm.fields import PydanticObjectId
 from pydantic import Field
 from pydantic import BaseModel
+from pymongo import IndexModel
 from datetime import datetime
 
+class DimensionStats(BaseModel):
+    region_files: int = 0
+    chunks: int = 0
+    bytes: int = Field(0, description="Bytes dos .mca da dimensão (region, entities e poi)")
+
+class RegionStats(BaseModel):
+    """Conteúdo real do mundo, lido das tabelas de localização dos arquivos .mca"""
+    generated_chunks: int = 0
+    region_files: int = 0
+    dimensions: dict[str, DimensionStats] = Field(default_factory=dict)
+    compression: dict[str, int] = Field(default_factory=dict, description="Chunks por compressão (deflate, lz4, none...)")
+    dominant_compression: str | None = Field(None, description="Mesmos valores de region_file_compression")
+    sampled_chunks: int = 0
+    compression_ratio: float | None = Field(None, description="Descompactado/compactado nos chunks amostrados")
+    corrupt_chunks: int = 0
+    analyzed_at: datetime = Field(default_factory=datetime.utcnow)
+
 class MinecraftMap(Document):
     name: str = Field(..., min_length=1, max_length=100)
     description: str = Field(default="", max_length=500)
     link: str = Field(..., min_length=1, max_length=200)
     size_mb: float = Field(0, ge=0, description="Tamanho do mapa em MB")
     world_type: str = Field(default="survival", description="Tipo do mundo (survival, creative, adventure)")
+    sha256: str | None = Field(None, description="Hash do pacote enviado (mapas importados por upload)")
+    file_count: int | None = Field(None, description="Arquivos do mundo extraído")
+    region_stats: RegionStats | None = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
     is_active: bool = Field(default=True)
     
     class Settings:
@@ -18,6 +40,9 @@ class MinecraftMap(Document):
         indexes = [
             "name",
             "world_type",
+            "size_mb",
+            "updated_at",
+            IndexModel([("sha256", 1)], unique=True, partialFilterExpression={"sha256": {"$type": "string"}}),
         ]
 
 class MinecraftMapCreate(BaseModel):
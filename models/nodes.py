@@ -0,0 +1,40 @@
+from beanie import Document
+from pydantic import Field
+from pydantic import BaseModel
+from pymongo import IndexModel
+from datetime import datetime
+
+class Node(Document):
+    """Host que executa servidores de Minecraft"""
+    name: str = Field(..., min_length=1, max_length=100)
+    address: str = Field(..., description="Endereço IP/DNS usado pelos jogadores")
+    cpu_cores: float = Field(..., gt=0, description="Núcleos disponíveis para servidores")
+    memory_mb: int = Field(..., gt=0, description="Memória disponível para servidores (MB)")
+    port_range_start: int = Field(default=25565, ge=1, le=65535)
+    port_range_end: int = Field(default=25664, ge=1, le=65535)
+    # Bit i = porta port_range_start + i em uso (ver core/placement.PortBitmap)
+    port_bitmap: bytes = Field(default=b"")
+    allocated_cpu: float = Field(default=0)
+    allocated_memory_mb: int = Field(default=0)
+    is_active: bool = Field(default=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    model_config = {
+        "ser_json_bytes": "base64"
+    }
+    
+    class Settings:
+        name = "nodes"
+        indexes = [
+            IndexModel([("name", 1)], unique=True),
+            "is_active",
+        ]
+
+class NodeCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    address: str
+    cpu_cores: float = Field(..., gt=0)
+    memory_mb: int = Field(..., gt=0)
+    port_range_start: int = Field(default=25565, ge=1, le=65535)
+    port_range_end: int = Field(default=25664, ge=1, le=65535)
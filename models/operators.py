@@ -16,6 +16,7 @@ class Operator(Document):
         indexes = [
             "server_id",
             "user_id",
+            "granted_at",
         ]
     
     model_config = {
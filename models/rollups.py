@@ -0,0 +1,17 @@
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel
+from datetime import datetime
+
+class Rollup(Document):
+    """Contagem pré-agregada de documentos criados por período"""
+    entity: str = Field(..., description="Entidade agregada (servers, users, operators)")
+    granularity: str = Field(..., description="Granularidade do período (day, month)")
+    bucket: datetime = Field(..., description="Início do período (UTC)")
+    total: int = Field(default=0, description="Documentos criados no período")
+    
+    class Settings:
+        name = "rollups"
+        indexes = [
+            IndexModel([("entity", 1), ("granularity", 1), ("bucket", 1)], unique=True),
+        ]
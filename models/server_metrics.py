@@ -0,0 +1,59 @@
+from beanie import Document, Granularity, TimeSeriesConfig
+from beanie.odm.fields import PydanticObjectId
+from pydantic import BaseModel, Field
+from pymongo import IndexModel
+from datetime import datetime
+
+# O TTL vale a partir da criação da coleção/índice; para mudar depois use collMod
+RAW_RETENTION_SECONDS = 2 * 24 * 3600
+ROLLUP_RETENTION_SECONDS = 400 * 24 * 3600
+
+class MetricMeta(BaseModel):
+    server_id: PydanticObjectId
+    resolution: str = Field(default="raw", description="raw, 1m ou 1h")
+
+class ServerMetric(Document):
+    """Amostra de consumo do processo Java de um servidor (coleção time-series)"""
+    timestamp: datetime
+    meta: MetricMeta
+    cpu_percent: float = Field(0, description="Percentual de um núcleo (200 = dois núcleos)")
+    rss_mb: float = 0
+    swap_mb: float = 0
+    threads: int = 0
+    read_bps: float | None = Field(None, description="Bytes/s lidos do disco (None sem acesso a /proc/<pid>/io)")
+    write_bps: float | None = None
+    
+    class Settings:
+        name = "server_metrics"
+        timeseries = TimeSeriesConfig(
+            time_field="timestamp",
+            meta_field="meta",
+            granularity=Granularity.seconds,
+            expire_after_seconds=RAW_RETENTION_SECONDS,
+        )
+
+class ServerMetricRollup(Document):
+    """Agregado por minuto ou por hora das amostras de um servidor.
+
+    Calculado a partir de server_metrics com $merge (ver core/resource_sampler.py),
+    um documento por (servidor, resolução, período): recalcular substitui.
+    Coleção comum, pois $merge não grava em coleções time-series.
+    """
+    timestamp: datetime = Field(..., description="Início do período (UTC)")
+    meta: MetricMeta
+    samples: int
+    cpu_avg: float
+    cpu_max: float
+    rss_avg_mb: float
+    rss_max_mb: float
+    threads_max: int
+    read_bps: float | None = None
+    write_bps: float | None = None
+    
+    class Settings:
+        name = "server_metric_periods"
+        indexes = [
+            IndexModel([("meta.server_id", 1), ("meta.resolution", 1), ("timestamp", 1)], unique=True),
+            IndexModel([("meta.resolution", 1), ("timestamp", 1)]),
+            IndexModel([("timestamp", 1)], expireAfterSeconds=ROLLUP_RETENTION_SECONDS),
+        ]
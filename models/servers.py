@@ -3,6 +3,7 @@ from beanie.odm.fields import PydanticObjectId
 from pydantic import Field
 from pydantic import BaseModel
 from datetime import datetime
+from typing import Literal
 
 class Server(Document):
     name: str = Field(..., min_length=1, max_length=100)
@@ -11,9 +12,16 @@ class Server(Document):
     software_id: PydanticObjectId = Field(..., description="ID do software")
     java_id: PydanticObjectId = Field(..., description="ID da versão Java")
     map_id: PydanticObjectId | None = Field(None, description="ID do mapa (opcional)")
+    node_id: PydanticObjectId | None = Field(None, description="Node onde o servidor foi alocado")
+    cpu_reserved: float | None = Field(None, description="CPU reservada no node (núcleos)")
+    memory_reserved_mb: int | None = Field(None, description="Memória reservada no node (MB)")
+    properties_overrides: dict = Field(default_factory=dict, description="Campos que diferem do template de propriedades")
     status: str = Field(default="offline", description="Status do servidor (online, offline, maintenance)")
     ip_address: str | None = Field(None, description="Endereço IP do servidor")
     port: int = Field(default=25565, ge=1, le=65535, description="Porta do servidor")
+    players_online: int | None = Field(None, description="Jogadores online (Server List Ping)")
+    players_max: int | None = Field(None, description="Capacidade informada pelo servidor")
+    latency_ms: int | None = Field(None, description="Latência da última consulta")
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     is_active: bool = Field(default=True)
@@ -25,6 +33,12 @@ class Server(Document):
             "owner_id",
             "status",
             "created_at",
+            # Campos usados como foreignField nos $lookup de usage-by-servers
+            "software_id",
+            "java_id",
+            "map_id",
+            "server_properties_id",
+            "node_id",
         ]
     
     model_config = {
@@ -38,5 +52,20 @@ class ServerCreate(BaseModel):
     software_id: str
     java_id: str
     map_id: str | None = None
+    properties_overrides: dict = Field(default_factory=dict)
     ip_address: str | None = None
     port: int = Field(default=25565, ge=1, le=65535)
+
+class ServerStatusReport(BaseModel):
+    status: Literal["online", "offline", "maintenance", "hibernating"]
+    at: datetime | None = Field(None, description="Momento da mudança (padrão: recebimento)")
+
+class ServerStatusBatchItem(ServerStatusReport):
+    server_id: PydanticObjectId
+
+class RconCommand(BaseModel):
+    command: str = Field(..., min_length=1, max_length=1446)
+
+class RconBroadcast(RconCommand):
+    server_ids: list[PydanticObjectId] = Field(..., min_length=1)
+    concurrency: int | None = Field(None, ge=1, le=256)
@@ -1,9 +1,102 @@
 from beanie import Document, Link
 from beanie.odm.fields import PydanticObjectId
-from pydantic import Field
+from pydantic import Field, model_validator
 from pydantic import BaseModel
+from pymongo import IndexModel
 from datetime import datetime
 
+# Campos aceitos em order_by e o campo correspondente no Mongo (ver core/sorting.py)
+SORTABLE_FIELDS = {
+    "id": "_id",
+    "level_name": "level_name",
+    "gamemode": "gamemode",
+    "difficulty": "difficulty",
+    "max_players": "max_players",
+    "created_at": "created_at",
+}
+
+# Filtros de igualdade frequentes, combinados com a ordenação em índices compostos.
+# Os índices de ordenação terminam em `_id`, o desempate usado por resolve_sort
+SORT_FILTER_FIELDS = ["gamemode", "difficulty"]
+
+# Valores padrão de cada versão do armazenamento compacto. Documentos compactados
+# guardam só os campos diferentes do padrão da sua `defaults_version`; ao mudar um
+# padrão acima, crie uma nova versão em vez de alterar uma existente.
+PROPERTIES_DEFAULTS_VERSION = 1
+PROPERTIES_DEFAULTS = {
+    1: {
+        "accepts_transfers": False,
+        "allow_flight": False,
+        "broadcast_console_to_ops": True,
+        "broadcast_rcon_to_ops": True,
+        "bug_report_link": "",
+        "debug": False,
+        "difficulty": "easy",
+        "enable_code_of_conduct": False,
+        "enable_jmx_monitoring": False,
+        "enable_query": False,
+        "enable_rcon": False,
+        "enable_status": True,
+        "enforce_secure_profile": True,
+        "enforce_whitelist": False,
+        "entity_broadcast_range_percentage": 100,
+        "force_gamemode": False,
+        "function_permission_level": 2,
+        "gamemode": "survival",
+        "generate_structures": True,
+        "generator_settings": "{}",
+        "hardcore": False,
+        "hide_online_players": False,
+        "initial_disabled_packs": "",
+        "initial_enabled_packs": "vanilla",
+        "level_name": "world",
+        "level_seed": "",
+        "level_type": "minecraft:normal",
+        "log_ips": True,
+        "management_server_enabled": False,
+        "management_server_host": "localhost",
+        "management_server_port": 0,
+        "max_chained_neighbor_updates": 1000000,
+        "max_players": 20,
+        "max_tick_time": 60000,
+        "max_world_size": 29999984,
+        "motd": "A Minecraft Server",
+        "network_compression_threshold": 256,
+        "online_mode": True,
+        "op_permission_level": 4,
+        "pause_when_empty_seconds": -1,
+        "player_idle_timeout": 0,
+        "prevent_proxy_connections": False,
+        "query_port": 25565,
+        "rate_limit": 0,
+        "rcon_password": "",
+        "rcon_port": 25575,
+        "region_file_compression": "deflate",
+        "require_resource_pack": False,
+        "resource_pack": "",
+        "resource_pack_id": "",
+        "resource_pack_prompt": "",
+        "resource_pack_sha1": "",
+        "server_ip": "",
+        "server_port": 25565,
+        "simulation_distance": 10,
+        "spawn_protection": 16,
+        "status_heartbeat_interval": 0,
+        "sync_chunk_writes": True,
+        "text_filtering_config": "",
+        "text_filtering_version": 0,
+        "use_native_transport": True,
+        "view_distance": 10,
+        "white_list": False,
+    },
+}
+
+# Campos sempre gravados: indexados, ordenáveis ou agrupados nas agregações
+PINNED_FIELDS = {"level_name", "gamemode", "difficulty", "max_players", "created_at", "updated_at"}
+
+# Campos de controle que não fazem parte da configuração (nem do content_hash)
+METADATA_FIELDS = {"id", "revision_id", "created_at", "updated_at", "defaults_version", "content_hash"}
+
 class ServersProperties(Document):
     accepts_transfers: bool = Field(default=False)
     allow_flight: bool = Field(default=False)
@@ -70,13 +163,53 @@ class ServersProperties(Document):
     white_list: bool = Field(default=False)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    defaults_version: int = Field(default=PROPERTIES_DEFAULTS_VERSION)
+    content_hash: str | None = Field(None, description="Hash do conteúdo, usado para deduplicar templates")
+    
+    @model_validator(mode="before")
+    @classmethod
+    def materialize_defaults(cls, data):
+        """Preenche os campos omitidos pelo armazenamento compacto com os padrões da versão do documento"""
+        if isinstance(data, dict) and "defaults_version" in data:
+            return {**PROPERTIES_DEFAULTS[data["defaults_version"]], **data}
+        return data
+    
+    def config_values(self) -> dict:
+        """Valores de configuração, sem os campos de controle"""
+        return {
+            field: getattr(self, field)
+            for field in type(self).model_fields
+            if field not in METADATA_FIELDS
+        }
+    
+    def to_properties_file(self) -> dict[str, str]:
+        """Converte os campos para as chaves do arquivo server.properties"""
+        renamed = {
+            "query_port": "query.port",
+            "rcon_password": "rcon.password",
+            "rcon_port": "rcon.port",
+        }
+        result = {}
+        for field, value in self.config_values().items():
+            key = renamed.get(field, field.replace("_", "-"))
+            result[key] = str(value).lower() if isinstance(value, bool) else str(value)
+        return result
     
     class Settings:
         name = "server_properties"
         indexes = [
-            "level_name",
-            "gamemode",
-            "difficulty",
+            IndexModel([("level_name", 1), ("_id", 1)]),
+            IndexModel([("gamemode", 1), ("_id", 1)]),
+            IndexModel([("difficulty", 1), ("_id", 1)]),
+            IndexModel([("max_players", 1), ("_id", 1)]),
+            IndexModel([("created_at", 1), ("_id", 1)]),
+            IndexModel([("gamemode", 1), ("max_players", 1), ("_id", 1)]),
+            IndexModel([("difficulty", 1), ("max_players", 1), ("_id", 1)]),
+            IndexModel(
+                [("content_hash", 1)],
+                unique=True,
+                partialFilterExpression={"content_hash": {"$type": "string"}},
+            ),
         ]
 
 class ServerPropertiesCreate(BaseModel):
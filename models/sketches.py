@@ -0,0 +1,18 @@
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel
+from datetime import datetime
+
+class Sketch(Document):
+    """Registradores HyperLogLog de uma contagem distinta mantida incrementalmente"""
+    name: str = Field(..., description="Identificador do sketch (ex.: operators.server_id)")
+    precision: int = Field(..., description="Bits de precisão (2^precision registradores)")
+    registers: list[int] = Field(default_factory=list)
+    seeded: bool = Field(default=False, description="Registradores já incluem os valores anteriores à criação do sketch")
+    rebuilt_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    class Settings:
+        name = "sketches"
+        indexes = [
+            IndexModel([("name", 1)], unique=True),
+        ]
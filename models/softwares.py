@@ -11,6 +11,7 @@ class Softwares(Document):
     plugins_enabled: bool = Field(default=False, description="Suporte a plugins")
     mods_enabled: bool = Field(default=False, description="Suporte a mods")
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
     is_active: bool = Field(default=True)
     
     class Settings:
@@ -19,5 +20,6 @@ class Softwares(Document):
             "name",
             "version",
             "plugins_enabled",
-            "mods_enabled"
+            "mods_enabled",
+            "updated_at",
         ]
@@ -0,0 +1,41 @@
+from beanie import Document
+from beanie.odm.fields import PydanticObjectId
+from pydantic import Field
+from pydantic import BaseModel
+from pymongo import IndexModel
+from datetime import datetime
+
+class OwnedServerSummary(BaseModel):
+    server_id: PydanticObjectId
+    name: str
+    status: str
+    ip_address: str | None = None
+    port: int
+    created_at: datetime
+
+class OperatorRoleSummary(BaseModel):
+    server_id: PydanticObjectId
+    server_name: str | None = None
+    server_status: str | None = None
+    permission_level: str
+    granted_at: datetime
+
+class UserProfile(Document):
+    """Read model do perfil completo do usuário (servidores próprios e cargos de operador)"""
+    user_id: PydanticObjectId = Field(..., description="ID do usuário")
+    username: str
+    email: str
+    created_at: datetime
+    owned_servers_count: int = Field(default=0)
+    operator_roles_count: int = Field(default=0)
+    owned_servers: list[OwnedServerSummary] = Field(default_factory=list)
+    operator_roles: list[OperatorRoleSummary] = Field(default_factory=list)
+    refreshed_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    class Settings:
+        name = "user_profiles"
+        indexes = [
+            IndexModel([("user_id", 1)], unique=True),
+            "owned_servers.server_id",
+            "operator_roles.server_id",
+        ]
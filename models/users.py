@@ -14,7 +14,8 @@ class User(Document):
         name = "users"
         indexes = [
             "username",
-            "email"
+            "email",
+            "created_at"
         ]
 
 class UserCreate(BaseModel):
@@ -10,6 +10,7 @@ import asyncio
 import random
 from datetime import datetime, timedelta
 from database import init_db, close_db
+from core import property_templates
 from models.users import User
 from models.java_links import Java
 from models.softwares import Softwares
@@ -18,6 +19,11 @@ from models.servers_properties import ServersProperties
 from models.minecraft_maps import MinecraftMap
 from models.servers import Server
 from models.operators import Operator
+from models.user_profiles import UserProfile
+from core.user_profiles import rebuild_user_profiles
+from core import rollups, sketches
+from models.rollups import Rollup
+from models.sketches import Sketch
 import logging
 import custom_logger
 
@@ -34,6 +40,9 @@ async def clear_collections():
     await MinecraftMap.delete_all()
     await Server.delete_all()
     await Operator.delete_all()
+    await UserProfile.delete_all()
+    await Rollup.delete_all()
+    await Sketch.delete_all()
     
     logger.info("Coleções limpas com sucesso!")
 
@@ -154,8 +163,7 @@ async def populate_server_properties():
     
     server_properties = []
     for data in properties_data:
-        props = ServersProperties(**data)
-        await props.insert()
+        props = await property_templates.get_or_create_template(ServersProperties(**data))
         server_properties.append(props)
     
     logger.info(f"{len(server_properties)} propriedades de servidor criadas com sucesso!")
@@ -272,7 +280,7 @@ async def main():
     try:
         logger.info("Iniciando populate do MongoDB...")
         
-        await init_db()
+        await init_db(create_indexes=True)
         await clear_collections()
         
         users = await populate_users()
@@ -282,6 +290,11 @@ async def main():
         maps = await populate_minecraft_maps()
         servers = await populate_servers(users, java_versions, softwares, server_properties, maps)
         operators = await populate_operators(users, servers)
+        await rebuild_user_profiles()
+        for entity in rollups.ENTITIES:
+            await rollups.backfill(entity)
+        for name in sketches.SKETCHES:
+            await sketches.rebuild(name)
         
         logger.info(f"Usuários: {len(users)}")
         logger.info(f"Versões Java: {len(java_versions)}")
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException
+from core.config import settings
+from core.index_advisor import advise, apply_recommendations, query_recorder
+from database import get_database
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+)
+
+@router.get("/index-advisor")
+async def index_advisor_report():
+    """Índices recomendados a partir das consultas registradas desde o startup"""
+    if not settings.index_advisor_enabled:
+        raise HTTPException(status_code=400, detail="Index advisor desabilitado (INDEX_ADVISOR_ENABLED)")
+    
+    report = await advise(get_database(), query_recorder)
+    return {"recorded_shapes": len(query_recorder.shapes), "collections": report}
+
+@router.post("/index-advisor/apply")
+async def index_advisor_apply():
+    """Cria os índices recomendados"""
+    if not settings.index_advisor_enabled:
+        raise HTTPException(status_code=400, detail="Index advisor desabilitado (INDEX_ADVISOR_ENABLED)")
+    
+    report = await advise(get_database(), query_recorder)
+    created = await apply_recommendations(get_database(), report)
+    return {"created": created}
+
+@router.delete("/index-advisor/shapes")
+async def index_advisor_reset():
+    """Descarta os formatos de consulta registrados"""
+    query_recorder.reset()
+    return {"message": "Formatos de consulta descartados"}
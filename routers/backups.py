@@ -0,0 +1,78 @@
+from fastapi import APIRouter, HTTPException, Header
+from beanie import PydanticObjectId
+from fastapi_pagination import Page
+from fastapi_pagination.ext.beanie import apaginate
+from models.backups import Backup, BackupFile, BackupFileSummary
+from models.servers import Server
+from core import backups
+from core.jobs import job_queue
+
+router = APIRouter(
+    prefix="/backups",
+    tags=["Backups"],
+)
+
+async def _get_backup(backup_id: PydanticObjectId) -> Backup:
+    backup = await Backup.get(backup_id)
+    if not backup:
+        raise HTTPException(status_code=404, detail="Backup não encontrado")
+    return backup
+
+@router.get("/", response_model=Page[Backup])
+async def read_backups(server_id: PydanticObjectId | None = None, status: str | None = None):
+    filters = {}
+    if server_id:
+        filters["server_id"] = server_id
+    if status:
+        filters["status"] = status
+    return await apaginate(Backup.find(filters).sort("-created_at"))
+
+@router.get("/{backup_id}", response_model=Backup)
+async def read_backup(backup_id: PydanticObjectId):
+    return await _get_backup(backup_id)
+
+@router.get("/{backup_id}/files")
+async def read_backup_files(backup_id: PydanticObjectId):
+    """Arquivos do backup (sem a lista de chunks)"""
+    await _get_backup(backup_id)
+    files = await BackupFile.find(BackupFile.backup_id == backup_id).sort("path").project(BackupFileSummary).to_list()
+    return {"files": files}
+
+@router.post("/", status_code=202)
+async def create_backup(server_id: PydanticObjectId, idempotency_key: str | None = Header(None)):
+    """Backup incremental do mundo do servidor (assíncrono, retorna o ID do job)"""
+    server = await Server.get(server_id)
+    if not server:
+        raise HTTPException(status_code=404, detail="Servidor não encontrado")
+    
+    job = await job_queue.submit("backup", server_id=server.id, idempotency_key=idempotency_key)
+    return {"job_id": str(job.id), "type": job.type, "status": job.status}
+
+@router.post("/{backup_id}/restore", status_code=202)
+async def restore_backup(backup_id: PydanticObjectId, idempotency_key: str | None = Header(None)):
+    """Restaurar o backup no servidor de origem, que precisa estar parado (assíncrono)"""
+    backup = await _get_backup(backup_id)
+    if backup.status != "completed":
+        raise HTTPException(status_code=409, detail="Só backups concluídos podem ser restaurados")
+    
+    job = await job_queue.submit(
+        "restore", server_id=backup.server_id, params={"backup_id": str(backup.id)}, idempotency_key=idempotency_key
+    )
+    return {"job_id": str(job.id), "type": job.type, "status": job.status}
+
+@router.delete("/{backup_id}")
+async def delete_backup(backup_id: PydanticObjectId):
+    """Remover o manifesto; os chunks só são apagados pelo POST /backups/gc"""
+    backup = await _get_backup(backup_id)
+    if backup.status == "running":
+        raise HTTPException(status_code=409, detail="Backup em andamento")
+    try:
+        await backups.delete_backup(backup)
+    except backups.BackupError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"message": "Backup deleted successfully"}
+
+@router.post("/gc")
+async def collect_backup_garbage(dry_run: bool = True):
+    """Apagar do store os chunks que nenhum backup referencia (dry_run=false para apagar)"""
+    return await backups.collect_garbage(dry_run)
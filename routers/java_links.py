@@ -4,6 +4,11 @@ from beanie.odm.fields import Link
 from fastapi_pagination import Page
 from fastapi_pagination.ext.beanie import apaginate
 from models.java_links import Java, JavaCreate
+from core.catalog_cache import catalog_cache
+from datetime import datetime
+from core.singleflight import single_flight
+from core.jobs import job_queue
+from core.runtimes import runtime_manager
 
 router = APIRouter(
     prefix="/java",
@@ -15,10 +20,31 @@ async def read_java() -> Page[Java]:
     return await apaginate(Java.find_all(fetch_links=True))
 
 
+@router.get("/runtimes/installed")
+async def list_installed_runtimes():
+    """Runtimes baixados no cache compartilhado"""
+    return {"runtimes": runtime_manager.installed()}
+
+@router.post("/runtimes/gc")
+async def collect_runtimes(dry_run: bool = True):
+    """Remover runtimes que nenhum servidor usa (dry_run=false para apagar)"""
+    removed = await runtime_manager.collect_garbage(dry_run)
+    return {"dry_run": dry_run, "removed": removed}
+
+@router.post("/{java_id}/install", status_code=202)
+async def install_java_runtime(java_id: PydanticObjectId):
+    """Baixar e extrair o runtime no cache (assíncrono, retorna o ID do job)"""
+    java_entry = await catalog_cache.fetch(Java, java_id)
+    if not java_entry:
+        raise HTTPException(status_code=404, detail="Java entry not found")
+    
+    job = await job_queue.submit("install_runtime", params={"java_id": str(java_id)})
+    return {"job_id": str(job.id), "type": job.type, "status": job.status}
+
 @router.get("/{java_id}", response_model=Java)
 async def read_java_by_id(java_id: PydanticObjectId): 
-    # O .get() busca pelo _id do Mongo
-    java_entry = await Java.get(java_id)
+    # Busca no cache de catálogo (ou pelo _id do Mongo antes do startup)
+    java_entry = await catalog_cache.fetch(Java, java_id)
     
     if not java_entry:
         raise HTTPException(status_code=404, detail="Java entry not found")
@@ -46,15 +72,19 @@ async def search_java(
 
 
 @router.get("/count/")
-async def count_java():
-    count = await Java.count()
-    return {"count": count}
+async def count_java(approx: bool = False):
+    if approx:
+        count = await Java.get_pymongo_collection().estimated_document_count()
+    else:
+        count = await Java.count()
+    return {"count": count, "approximate": approx}
 
 
 @router.post("/", response_model=Java)
 async def create_java(java: JavaCreate):
     java_data = Java(**java.dict())
     await java_data.create()
+    catalog_cache.put(java_data)
     return java_data
 
 
@@ -71,8 +101,10 @@ async def update_java(java_id: PydanticObjectId, java_update: JavaCreate):
     # Maneira manual de atualizar os campos no objeto
     for key, value in update_data.items():
         setattr(java_db, key, value)
+    java_db.updated_at = datetime.utcnow()
     
     await java_db.save()
+    catalog_cache.put(java_db)
     return java_db
 
 
@@ -83,6 +115,7 @@ async def delete_java(java_id: PydanticObjectId):
         raise HTTPException(status_code=404, detail="Java entry not found")
     
     await java_db.delete()
+    catalog_cache.discard(Java, java_id)
     return {"message": "Deleted successfully"}
 
 
@@ -169,6 +202,7 @@ async def java_by_version_family():
     return {"java_by_version_family": result}
 
 @router.get("/stats/summary")
+@single_flight
 async def get_java_summary():
     """Resumo estatístico das versões Java"""
     total = await Java.count()
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, HTTPException
+from beanie import PydanticObjectId
+from fastapi_pagination import Page
+from fastapi_pagination.ext.beanie import apaginate
+from models.jobs import Job
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["Jobs"],
+)
+
+@router.get("/", response_model=Page[Job])
+async def list_jobs(
+    status: str | None = None,
+    server_id: PydanticObjectId | None = None,
+):
+    """Listar jobs com filtros opcionais"""
+    query = {}
+    if status:
+        query["status"] = status
+    if server_id:
+        query["server_id"] = server_id
+    
+    return await apaginate(Job.find(query).sort("-created_at"))
+
+@router.get("/{job_id}", response_model=Job)
+async def get_job(job_id: PydanticObjectId):
+    """Consultar o status de um job"""
+    job = await Job.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
@@ -0,0 +1,59 @@
+from fastapi import APIRouter, HTTPException
+from beanie import PydanticObjectId
+from models.launch_profiles import LaunchProfile, LaunchProfileOverrides
+from models.servers import Server
+from core import launch_profiles
+
+router = APIRouter(
+    prefix="/launch_profiles",
+    tags=["LaunchProfiles"],
+)
+
+async def _get_server(server_id: PydanticObjectId) -> Server:
+    server = await Server.get(server_id)
+    if not server:
+        raise HTTPException(status_code=404, detail="Servidor não encontrado")
+    return server
+
+async def _resolve(server: Server) -> LaunchProfile:
+    try:
+        _, profile = await launch_profiles.resolve(server)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return profile
+
+@router.get("/stats/startup")
+async def get_startup_stats():
+    """Tempo de startup por combinação de GC, versão do Java e heap"""
+    return {"startup_by_profile": await launch_profiles.startup_stats()}
+
+@router.get("/{server_id}", response_model=LaunchProfile)
+async def get_launch_profile(server_id: PydanticObjectId):
+    """Perfil de execução do servidor (recalculado com os dados atuais)"""
+    return await _resolve(await _get_server(server_id))
+
+@router.put("/{server_id}", response_model=LaunchProfile)
+async def set_launch_profile_overrides(server_id: PydanticObjectId, overrides: LaunchProfileOverrides):
+    """Definir overrides do perfil (campos nulos voltam ao valor calculado)"""
+    server = await _get_server(server_id)
+    values = overrides.model_dump(exclude_none=True)
+    if values.get("xms_mb") and values.get("xmx_mb") and values["xms_mb"] > values["xmx_mb"]:
+        raise HTTPException(status_code=400, detail="xms_mb não pode ser maior que xmx_mb")
+    try:
+        launch_profiles.validate_overrides(values)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    profile = await LaunchProfile.find_one(LaunchProfile.server_id == server.id)
+    if profile:
+        await profile.set({LaunchProfile.overrides: values})
+    else:
+        await LaunchProfile(server_id=server.id, overrides=values).insert()
+    return await _resolve(server)
+
+@router.delete("/{server_id}/overrides", response_model=LaunchProfile)
+async def clear_launch_profile_overrides(server_id: PydanticObjectId):
+    """Remover os overrides e voltar ao perfil automático"""
+    server = await _get_server(server_id)
+    await LaunchProfile.find_one(LaunchProfile.server_id == server.id).update({"$set": {"overrides": {}}})
+    return await _resolve(server)
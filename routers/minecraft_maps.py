@@ -1,9 +1,21 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import os
+import shutil
+from fastapi import APIRouter, HTTPException, Header, Query, Request
 from beanie import PydanticObjectId
 from beanie.odm.fields import Link
+from pymongo.errors import DuplicateKeyError
 from fastapi_pagination import Page
 from fastapi_pagination.ext.beanie import apaginate
 from models.minecraft_maps import MinecraftMap
+from models.servers import Server
+from core import map_imports
+from core.jobs import job_queue
+from core.catalog_cache import catalog_cache
+from core.config import settings
+from datetime import datetime
+from core.singleflight import single_flight
+from core.summary import SummaryBuilder
 
 router = APIRouter(
     prefix="/minecraft_maps",
@@ -16,7 +28,7 @@ async def read_maps():
 
 @router.get("/{map_id}", response_model=MinecraftMap)
 async def read_map_by_id(map_id: PydanticObjectId):
-    map_entry = await MinecraftMap.get(map_id)
+    map_entry = await catalog_cache.fetch(MinecraftMap, map_id)
     if not map_entry:
         raise HTTPException(status_code=404, detail="Map not found")
     return map_entry
@@ -24,15 +36,101 @@ async def read_map_by_id(map_id: PydanticObjectId):
 @router.post("/", response_model=MinecraftMap)
 async def create_map(map_data: MinecraftMap):
     await map_data.insert()
+    catalog_cache.put(map_data)
     return map_data
 
+@router.post("/upload", response_model=MinecraftMap, status_code=201)
+async def upload_map(
+    request: Request,
+    name: str = Query(..., min_length=1, max_length=100),
+    description: str = Query("", max_length=500),
+    world_type: str = "survival",
+):
+    """Importar um mundo enviado como .zip ou .tar no corpo da requisição.
+
+    O corpo é gravado em disco em streaming; tamanho, quantidade de arquivos e
+    sha256 são calculados a partir do conteúdo. Um pacote idêntico já
+    importado retorna o mapa existente.
+    """
+    map_entry = MinecraftMap(name=name, description=description, world_type=world_type, link="upload")
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > settings.map_upload_max_bytes:
+        raise HTTPException(status_code=413, detail="Pacote maior que o limite de upload")
+
+    try:
+        archive, digest, size = await map_imports.receive(request.stream())
+    except map_imports.MapTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except map_imports.MapImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        existing = await MinecraftMap.find_one(MinecraftMap.sha256 == digest)
+        if existing:
+            return existing
+        map_entry.id = PydanticObjectId()
+        try:
+            files, total = await asyncio.to_thread(map_imports.import_archive, archive, map_entry.id)
+        except map_imports.MapImportError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        os.remove(archive)
+
+    map_entry.link = f"upload://{digest}"
+    map_entry.sha256 = digest
+    map_entry.file_count = files
+    map_entry.size_mb = round(total / (1024 * 1024), 2)
+    try:
+        await map_entry.insert()
+    except DuplicateKeyError:
+        # Outro upload do mesmo pacote venceu a corrida pelo índice único de sha256
+        await asyncio.to_thread(shutil.rmtree, map_imports.map_directory(map_entry.id), True)
+        existing = await MinecraftMap.find_one(MinecraftMap.sha256 == digest)
+        if existing is None:
+            raise HTTPException(status_code=409, detail="Pacote importado em paralelo, tente novamente")
+        return existing
+    catalog_cache.put(map_entry)
+    await job_queue.submit("analyze_map", params={"map_id": str(map_entry.id)})
+    return map_entry
+
+@router.post("/{map_id}/analyze", status_code=202)
+async def analyze_map(map_id: PydanticObjectId):
+    """Recalcular as estatísticas de regiões do mapa (assíncrono, retorna o ID do job)"""
+    map_entry = await catalog_cache.fetch(MinecraftMap, map_id)
+    if not map_entry:
+        raise HTTPException(status_code=404, detail="Map not found")
+    if not map_entry.sha256:
+        raise HTTPException(status_code=409, detail="Mapa sem arquivos, importe-o por POST /minecraft_maps/upload")
+    
+    job = await job_queue.submit("analyze_map", params={"map_id": str(map_id)})
+    return {"job_id": str(job.id), "type": job.type, "status": job.status}
+
+@router.post("/{map_id}/install", status_code=202)
+async def install_map(map_id: PydanticObjectId, server_id: PydanticObjectId, idempotency_key: str | None = Header(None)):
+    """Instalar o mapa no mundo do servidor, que precisa estar parado (assíncrono)"""
+    map_entry = await catalog_cache.fetch(MinecraftMap, map_id)
+    if not map_entry:
+        raise HTTPException(status_code=404, detail="Map not found")
+    if not map_entry.sha256:
+        raise HTTPException(status_code=409, detail="Mapa sem arquivos, importe-o por POST /minecraft_maps/upload")
+    server = await Server.get(server_id)
+    if not server:
+        raise HTTPException(status_code=404, detail="Servidor não encontrado")
+    
+    job = await job_queue.submit("install_map", server_id=server.id, params={"map_id": str(map_id)}, idempotency_key=idempotency_key)
+    return {"job_id": str(job.id), "type": job.type, "status": job.status}
+
 @router.put("/{map_id}", response_model=MinecraftMap)
 async def update_map(map_id: PydanticObjectId, map_update: dict):
     map_entry = await MinecraftMap.get(map_id)
     if not map_entry:
         raise HTTPException(status_code=404, detail="Map not found")
+    if map_entry.sha256:
+        # Em mapas importados, esses campos vêm do conteúdo enviado
+        for field in ("link", "size_mb", "sha256", "file_count", "region_stats"):
+            map_update.pop(field, None)
     
-    await map_entry.update({"$set": map_update})
+    await map_entry.update({"$set": {**map_update, "updated_at": datetime.utcnow()}})
+    catalog_cache.put(map_entry)
     return map_entry
 
 @router.delete("/{map_id}")
@@ -42,6 +140,8 @@ async def delete_map(map_id: PydanticObjectId):
         raise HTTPException(status_code=404, detail="Map not found")
     
     await map_entry.delete()
+    catalog_cache.discard(MinecraftMap, map_id)
+    await asyncio.to_thread(shutil.rmtree, map_imports.map_directory(map_id), True)
     return {"message": "Map deleted successfully"}
 
 @router.get("/search/{query}", response_model=Page[MinecraftMap])
@@ -137,42 +237,34 @@ async def maps_usage_by_servers():
     return {"maps_usage": result}
 
 @router.get("/stats/summary")
+@single_flight
 async def get_maps_summary():
     """Resumo estatístico dos mapas"""
-    pipeline = [
-        {
-            "$group": {
-                "_id": None,
-                "total_maps": {"$sum": 1},
-                "avg_size": {"$avg": "$size_mb"},
-                "total_size": {"$sum": "$size_mb"},
-                "min_size": {"$min": "$size_mb"},
-                "max_size": {"$max": "$size_mb"}
-            }
-        }
-    ]
-    
-    result = await MinecraftMap.aggregate(pipeline).to_list(1)
-    stats = result[0] if result else {
-        "total_maps": 0, "avg_size": 0, "total_size": 0,
-        "min_size": 0, "max_size": 0
-    }
-    
-    # Contagem por tipo de mundo
-    by_type_pipeline = [
-        {
-            "$group": {
-                "_id": "$world_type",
-                "count": {"$sum": 1}
-            }
-        }
-    ]
-    
-    by_type = await MinecraftMap.aggregate(by_type_pipeline).to_list()
+    summary = await (
+        SummaryBuilder(MinecraftMap)
+        .stats("stats", {
+            "total_maps": {"$sum": 1},
+            "avg_size": {"$avg": "$size_mb"},
+            "total_size": {"$sum": "$size_mb"},
+            "min_size": {"$min": "$size_mb"},
+            "max_size": {"$max": "$size_mb"}
+        })
+        .group_count("by_world_type", "world_type")
+        .stats("regions", {
+            "analyzed_maps": {"$sum": {"$cond": [{"$gt": ["$region_stats", None]}, 1, 0]}},
+            "total_chunks": {"$sum": "$region_stats.generated_chunks"},
+            "avg_chunks": {"$avg": "$region_stats.generated_chunks"},
+            "avg_compression_ratio": {"$avg": "$region_stats.compression_ratio"},
+        })
+        .group_count("by_region_compression", "region_stats.dominant_compression")
+        .run()
+    )
     
     return {
-        "summary": stats,
-        "by_world_type": {item["_id"]: item["count"] for item in by_type}
+        "summary": summary["stats"],
+        "by_world_type": summary["by_world_type"],
+        "regions": summary["regions"],
+        "by_region_compression": summary["by_region_compression"],
     }
 
 @router.get("/ordered/by-size", response_model=Page[MinecraftMap])
@@ -0,0 +1,85 @@
+from fastapi import APIRouter, HTTPException
+from beanie import PydanticObjectId
+from fastapi_pagination import Page
+from fastapi_pagination.ext.beanie import apaginate
+from pydantic import BaseModel, Field
+from pymongo.errors import DuplicateKeyError
+from models.nodes import Node, NodeCreate
+from models.servers import Server
+from core import placement
+
+router = APIRouter(
+    prefix="/nodes",
+    tags=["Nodes"],
+)
+
+class SimulationNode(BaseModel):
+    name: str
+    cpu_cores: float = Field(..., gt=0)
+    memory_mb: int = Field(..., gt=0)
+    ports: int = Field(default=100, ge=1, le=65535)
+
+class SimulationRequest(BaseModel):
+    nodes: list[SimulationNode] = Field(..., min_length=1)
+    servers: int = Field(..., ge=1, le=100000)
+    seed: int | None = None
+    mode: str = Field(default="online", pattern="^(online|pack)$")
+
+@router.get("/", response_model=Page[Node])
+async def list_nodes():
+    """Listar nodes"""
+    return await apaginate(Node.find_all())
+
+@router.post("/", response_model=Node)
+async def create_node(node_data: NodeCreate):
+    """Cadastrar um node"""
+    if node_data.port_range_end < node_data.port_range_start:
+        raise HTTPException(status_code=400, detail="Faixa de portas inválida")
+    node = Node(**node_data.model_dump())
+    try:
+        await node.insert()
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Já existe um node com esse nome")
+    return node
+
+@router.get("/{node_id}")
+async def get_node(node_id: PydanticObjectId):
+    """Node com a ocupação atual"""
+    node = await Node.get(node_id)
+    if not node:
+        raise HTTPException(status_code=404, detail="Node não encontrado")
+    
+    servers_count = await Server.find(Server.node_id == node.id).count()
+    return {
+        **node.model_dump(mode="json", exclude={"port_bitmap"}),
+        "servers_count": servers_count,
+        **placement.NodeState.from_node(node).utilization(),
+    }
+
+@router.delete("/{node_id}")
+async def delete_node(node_id: PydanticObjectId):
+    """Excluir um node sem servidores alocados"""
+    node = await Node.get(node_id)
+    if not node:
+        raise HTTPException(status_code=404, detail="Node não encontrado")
+    if await Server.find(Server.node_id == node.id).count():
+        raise HTTPException(status_code=409, detail="Node ainda possui servidores alocados")
+    
+    await node.delete()
+    return {"message": "Node excluído com sucesso"}
+
+@router.post("/rebalance")
+async def rebalance_nodes(mode: str = "overflow", apply: bool = False):
+    """Replanejar a distribuição dos servidores (sem `apply` só mostra o plano)"""
+    if mode not in ("overflow", "pack"):
+        raise HTTPException(status_code=400, detail="mode deve ser overflow ou pack")
+    try:
+        return await placement.rebalance(mode, apply)
+    except placement.PlacementError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.post("/simulate")
+async def simulate_placement(request: SimulationRequest):
+    """Simular a alocação de uma frota sintética em nodes fictícios (não acessa o banco)"""
+    nodes = [node.model_dump() for node in request.nodes]
+    return placement.simulate(nodes, request.servers, request.seed, request.mode)
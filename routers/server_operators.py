@@ -4,6 +4,13 @@ from beanie.odm.fields import Link
 from fastapi_pagination import Page
 from fastapi_pagination.ext.beanie import apaginate
 from models import java_links, minecraft_maps, operators, servers_properties, servers, softwares, users
+from core.user_profiles import refresh_user_profile, refresh_user_profiles
+from core import rollups, sketches
+from core.hyperloglog import STANDARD_ERROR
+from datetime import datetime
+from core.singleflight import single_flight
+from core.summary import SummaryBuilder
+from core.config import settings
 
 router = APIRouter(
     prefix="/operators",
@@ -87,6 +94,10 @@ async def create_operator(operator: operators.Operator):
         )
     
     created_operator = await operator.insert()
+    await rollups.record("operators", created_operator.granted_at)
+    await sketches.add("operators.server_id", created_operator.server_id)
+    await sketches.add("operators.user_id", created_operator.user_id)
+    await refresh_user_profile(created_operator.user_id)
     await created_operator.fetch_all_links()
     return created_operator
 
@@ -112,6 +123,7 @@ async def update_operator(
             setattr(operator, key, value)
     
     await operator.save()
+    await refresh_user_profile(operator.user_id)
     await operator.fetch_all_links()
     return operator
 
@@ -129,6 +141,8 @@ async def delete_operator(
         raise HTTPException(status_code=404, detail="Operator relationship not found")
     
     await operator.delete()
+    await rollups.record("operators", operator.granted_at, -1)
+    await refresh_user_profile(user_id)
     return {"message": "Operator relationship deleted successfully"}
 
 @router.delete("/by-server/{server_id}")
@@ -139,6 +153,9 @@ async def delete_operators_by_server(server_id: PydanticObjectId):
         raise HTTPException(status_code=404, detail="No operators found for this server")
     
     await operators.Operator.find({"server_id": server_id}).delete()
+    for operator in operators_list:
+        await rollups.record("operators", operator.granted_at, -1)
+    await refresh_user_profiles(operator.user_id for operator in operators_list)
     
     return {"message": f"Deleted {len(operators_list)} operator relationships for server {server_id}"}
 
@@ -168,6 +185,7 @@ async def operators_by_permission_level():
     return {"operators_by_permission": result}
 
 @router.get("/aggregations/most-active-operators")
+@single_flight
 async def most_active_operators():
     """Usuários que são operadores em mais servidores"""
     pipeline = [
@@ -210,31 +228,13 @@ async def most_active_operators():
     return {"most_active_operators": result}
 
 @router.get("/aggregations/by-granted-month")
-async def operators_by_granted_month():
-    """Operadores concedidos por mês"""
-    pipeline = [
-        {
-            "$group": {
-                "_id": {
-                    "year": {"$year": "$granted_at"},
-                    "month": {"$month": "$granted_at"}
-                },
-                "count": {"$sum": 1},
-                "permissions": {
-                    "$push": {
-                        "server_id": "$server_id",
-                        "user_id": "$user_id",
-                        "permission_level": "$permission_level"
-                    }
-                }
-            }
-        },
-        {
-            "$sort": {"_id.year": -1, "_id.month": -1}
-        }
-    ]
+async def operators_by_granted_month(granularity: str = "month", year: int | None = None):
+    """Operadores concedidos por mês (ou dia), lidos dos rollups pré-agregados"""
+    if granularity not in rollups.GRANULARITIES:
+        raise HTTPException(status_code=400, detail="Granularidade deve ser day ou month")
     
-    result = await operators.Operator.aggregate(pipeline).to_list()
+    start, end = (datetime(year, 1, 1), datetime(year + 1, 1, 1)) if year else (None, None)
+    result = await rollups.histogram("operators", granularity, start, end)
     return {"operators_by_month": result}
 
 @router.get("/complex/server-operators-details/{server_id}")
@@ -289,31 +289,43 @@ async def get_server_operators_details(server_id: PydanticObjectId):
     return {"server_operators_details": result}
 
 @router.get("/stats/summary")
-async def get_operators_summary():
+@single_flight
+async def get_operators_summary(approx: bool = False):
     """Resumo estatístico dos operadores"""
-    total = await operators.Operator.count()
-    
-    # Por nível de permissão
-    by_permission = await operators.Operator.aggregate([
-        {"$group": {"_id": "$permission_level", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ]).to_list()
-    
-    # Servidores únicos com operadores
-    unique_servers = await operators.Operator.aggregate([
-        {"$group": {"_id": "$server_id"}},
-        {"$count": "unique_servers"}
-    ]).to_list(1)
+    if approx:
+        # Totais pelos metadados da coleção, distribuição por uma amostra aleatória e
+        # distintos pelos sketches HyperLogLog. Exclusões só são refletidas nos
+        # sketches após `python -m core.sketches`.
+        total = await operators.Operator.get_pymongo_collection().estimated_document_count()
+        sample = await (
+            SummaryBuilder(operators.Operator, sample_size=settings.summary_sample_size)
+            .count("sampled")
+            .group_count("by_permission", "permission_level")
+            .run()
+        )
+        scale = total / sample["sampled"] if sample["sampled"] else 0
+        return {
+            "total_operators": total,
+            "by_permission_level": {level: round(count * scale) for level, count in sample["by_permission"].items()},
+            "servers_with_operators": await sketches.cardinality("operators.server_id"),
+            "users_as_operators": await sketches.cardinality("operators.user_id"),
+            "approximate": True,
+            "sampled": sample["sampled"],
+            "relative_standard_error": round(STANDARD_ERROR, 4)
+        }
     
-    # Usuários únicos que são operadores
-    unique_users = await operators.Operator.aggregate([
-        {"$group": {"_id": "$user_id"}},
-        {"$count": "unique_users"}
-    ]).to_list(1)
+    summary = await (
+        SummaryBuilder(operators.Operator)
+        .count("total")
+        .group_count("by_permission", "permission_level")
+        .distinct_count("unique_servers", "server_id")
+        .distinct_count("unique_users", "user_id")
+        .run()
+    )
     
     return {
-        "total_operators": total,
-        "by_permission_level": {item["_id"]: item["count"] for item in by_permission},
-        "servers_with_operators": unique_servers[0]["unique_servers"] if unique_servers else 0,
-        "users_as_operators": unique_users[0]["unique_users"] if unique_users else 0
+        "total_operators": summary["total"],
+        "by_permission_level": summary["by_permission"],
+        "servers_with_operators": summary["unique_servers"],
+        "users_as_operators": summary["unique_users"]
     }
@@ -1,17 +1,35 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header, Query
 from beanie import PydanticObjectId
 from beanie.odm.fields import Link
 from fastapi_pagination import Page
 from fastapi_pagination.ext.beanie import apaginate
+from core import compact_properties, property_templates
 from models import java_links, minecraft_maps, operators, servers_properties, servers, softwares, users
 from models.servers import Server
+from core.catalog_cache import catalog_cache
+from core.user_profiles import refresh_profiles_for_server
+from core.jobs import job_queue
+from core.status_buffer import status_buffer
+from core.rcon import RconDisabledError, RconError, rcon
+from core import placement, resource_sampler
+from core.config import settings
+import logging
 from datetime import datetime
+from core.singleflight import single_flight
+from core.summary import SummaryBuilder
+from core import rollups
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/servers",
     tags=["Servers"],
 )
 
+def _with_buffered_status(items: list[Server]) -> list[Server]:
+    """Read-your-writes: aplica os status ainda no buffer de escrita"""
+    return [status_buffer.apply(server) for server in items]
+
 @router.post("/", response_model=Server)
 async def create_server(server_data: servers.ServerCreate):
     """Criar um novo servidor"""
@@ -20,32 +38,44 @@ async def create_server(server_data: servers.ServerCreate):
     if not owner:
         raise HTTPException(status_code=400, detail="Usuário proprietário não encontrado")
     
-    software = await softwares.Software.get(server_data.software_id)
+    software = await catalog_cache.fetch(softwares.Softwares, server_data.software_id)
     if not software:
         raise HTTPException(status_code=400, detail="Software não encontrado")
     
-    java = await java_links.Java.get(server_data.java_id)
+    java = await catalog_cache.fetch(java_links.Java, server_data.java_id)
     if not java:
         raise HTTPException(status_code=400, detail="Versão Java não encontrada")
     
-    server_props = await servers_properties.ServerProperties.get(server_data.server_properties_id)
+    server_props = await servers_properties.ServersProperties.get(server_data.server_properties_id)
     if not server_props:
         raise HTTPException(status_code=400, detail="Propriedades do servidor não encontradas")
     
+    try:
+        server_data.properties_overrides = property_templates.normalize_overrides(server_props, server_data.properties_overrides)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     if server_data.map_id:
-        map_obj = await minecraft_maps.Map.get(server_data.map_id)
+        map_obj = await catalog_cache.fetch(minecraft_maps.MinecraftMap, server_data.map_id)
         if not map_obj:
             raise HTTPException(status_code=400, detail="Mapa não encontrado")
     
     server = Server(**server_data.dict())
     await server.insert()
+    if settings.placement_auto_assign and not server.ip_address:
+        try:
+            await placement.place(server)
+        except placement.PlacementError as e:
+            logger.warning(f"Servidor {server.id} criado sem node: {e}")
+    await rollups.record("servers", server.created_at)
+    await refresh_profiles_for_server(server.id)
     return await Server.get(server.id, fetch_links=True)
 
 @router.get("/", response_model=Page[Server])
 async def list_servers():
     """Listar servidores com paginação"""
     query = Server.find(fetch_links=True)
-    return await apaginate(query)
+    return await apaginate(query, transformer=_with_buffered_status)
 
 @router.get("/{server_id}", response_model=Server)
 async def get_server(server_id: PydanticObjectId):
@@ -54,7 +84,7 @@ async def get_server(server_id: PydanticObjectId):
     if not server:
         raise HTTPException(status_code=404, detail="Servidor não encontrado")
     
-    return server
+    return status_buffer.apply(server)
 
 @router.get("/{server_id}/details", response_model=Server)
 async def get_server_details(server_id: PydanticObjectId):
@@ -63,7 +93,7 @@ async def get_server_details(server_id: PydanticObjectId):
     if not server:
         raise HTTPException(status_code=404, detail="Servidor não encontrado")
     
-    return server
+    return status_buffer.apply(server)
 
 @router.put("/{server_id}", response_model=Server)
 async def update_server(server_id: PydanticObjectId, server_data: servers.ServerCreate):
@@ -74,23 +104,33 @@ async def update_server(server_id: PydanticObjectId, server_data: servers.Server
     
     # Verificar referências se estiverem sendo alteradas
     if server_data.software_id:
-        software = await softwares.Software.get(server_data.software_id)
+        software = await catalog_cache.fetch(softwares.Softwares, server_data.software_id)
         if not software:
             raise HTTPException(status_code=400, detail="Software não encontrado")
     
     if server_data.java_id:
-        java = await java_links.Java.get(server_data.java_id)
+        java = await catalog_cache.fetch(java_links.Java, server_data.java_id)
         if not java:
             raise HTTPException(status_code=400, detail="Versão Java não encontrada")
     
     if server_data.map_id:
-        map_obj = await minecraft_maps.Map.get(server_data.map_id)
+        map_obj = await catalog_cache.fetch(minecraft_maps.MinecraftMap, server_data.map_id)
         if not map_obj:
             raise HTTPException(status_code=400, detail="Mapa não encontrado")
     
     # Atualizar campos
+    previous_owner_id = server.owner_id
     update_data = server_data.dict(exclude_unset=True)
+    if "properties_overrides" in update_data:
+        template = await servers_properties.ServersProperties.get(server_data.server_properties_id)
+        if not template:
+            raise HTTPException(status_code=400, detail="Propriedades do servidor não encontradas")
+        try:
+            update_data["properties_overrides"] = property_templates.normalize_overrides(template, server_data.properties_overrides)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     await server.update({"$set": update_data})
+    await refresh_profiles_for_server(server.id, previous_owner_id)
     
     return await Server.get(server.id, fetch_links=True)
 
@@ -101,14 +141,173 @@ async def delete_server(server_id: PydanticObjectId):
     if not server:
         raise HTTPException(status_code=404, detail="Servidor não encontrado")
     
+    await placement.release(server)
     await server.delete()
+    await rollups.record("servers", server.created_at, -1)
+    await refresh_profiles_for_server(server_id)
+    await rcon.discard(server_id)
     return {"message": "Servidor excluído com sucesso"}
 
+@router.get("/{server_id}/properties", response_model=servers_properties.ServersProperties)
+async def get_server_properties(server_id: PydanticObjectId):
+    """Propriedades efetivas do servidor (template + overrides)"""
+    server = await Server.get(server_id)
+    if not server:
+        raise HTTPException(status_code=404, detail="Servidor não encontrado")
+    
+    properties = await property_templates.effective_properties(server)
+    if not properties:
+        raise HTTPException(status_code=404, detail="Propriedades do servidor não encontradas")
+    return properties
+
+@router.patch("/{server_id}/properties", response_model=servers_properties.ServersProperties)
+async def patch_server_properties(server_id: PydanticObjectId, properties_update: dict):
+    """Alterar as propriedades de um servidor (copy-on-write, o template não é alterado)"""
+    server = await Server.get(server_id)
+    if not server:
+        raise HTTPException(status_code=404, detail="Servidor não encontrado")
+    
+    try:
+        return await property_templates.patch_server_properties(server, properties_update)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/status/", status_code=202)
+async def ingest_servers_status(reports: list[servers.ServerStatusBatchItem]):
+    """Receber mudanças de status em lote (gravadas de forma agrupada em segundo plano)"""
+    for report in reports:
+        status_buffer.record(report.server_id, report.status, report.at)
+    return {"accepted": len(reports)}
+
+@router.post("/{server_id}/status", status_code=202)
+async def ingest_server_status(server_id: PydanticObjectId, report: servers.ServerStatusReport):
+    """Receber uma mudança de status do servidor (gravada em segundo plano)"""
+    status_buffer.record(server_id, report.status, report.at)
+    return {"server_id": str(server_id), "status": report.status}
+
+@router.post("/rcon/broadcast")
+async def broadcast_rcon_command(payload: servers.RconBroadcast):
+    """Executar um comando RCON em vários servidores (resultado por servidor)"""
+    found = await Server.find({"_id": {"$in": payload.server_ids}}).to_list()
+    results = await rcon.broadcast(found, payload.command, payload.concurrency)
+    for server_id in {str(server_id) for server_id in payload.server_ids} - set(results):
+        results[server_id] = {"error": "Servidor não encontrado"}
+    return {"command": payload.command, "results": results}
+
+@router.post("/{server_id}/rcon")
+async def execute_rcon_command(server_id: PydanticObjectId, payload: servers.RconCommand):
+    """Executar um comando no servidor via RCON"""
+    server = await Server.get(server_id)
+    if not server:
+        raise HTTPException(status_code=404, detail="Servidor não encontrado")
+    
+    try:
+        response = await rcon.execute(server, payload.command)
+    except RconDisabledError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except TimeoutError:
+        raise HTTPException(status_code=504, detail="Tempo esgotado aguardando o RCON")
+    except (RconError, OSError) as e:
+        raise HTTPException(status_code=502, detail=f"Falha no RCON: {e}")
+    return {"command": payload.command, "response": response}
+
+async def _submit_lifecycle_job(server_id: PydanticObjectId, job_type: str, idempotency_key: str | None, params: dict | None = None):
+    server = await Server.get(server_id)
+    if not server:
+        raise HTTPException(status_code=404, detail="Servidor não encontrado")
+    
+    job = await job_queue.submit(job_type, server_id=server.id, params=params, idempotency_key=idempotency_key)
+    return {"job_id": str(job.id), "type": job.type, "status": job.status}
+
+@router.post("/{server_id}/start", status_code=202)
+async def start_server(server_id: PydanticObjectId, idempotency_key: str | None = Header(None)):
+    """Iniciar o servidor (assíncrono, retorna o ID do job)"""
+    return await _submit_lifecycle_job(server_id, "start", idempotency_key)
+
+@router.post("/{server_id}/stop", status_code=202)
+async def stop_server(server_id: PydanticObjectId, force: bool = False, idempotency_key: str | None = Header(None)):
+    """Parar o servidor (assíncrono, retorna o ID do job)"""
+    return await _submit_lifecycle_job(server_id, "stop", idempotency_key, {"force": force})
+
+@router.post("/{server_id}/place")
+async def place_server(server_id: PydanticObjectId, node_id: PydanticObjectId | None = None):
+    """Alocar o servidor em um node (escolhido por bin packing ou informado) e reservar uma porta"""
+    server = await Server.get(server_id)
+    if not server:
+        raise HTTPException(status_code=404, detail="Servidor não encontrado")
+    
+    try:
+        node = await placement.place(server, node_id)
+    except placement.PlacementError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {
+        "server_id": str(server.id),
+        "node_id": str(node.id),
+        "node": node.name,
+        "ip_address": server.ip_address,
+        "port": server.port,
+        "cpu_reserved": server.cpu_reserved,
+        "memory_reserved_mb": server.memory_reserved_mb,
+    }
+
+@router.post("/{server_id}/hibernate", status_code=202)
+async def hibernate_server(server_id: PydanticObjectId, idempotency_key: str | None = Header(None)):
+    """Hibernar o servidor: para o processo e deixa um proxy que o acorda no login"""
+    return await _submit_lifecycle_job(server_id, "hibernate", idempotency_key)
+
+@router.get("/metrics/top")
+async def get_top_servers_by_usage(
+    range_: str = Query("15m", alias="range"),
+    by: str = "cpu_avg",
+    limit: int = Query(10, ge=1, le=100),
+    node_id: PydanticObjectId | None = None,
+):
+    """Servidores que mais consumiram recursos no intervalo (opcionalmente em um node)"""
+    server_ids = None
+    if node_id:
+        server_ids = [server.id async for server in Server.find(Server.node_id == node_id)]
+    try:
+        seconds = resource_sampler.parse_range(range_)
+        servers_top = await resource_sampler.top(seconds, by, limit, server_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"range": range_, "by": by, "servers": servers_top}
+
+@router.get("/{server_id}/metrics")
+async def get_server_metrics(
+    server_id: PydanticObjectId,
+    range_: str = Query("1h", alias="range"),
+    resolution: str | None = Query(None, pattern="^(raw|1m|1h)$"),
+):
+    """Série de CPU, memória, threads e IO do processo do servidor.
+
+    Sem `resolution`, usa amostras brutas até 2h, rollups de 1 minuto até 2
+    dias e de 1 hora acima disso.
+    """
+    server = await Server.get(server_id)
+    if not server:
+        raise HTTPException(status_code=404, detail="Servidor não encontrado")
+    try:
+        seconds = resource_sampler.parse_range(range_)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"range": range_, **await resource_sampler.series(server.id, seconds, resolution)}
+
+@router.post("/{server_id}/download", status_code=202)
+async def download_server(server_id: PydanticObjectId, idempotency_key: str | None = Header(None)):
+    """Baixar o jar do software do servidor (assíncrono, retorna o ID do job)"""
+    return await _submit_lifecycle_job(server_id, "download", idempotency_key)
+
+@router.post("/{server_id}/apply-properties", status_code=202)
+async def apply_server_properties(server_id: PydanticObjectId, idempotency_key: str | None = Header(None)):
+    """Gravar o server.properties do servidor (assíncrono, retorna o ID do job)"""
+    return await _submit_lifecycle_job(server_id, "apply_properties", idempotency_key)
+
 @router.get("/search/by-name/{name}", response_model=Page[Server])
 async def search_servers_by_name(name: str):
     """Busca case-insensitive por nome do servidor"""
     query = Server.find({"name": {"$regex": name, "$options": "i"}}, fetch_links=True)
-    return await apaginate(query)
+    return await apaginate(query, transformer=_with_buffered_status)
 
 @router.get("/owner/{owner_id}/servers", response_model=Page[Server])
 async def get_servers_by_owner(owner_id: PydanticObjectId):
@@ -119,7 +318,7 @@ async def get_servers_by_owner(owner_id: PydanticObjectId):
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
     
     query = Server.find(Server.owner_id == owner_id, fetch_links=True)
-    return await apaginate(query)
+    return await apaginate(query, transformer=_with_buffered_status)
 
 @router.get("/by-year/{year}", response_model=Page[Server])
 async def get_servers_by_year(year: int):
@@ -133,7 +332,7 @@ async def get_servers_by_year(year: int):
             "$lt": end_date
         }
     }, fetch_links=True)
-    return await apaginate(query)
+    return await apaginate(query, transformer=_with_buffered_status)
 
 @router.get("/by-date-range", response_model=Page[Server])
 async def get_servers_by_date_range(
@@ -167,7 +366,7 @@ async def get_servers_by_date_range(
         query_filter["created_at"] = {"$lt": end_date}
     
     query = Server.find(query_filter, fetch_links=True)
-    return await apaginate(query)
+    return await apaginate(query, transformer=_with_buffered_status)
 
 
 @router.get("/status/{status}/count")
@@ -177,23 +376,19 @@ async def count_servers_by_status(status: str):
     return {"status": status, "count": count}
 
 @router.get("/stats/summary")
+@single_flight
 async def get_servers_summary():
     """Resumo estatístico dos servidores"""
-    pipeline = [
-        {
-            "$group": {
-                "_id": "$status",
-                "count": {"$sum": 1}
-            }
-        }
-    ]
-    
-    status_counts = await Server.aggregate(pipeline).to_list()
-    total_servers = await Server.count()
+    summary = await (
+        SummaryBuilder(Server)
+        .count("total")
+        .group_count("by_status", "status")
+        .run()
+    )
     
     return {
-        "total_servers": total_servers,
-        "by_status": {item["_id"]: item["count"] for item in status_counts}
+        "total_servers": summary["total"],
+        "by_status": summary["by_status"]
     }
 
 @router.get("/with-operators/count")
@@ -343,25 +538,13 @@ async def average_operators_per_server():
     return {"average_operators_stats": stats}
 
 @router.get("/aggregations/servers-by-creation-month")
-async def servers_by_creation_month():
-    """Servidores criados por mês"""
-    pipeline = [
-        {
-            "$group": {
-                "_id": {
-                    "year": {"$year": "$created_at"},
-                    "month": {"$month": "$created_at"}
-                },
-                "count": {"$sum": 1},
-                "servers": {"$push": {"name": "$name", "created_at": "$created_at"}}
-            }
-        },
-        {
-            "$sort": {"_id.year": -1, "_id.month": -1}
-        }
-    ]
+async def servers_by_creation_month(granularity: str = "month", year: int | None = None):
+    """Servidores criados por mês (ou dia), lidos dos rollups pré-agregados"""
+    if granularity not in rollups.GRANULARITIES:
+        raise HTTPException(status_code=400, detail="Granularidade deve ser day ou month")
     
-    result = await Server.aggregate(pipeline).to_list()
+    start, end = (datetime(year, 1, 1), datetime(year + 1, 1, 1)) if year else (None, None)
+    result = await rollups.histogram("servers", granularity, start, end)
     return {"servers_by_month": result}
 
 @router.get("/complex/servers-with-details")
@@ -427,6 +610,7 @@ async def servers_with_complete_details():
                 "software": {"$arrayElemAt": ["$software", 0]},
                 "java": {"$arrayElemAt": ["$java", 0]},
                 "properties": {"$arrayElemAt": ["$properties", 0]},
+                "properties_overrides": 1,
                 "map": {"$arrayElemAt": ["$map", 0]},
                 "operators_count": {"$size": "$operators"},
                 "operators": "$operators"
@@ -435,4 +619,9 @@ async def servers_with_complete_details():
     ]
     
     result = await Server.aggregate(pipeline).to_list()
+    for server in result:
+        properties = compact_properties.materialize(server.get("properties"))
+        if properties:
+            properties = {**properties, **server.get("properties_overrides", {})}
+        server["properties"] = properties
     return {"servers_with_details": result}
@@ -4,6 +4,11 @@ from beanie.odm.fields import Link
 from fastapi_pagination import Page
 from fastapi_pagination.ext.beanie import apaginate
 from models import java_links, minecraft_maps, operators, servers_properties, servers, softwares, users
+from core.singleflight import single_flight
+from core.summary import SummaryBuilder
+from core.sorting import resolve_sort
+from core import compact_properties, property_templates
+from pymongo.errors import DuplicateKeyError
 
 router = APIRouter(
     prefix="/servers_properties",
@@ -17,14 +22,14 @@ async def read_server_properties(
     search: str | None = None
 ):
     if search:
-        query = servers_properties.ServersProperties.find({
+        query = servers_properties.ServersProperties.find(compact_properties.translate_filter({
             "$or": [
                 {"motd": {"$regex": search, "$options": "i"}},
                 {"level_name": {"$regex": search, "$options": "i"}},
                 {"gamemode": {"$regex": search, "$options": "i"}},
                 {"difficulty": {"$regex": search, "$options": "i"}}
             ]
-        })
+        }))
     else:
         query = servers_properties.ServersProperties.find_all()
     
@@ -63,27 +68,46 @@ async def search_server_properties(
     if max_players is not None:
         filters["max_players"] = max_players
     
-    query = servers_properties.ServersProperties.find(filters)
+    query = servers_properties.ServersProperties.find(compact_properties.translate_filter(filters))
     return await apaginate(query)
 
 @router.get("/count/")
-async def count_server_properties():
-    count = await servers_properties.ServersProperties.count()
-    return {"count": count}
+async def count_server_properties(approx: bool = False):
+    collection = servers_properties.ServersProperties.get_pymongo_collection()
+    if approx:
+        count = await collection.estimated_document_count()
+    else:
+        count = await servers_properties.ServersProperties.count()
+    return {"count": count, "approximate": approx}
 
 @router.get("/ordered/", response_model=Page[servers_properties.ServersProperties])
 async def read_server_properties_ordered(
     order_by: str = "id",
-    desc: bool = False
+    desc: bool = False,
+    gamemode: str | None = None,
+    difficulty: str | None = None
 ):
-    sort_order = -1 if desc else 1
-    query = servers_properties.ServersProperties.find_all().sort([(order_by, sort_order)])
+    filters = {}
+    if gamemode:
+        filters["gamemode"] = gamemode
+    if difficulty:
+        filters["difficulty"] = difficulty
+    
+    sort = await resolve_sort(
+        servers_properties.ServersProperties,
+        servers_properties.SORTABLE_FIELDS,
+        order_by,
+        desc,
+        filters,
+        servers_properties.SORT_FILTER_FIELDS,
+    )
+    query = servers_properties.ServersProperties.find(filters).sort(sort)
     return await apaginate(query)
 
 @router.post("/", response_model=servers_properties.ServersProperties)
 async def create_server_properties(properties: servers_properties.ServersProperties):
-    await properties.insert()
-    return properties
+    """Criar (ou reutilizar, se já existir um idêntico) um template de propriedades"""
+    return await property_templates.get_or_create_template(properties)
 
 @router.patch("/{properties_id}", response_model=servers_properties.ServersProperties)
 async def update_server_properties(
@@ -94,8 +118,16 @@ async def update_server_properties(
     if not properties:
         raise HTTPException(status_code=404, detail="Server properties not found")
     
-    await properties.update({"$set": properties_update})
-    await properties.save()
+    # Altera o template para todos os servidores que o usam; para um único
+    # servidor use PATCH /servers/{server_id}/properties
+    properties = servers_properties.ServersProperties.model_validate(
+        {**properties.model_dump(), **properties_update}
+    )
+    properties.content_hash = property_templates.content_hash(properties)
+    try:
+        await compact_properties.replace(properties)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Já existe um template com estas propriedades")
     return properties
 
 @router.delete("/{properties_id}")
@@ -103,6 +135,9 @@ async def delete_server_properties(properties_id: PydanticObjectId):
     properties = await servers_properties.ServersProperties.get(properties_id)
     if not properties:
         raise HTTPException(status_code=404, detail="Server properties not found")
+    # Templates são compartilhados: excluir um em uso deixaria servidores sem propriedades
+    if await servers.Server.find(servers.Server.server_properties_id == properties.id).count():
+        raise HTTPException(status_code=409, detail="Template ainda é usado por servidores")
     
     await properties.delete()
     return {"message": "Server properties deleted successfully"}
@@ -143,7 +178,7 @@ async def properties_by_difficulty():
                 "count": {"$sum": 1},
                 "avg_max_players": {"$avg": "$max_players"},
                 "hardcore_count": {
-                    "$sum": {"$cond": [{"$eq": ["$hardcore", True]}, 1, 0]}
+                    "$sum": {"$cond": [{"$eq": [compact_properties.field_expr("hardcore"), True]}, 1, 0]}
                 }
             }
         },
@@ -214,8 +249,13 @@ async def properties_usage_by_servers():
                 "gamemode": 1,
                 "difficulty": 1,
                 "max_players": 1,
-                "motd": 1,
+                "motd": compact_properties.field_expr("motd"),
                 "servers_count": {"$size": "$servers_using"},
+                "servers_with_overrides": {"$size": {"$filter": {
+                    "input": "$servers_using",
+                    "as": "server",
+                    "cond": {"$gt": [{"$size": {"$objectToArray": {"$ifNull": ["$$server.properties_overrides", {}]}}}, 0]},
+                }}},
                 "servers": {
                     "$map": {
                         "input": "$servers_using",
@@ -247,37 +287,31 @@ async def filter_by_max_players(min_players: int = 0, max_players: int = 1000):
 @router.get("/filter/hardcore-servers", response_model=Page[servers_properties.ServersProperties])
 async def get_hardcore_properties():
     """Propriedades de servidores hardcore"""
-    query = servers_properties.ServersProperties.find({"hardcore": True})
+    query = servers_properties.ServersProperties.find(compact_properties.translate_filter({"hardcore": True}))
     return await apaginate(query)
 
 @router.get("/stats/advanced-summary")
+@single_flight
 async def get_advanced_properties_summary():
     """Resumo avançado das propriedades de servidor"""
-    total = await servers_properties.ServersProperties.count()
-    
-    # Estatísticas por modo de jogo
-    by_gamemode = await servers_properties.ServersProperties.aggregate([
-        {"$group": {"_id": "$gamemode", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ]).to_list()
-    
-    # Estatísticas por dificuldade
-    by_difficulty = await servers_properties.ServersProperties.aggregate([
-        {"$group": {"_id": "$difficulty", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ]).to_list()
-    
-    # Contadores booleanos
-    hardcore_count = await servers_properties.ServersProperties.find({"hardcore": True}).count()
-    online_mode_count = await servers_properties.ServersProperties.find({"online_mode": True}).count()
-    flight_enabled = await servers_properties.ServersProperties.find({"allow_flight": True}).count()
+    summary = await (
+        SummaryBuilder(servers_properties.ServersProperties)
+        .count("total")
+        .group_count("by_gamemode", "gamemode")
+        .group_count("by_difficulty", "difficulty")
+        .count("hardcore", compact_properties.translate_filter({"hardcore": True}))
+        .count("online_mode", compact_properties.translate_filter({"online_mode": True}))
+        .count("allow_flight", compact_properties.translate_filter({"allow_flight": True}))
+        .run()
+    )
+    total = summary["total"]
     
     return {
         "total_properties": total,
-        "by_gamemode": {item["_id"]: item["count"] for item in by_gamemode},
-        "by_difficulty": {item["_id"]: item["count"] for item in by_difficulty},
-        "hardcore_servers": hardcore_count,
-        "online_mode_enabled": online_mode_count,
-        "flight_enabled": flight_enabled,
-        "offline_mode_enabled": total - online_mode_count
+        "by_gamemode": summary["by_gamemode"],
+        "by_difficulty": summary["by_difficulty"],
+        "hardcore_servers": summary["hardcore"],
+        "online_mode_enabled": summary["online_mode"],
+        "flight_enabled": summary["allow_flight"],
+        "offline_mode_enabled": total - summary["online_mode"]
     }
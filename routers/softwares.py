@@ -4,6 +4,10 @@ from beanie.odm.fields import Link
 from fastapi_pagination import Page
 from fastapi_pagination.ext.beanie import apaginate
 from models.softwares import Softwares
+from core.catalog_cache import catalog_cache
+from datetime import datetime
+from core.singleflight import single_flight
+from core.summary import SummaryBuilder
 
 router = APIRouter(
     prefix="/softwares",
@@ -16,7 +20,7 @@ async def read_software():
 
 @router.get("/{software_id}", response_model=Softwares)
 async def read_software_by_id(software_id: PydanticObjectId):
-    software = await Softwares.get(software_id)
+    software = await catalog_cache.fetch(Softwares, software_id)
     if not software:
         raise HTTPException(status_code=404, detail="Software not found")
     return software
@@ -25,6 +29,7 @@ async def read_software_by_id(software_id: PydanticObjectId):
 async def create_software(software_data: Softwares):
     software = Softwares(**software_data.dict(exclude_unset=True))
     await software.insert()
+    catalog_cache.put(software)
     return software
 
 @router.patch("/{software_id}", response_model=Softwares)
@@ -36,8 +41,10 @@ async def update_software(
     if not software:
         raise HTTPException(status_code=404, detail="Software not found")
     
-    await software.update({"$set": software_update})
-    return await Softwares.get(software_id)
+    await software.update({"$set": {**software_update, "updated_at": datetime.utcnow()}})
+    software = await Softwares.get(software_id)
+    catalog_cache.put(software)
+    return software
 
 @router.delete("/{software_id}")
 async def delete_software(software_id: PydanticObjectId):
@@ -46,6 +53,7 @@ async def delete_software(software_id: PydanticObjectId):
         raise HTTPException(status_code=404, detail="Software not found")
     
     await software.delete()
+    catalog_cache.discard(Softwares, software_id)
     return {"message": "Software deleted successfully"}
 
 @router.get("/search/by-name/{name}", response_model=Page[Softwares])
@@ -141,15 +149,21 @@ async def softwares_by_capabilities():
     return {"softwares_by_capabilities": result}
 
 @router.get("/stats/summary")
+@single_flight
 async def get_softwares_summary():
     """Resumo estatístico dos softwares"""
-    total = await Softwares.count()
-    with_plugins = await Softwares.find({"plugins_enabled": True}).count()
-    with_mods = await Softwares.find({"mods_enabled": True}).count()
-    both_capabilities = await Softwares.find({
-        "plugins_enabled": True,
-        "mods_enabled": True
-    }).count()
+    summary = await (
+        SummaryBuilder(Softwares)
+        .count("total")
+        .count("with_plugins", {"plugins_enabled": True})
+        .count("with_mods", {"mods_enabled": True})
+        .count("both", {"plugins_enabled": True, "mods_enabled": True})
+        .run()
+    )
+    total = summary["total"]
+    with_plugins = summary["with_plugins"]
+    with_mods = summary["with_mods"]
+    both_capabilities = summary["both"]
     
     return {
         "total_softwares": total,
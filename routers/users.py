@@ -4,6 +4,9 @@ from beanie.odm.fields import Link
 from fastapi_pagination import Page
 from fastapi_pagination.ext.beanie import apaginate
 from models.users import User
+from models.user_profiles import UserProfile
+from core.user_profiles import refresh_user_profile
+from core import rollups
 from datetime import datetime
 
 router = APIRouter(
@@ -36,6 +39,8 @@ async def create_user(user: User):
         raise HTTPException(status_code=400, detail="Conta já cadastrada")
     
     await user.insert()
+    await rollups.record("users", user.created_at)
+    await refresh_user_profile(user.id)
     return user
 
 @router.put("/{user_id}", response_model=User)
@@ -48,6 +53,7 @@ async def update_user(user_id: PydanticObjectId, user_data: dict):
         setattr(user, key, value)
 
     await user.save()
+    await refresh_user_profile(user.id)
     return user
 
 @router.delete("/{user_id}")
@@ -57,6 +63,8 @@ async def delete_user(user_id: PydanticObjectId):
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
     
     await user.delete()
+    await rollups.record("users", user.created_at, -1)
+    await refresh_user_profile(user_id)
     return {"message": "Usuário excluído com sucesso"}
 
 @router.get("/search/by-username/{username}", response_model=Page[User])
@@ -65,10 +73,14 @@ async def search_users_by_username(username: str):
     return await apaginate(query)
 
 @router.get("/count")
-async def get_users_stats():
-    total = await User.count()
+async def get_users_stats(approx: bool = False):
+    # approx usa os metadados da coleção, sem varrer os documentos
+    if approx:
+        total = await User.get_pymongo_collection().estimated_document_count()
+    else:
+        total = await User.count()
     
-    return { "total_users": total }
+    return { "total_users": total, "approximate": approx }
 
 @router.get("/by-year/{year}", response_model=Page[User])
 async def get_users_by_year(year: int):
@@ -181,75 +193,23 @@ async def users_as_operators():
     return {"users_as_operators": result}
 
 @router.get("/aggregations/registration-by-month")
-async def users_registration_by_month():
-    """Usuários registrados por mês"""
-    pipeline = [
-        {
-            "$group": {
-                "_id": {
-                    "year": {"$year": "$created_at"},
-                    "month": {"$month": "$created_at"}
-                },
-                "count": {"$sum": 1},
-                "users": {"$push": {"username": "$username", "created_at": "$created_at"}}
-            }
-        },
-        {
-            "$sort": {"_id.year": -1, "_id.month": -1}
-        }
-    ]
+async def users_registration_by_month(granularity: str = "month", year: int | None = None):
+    """Usuários registrados por mês (ou dia), lidos dos rollups pré-agregados"""
+    if granularity not in rollups.GRANULARITIES:
+        raise HTTPException(status_code=400, detail="Granularidade deve ser day ou month")
     
-    result = await User.aggregate(pipeline).to_list()
+    start, end = (datetime(year, 1, 1), datetime(year + 1, 1, 1)) if year else (None, None)
+    result = await rollups.histogram("users", granularity, start, end)
     return {"users_by_month": result}
 
 @router.get("/complex/complete-user-profile/{user_id}")
 async def get_complete_user_profile(user_id: PydanticObjectId):
     """Perfil completo do usuário com servidores próprios e onde é operador"""
-    pipeline = [
-        {
-            "$match": {"_id": user_id}
-        },
-        {
-            "$lookup": {
-                "from": "servers",
-                "localField": "_id",
-                "foreignField": "owner_id",
-                "as": "owned_servers"
-            }
-        },
-        {
-            "$lookup": {
-                "from": "operators",
-                "localField": "_id", 
-                "foreignField": "user_id",
-                "as": "operator_roles"
-            }
-        },
-        {
-            "$lookup": {
-                "from": "servers",
-                "localField": "operator_roles.server_id",
-                "foreignField": "_id",
-                "as": "operator_servers"
-            }
-        },
-        {
-            "$project": {
-                "username": 1,
-                "email": 1,
-                "created_at": 1,
-                "owned_servers_count": {"$size": "$owned_servers"},
-                "operator_roles_count": {"$size": "$operator_roles"},
-                "owned_servers": "$owned_servers",
-                "operator_roles": "$operator_roles",
-                "operator_servers": "$operator_servers"
-            }
-        }
-    ]
-    
-    result = await User.aggregate(pipeline).to_list(1)
-    if not result:
+    # Leitura direta do read model; perfis ausentes são montados sob demanda
+    profile = await UserProfile.find_one(UserProfile.user_id == user_id)
+    if not profile:
+        profile = await refresh_user_profile(user_id)
+    if not profile:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
     
-    return {"complete_profile": result[0]}
-
+    return {"complete_profile": profile}
@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+from beanie.odm.utils.init import Initializer
+from pymongo import AsyncMongoClient
+
+
+class _OfflineInitializer(Initializer):
+    """init_beanie sem servidor: não consulta versão/coleções nem cria índices"""
+
+    async def _load_cached_info(self):
+        self._database_major_version = 7
+        self._existing_collections = [model.Settings.name for model in self.document_models]
+
+
+@pytest.fixture(scope="session")
+def beanie_offline():
+    """Inicializa os modelos contra um cliente que nunca conecta.
+
+    Permite construir documentos e usar expressões de campo (Server.status);
+    testes que precisam do banco trocam get_pymongo_collection por um fake.
+    """
+    from database import DOCUMENT_MODELS
+
+    client = AsyncMongoClient("mongodb://127.0.0.1:1", connect=False)
+
+    async def init():
+        await _OfflineInitializer(database=client["test"], document_models=DOCUMENT_MODELS, skip_indexes=True)
+
+    asyncio.run(init())
+    yield
+    asyncio.run(client.close())
@@ -0,0 +1,67 @@
+import asyncio
+import struct
+
+from core.rcon import encode_packet
+
+MAX_FRAGMENT = 4096
+
+
+class FakeRconServer:
+    """Servidor RCON local que imita o Minecraft vanilla.
+
+    Respostas longas são divididas em pacotes de 4096 bytes, e tipos
+    desconhecidos (o marcador do cliente) recebem (-1, 2, ""). Com
+    `echo_markers`, o marcador é ecoado com o próprio id, como em servidores
+    Source.
+    """
+
+    def __init__(self, password: str = "secret", responses: dict | None = None, delay: float = 0.0, echo_markers: bool = False):
+        self.password = password
+        self.responses = responses or {}
+        self.delay = delay
+        self.echo_markers = echo_markers
+        self.commands: list[str] = []
+        self.connections = 0
+        self._server: asyncio.Server | None = None
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                (length,) = struct.unpack("<i", await reader.readexactly(4))
+                payload = await reader.readexactly(length)
+                request_id, packet_type = struct.unpack("<ii", payload[:8])
+                body = payload[8:-2].decode()
+                if packet_type == 3:
+                    writer.write(encode_packet(request_id if body == self.password else -1, 2, ""))
+                elif packet_type == 2:
+                    self.commands.append(body)
+                    if self.delay:
+                        await asyncio.sleep(self.delay)
+                    response = self.responses.get(body, "").encode()
+                    fragments = [response[i:i + MAX_FRAGMENT] for i in range(0, len(response), MAX_FRAGMENT)] or [b""]
+                    for fragment in fragments:
+                        payload = struct.pack("<ii", request_id, 0) + fragment + b"\x00\x00"
+                        writer.write(struct.pack("<i", len(payload)) + payload)
+                elif self.echo_markers:
+                    writer.write(encode_packet(request_id, 0, ""))
+                    writer.write(encode_packet(request_id, 0, "\x00\x01"))  # pacote extra do Source
+                else:
+                    writer.write(encode_packet(-1, 2, ""))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,54 @@
+import asyncio
+import json
+
+from core import slp
+
+
+class FakeSlpServer:
+    """Servidor local que responde ao Server List Ping como o Minecraft.
+
+    Responde o status com `online`/`max` jogadores e ecoa o ping; com
+    `answer_ping=False` ignora o ping, como alguns proxies.
+    """
+
+    def __init__(self, online: int = 3, max_players: int = 20, answer_ping: bool = True):
+        self.online = online
+        self.max_players = max_players
+        self.answer_ping = answer_ping
+        self.connections = 0
+        self._server: asyncio.Server | None = None
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            packet_id, payload = await slp.read_packet(reader)
+            assert packet_id == 0x00 and slp.unpack_varint(payload, len(payload) - 1)[0] == 1  # next_state=1
+            await slp.read_packet(reader)  # status request
+            status = {
+                "version": {"name": "1.21.1", "protocol": 767},
+                "players": {"online": self.online, "max": self.max_players},
+                "description": {"text": "fake"},
+            }
+            writer.write(slp.pack_packet(0x00, slp.pack_string(json.dumps(status))))
+            await writer.drain()
+            packet_id, payload = await slp.read_packet(reader)
+            if packet_id == 0x01 and self.answer_ping:
+                writer.write(slp.pack_packet(0x01, payload))
+                await writer.drain()
+            await reader.read()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,100 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, FastAPI
+
+from core.admission import DEFAULT_ROUTE_COSTS, AdmissionController
+from core.config import settings
+
+
+def _app(controller: AdmissionController) -> FastAPI:
+    router = APIRouter(prefix="/servers")
+
+    @router.get("/complex/by-node")
+    async def heavy():
+        return {}
+
+    @router.get("/{server_id}")
+    async def read_server(server_id: str):
+        return {}
+
+    @router.get("/{server_id}/players")
+    async def read_players(server_id: str):
+        return {}
+
+    app = FastAPI(dependencies=[Depends(controller.admit)])
+    app.include_router(router)
+    return app
+
+
+def _get(app: FastAPI, path: str) -> tuple[int, dict]:
+    """Chamada ASGI direta, sem cliente HTTP"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": b"", "headers": [], "client": ("10.0.0.1", 5000), "server": ("test", 80),
+    }
+    asyncio.run(app(scope, receive, send))
+    start = messages[0]
+    return start["status"], {key.decode(): value.decode() for key, value in start["headers"]}
+
+
+def test_route_cost_keys():
+    controller = AdmissionController(DEFAULT_ROUTE_COSTS, max_heavy=1)
+    assert controller.route_cost("/servers/complex/by-node", "/servers/complex/by-node") == ("/servers/complex/*", 100)
+    assert controller.route_cost("/servers/abc", "/servers/{server_id}") == ("/servers/{server_id}", 1)
+
+
+def test_unlisted_routes_get_one_bucket_per_template(monkeypatch):
+    monkeypatch.setattr(settings, "admission_client_rate", 1000.0)
+    monkeypatch.setattr(settings, "admission_client_burst", 1000.0)
+    monkeypatch.setattr(settings, "admission_route_rate", 0.001)
+    monkeypatch.setattr(settings, "admission_route_burst", 3.0)
+    controller = AdmissionController(DEFAULT_ROUTE_COSTS, max_heavy=1)
+    app = _app(controller)
+
+    # Paths concretos diferentes do mesmo template dividem o balde
+    assert [_get(app, f"/servers/{i}")[0] for i in range(4)] == [200, 200, 200, 429]
+    # Outra rota não listada ainda tem o seu balde inteiro
+    assert [_get(app, f"/servers/{i}/players")[0] for i in range(3)] == [200, 200, 200]
+    assert set(controller._route_buckets) == {"/servers/{server_id}", "/servers/{server_id}/players"}
+
+    status, headers = _get(app, "/servers/9")
+    assert status == 429 and int(headers["retry-after"]) >= 1
+
+
+def test_client_bucket_is_refunded_when_route_rejects(monkeypatch):
+    monkeypatch.setattr(settings, "admission_client_rate", 0.001)
+    monkeypatch.setattr(settings, "admission_client_burst", 3.0)
+    monkeypatch.setattr(settings, "admission_route_rate", 0.001)
+    monkeypatch.setattr(settings, "admission_route_burst", 1.0)
+    controller = AdmissionController(DEFAULT_ROUTE_COSTS, max_heavy=1)
+    app = _app(controller)
+
+    assert _get(app, "/servers/a")[0] == 200
+    assert _get(app, "/servers/b")[0] == 429
+    assert _get(app, "/servers/a/players")[0] == 200
+    assert controller._client_buckets["10.0.0.1"].tokens >= 1 - 0.01
+
+
+def test_admission_runs_inside_request_log():
+    import main
+
+    # Dependência global: o 429 é uma resposta comum para o middleware de log
+    assert any(dependency.dependency == main.admission.admit for dependency in main.app.router.dependencies)
+    dispatchers = [middleware.kwargs["dispatch"].__name__ for middleware in main.app.user_middleware]
+    assert dispatchers == ["log_requests"]
+
+
+def test_heavy_routes_release_their_slot():
+    controller = AdmissionController(DEFAULT_ROUTE_COSTS, max_heavy=1)
+    app = _app(controller)
+    assert [_get(app, "/servers/complex/by-node")[0] for _ in range(2)] == [200, 200]
+    assert not controller.heavy.locked()
@@ -0,0 +1,74 @@
+import hashlib
+import os
+import struct
+import time
+
+import pytest
+
+from core import backups
+
+
+def _region(chunks: dict[int, bytes]) -> bytes:
+    header, body, sector = bytearray(8192), bytearray(), 2
+    for index, data in chunks.items():
+        sectors = -(-len(data) // 4096)
+        struct.pack_into(">I", header, index * 4, (sector << 8) | sectors)
+        body += data.ljust(sectors * 4096, b"\0")
+        sector += sectors
+    return bytes(header + body)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    chunk_store = backups.ChunkStore(str(tmp_path))
+    monkeypatch.setattr(backups, "store", chunk_store)
+    return chunk_store
+
+
+def test_region_segments_follow_location_table():
+    data = _region({0: b"a" * 5000, 7: b"b" * 100})
+    segments = backups.region_segments(data)
+    assert segments[0] == (0, 8192)
+    assert segments[-1][1] == len(data)
+    assert len(segments) == 3
+
+
+def test_invalid_region_falls_back_to_blocks():
+    assert backups.region_segments(b"\xff" * 8192 + b"\0" * 4096) == [(0, 12288)]
+
+
+def test_changed_chunk_stores_only_its_segment(tmp_path, store):
+    chunks = {index: os.urandom(3000) for index in range(0, 64, 3)}
+    path = tmp_path / "r.0.0.mca"
+    path.write_bytes(_region(chunks))
+    _, new, _ = backups._chunk_file(str(path))
+    assert new == len(chunks) + 1
+
+    chunks[3] = os.urandom(3000)
+    path.write_bytes(_region(chunks))
+    digests, new, _ = backups._chunk_file(str(path))
+    assert new == 1  # mesmo número de setores: o cabeçalho não muda
+    assert b"".join(store.get(digest) for digest in digests) == path.read_bytes()
+
+
+def test_corrupted_object_is_rejected(store):
+    data = b"chunk" * 100
+    digest = hashlib.sha256(data).digest()
+    store.put(digest, data)
+    with open(store.path(digest), "wb") as f:
+        f.write(backups.CODEC_ZSTD + b"garbage")
+    with pytest.raises(Exception):
+        store.get(digest)
+
+
+def test_put_refreshes_existing_chunk_for_gc(store):
+    data = b"x" * 1000
+    digest = hashlib.sha256(data).digest()
+    store.put(digest, data)
+    os.utime(store.path(digest), (0, 0))
+    threshold = time.time()
+    time.sleep(0.05)  # granularidade do mtime no sistema de arquivos
+    assert store.put(digest, data) == 0
+    # reutilizado por um backup depois do início do GC: não é apagado
+    assert not store.delete(digest, older_than=threshold)
+    assert store.delete(digest)
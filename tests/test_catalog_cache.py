@@ -0,0 +1,77 @@
+import asyncio
+
+from pymongo.errors import AutoReconnect
+
+from core.catalog_cache import CatalogCache
+
+
+class _Stream:
+    def __init__(self, changes):
+        self.changes = changes
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.changes:
+            return self.changes.pop(0)
+        await asyncio.Event().wait()  # stream aberto sem eventos
+
+
+class _Collection:
+    def __init__(self, outcomes):
+        self.outcomes = outcomes
+        self.start_times = []
+
+    async def watch(self, full_document, start_at_operation_time):
+        self.start_times.append(start_at_operation_time)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return _Stream(outcome)
+
+
+class _Model:
+    __name__ = "Catalog"
+    collection: _Collection
+
+    @classmethod
+    def get_pymongo_collection(cls):
+        return cls.collection
+
+
+def test_watch_survives_reload_failures():
+    _Model.collection = _Collection([AutoReconnect("queda"), [{"operationType": "drop"}]])
+    cache = CatalogCache([_Model], poll_interval=0.01)
+    cache._entries[_Model] = {"x": object()}
+    loads = []
+
+    async def load(model):
+        loads.append(model)
+        if len(loads) == 1:
+            raise AutoReconnect("banco indisponível durante a recarga")
+        cache._loaded_at[model] = len(loads)
+
+    cache.load = load
+
+    async def run():
+        task = asyncio.create_task(cache._watch(_Model))
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if not cache._entries[_Model]:
+                break
+        alive = not task.done()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return alive
+
+    assert asyncio.run(run())
+    assert len(loads) == 2  # a recarga que falhou é repetida
+    assert _Model.collection.start_times == [None, 2]
+    assert cache._entries[_Model] == {}
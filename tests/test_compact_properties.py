@@ -0,0 +1,183 @@
+import re
+
+import pytest
+from beanie import PydanticObjectId
+
+from core import compact_properties
+from models.servers_properties import PINNED_FIELDS, PROPERTIES_DEFAULTS, PROPERTIES_DEFAULTS_VERSION
+
+
+@pytest.fixture
+def ServersProperties(beanie_offline):
+    from models.servers_properties import ServersProperties
+    return ServersProperties
+
+
+@pytest.fixture
+def second_version(monkeypatch):
+    """Versão 2 dos padrões com view_distance diferente, como numa mudança de padrão do jogo"""
+    monkeypatch.setitem(PROPERTIES_DEFAULTS, 2, {**PROPERTIES_DEFAULTS[1], "view_distance": 12})
+
+
+def _match_field(value, condition, present) -> bool:
+    """Subconjunto da semântica de filtros do MongoDB usado pelo translate_filter"""
+    if not isinstance(condition, dict):
+        return present and value == condition
+    for operator, target in condition.items():
+        if operator == "$exists":
+            if present != target:
+                return False
+        elif operator == "$regex":
+            flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+            if not present or not isinstance(value, str) or not re.search(target, value, flags):
+                return False
+        elif operator == "$options":
+            continue
+        elif operator in ("$ne", "$nin"):
+            if present and not compact_properties.COMPARISONS[operator](value, target):
+                return False
+        elif not present or not compact_properties.COMPARISONS[operator](value, target):
+            return False
+    return True
+
+
+def _matches(document: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(_matches(document, item) for item in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches(document, item) for item in condition):
+                return False
+        elif key == "$nor":
+            if any(_matches(document, item) for item in condition):
+                return False
+        elif not _match_field(document.get(key), condition, key in document):
+            return False
+    return True
+
+
+def _evaluate(document: dict, expression):
+    """Avalia as expressões geradas por field_expr ($ifNull, $switch, $eq, $literal)"""
+    if isinstance(expression, str) and expression.startswith("$"):
+        return document.get(expression[1:])
+    if not isinstance(expression, dict):
+        return expression
+    if "$literal" in expression:
+        return expression["$literal"]
+    if "$ifNull" in expression:
+        value, fallback = expression["$ifNull"]
+        value = _evaluate(document, value)
+        return _evaluate(document, fallback) if value is None else value
+    if "$eq" in expression:
+        left, right = expression["$eq"]
+        return _evaluate(document, left) == _evaluate(document, right)
+    if "$switch" in expression:
+        for branch in expression["$switch"]["branches"]:
+            if _evaluate(document, branch["case"]):
+                return _evaluate(document, branch["then"])
+        return _evaluate(document, expression["$switch"]["default"])
+    raise AssertionError(f"expressão não suportada: {expression}")
+
+
+def test_compact_elides_defaults(ServersProperties):
+    properties = ServersProperties(level_name="world", hardcore=True, view_distance=10, motd="Olá")
+    document = compact_properties.compact(properties)
+
+    assert document["hardcore"] is True
+    assert document["motd"] == "Olá"
+    assert "view_distance" not in document and "allow_flight" not in document
+    assert "_id" not in document
+    assert document["defaults_version"] == PROPERTIES_DEFAULTS_VERSION
+    # Campos fixos são gravados mesmo com o valor padrão
+    assert PINNED_FIELDS - {"created_at", "updated_at"} <= document.keys()
+
+
+def test_compact_round_trip(ServersProperties):
+    properties = ServersProperties(
+        id=PydanticObjectId(), level_name="lobby", pvp=False, simulation_distance=6, enable_rcon=True,
+    )
+    document = compact_properties.compact(properties)
+    assert document["_id"] == properties.id
+
+    restored = ServersProperties.model_validate({**document, "id": document.pop("_id")})
+    assert restored.model_dump() == properties.model_dump()
+
+
+def test_materialize_uses_document_version(second_version):
+    assert compact_properties.materialize(None) is None
+    assert compact_properties.materialize({"motd": "x"}) == {"motd": "x"}
+    assert compact_properties.materialize({"defaults_version": 1})["view_distance"] == 10
+    assert compact_properties.materialize({"defaults_version": 2})["view_distance"] == 12
+    assert compact_properties.materialize({"defaults_version": 2, "view_distance": 4})["view_distance"] == 4
+
+
+def test_model_materializes_by_version(ServersProperties, second_version):
+    old = ServersProperties.model_validate({"level_name": "world", "defaults_version": 1})
+    new = ServersProperties.model_validate({"level_name": "world", "defaults_version": 2})
+    assert (old.view_distance, new.view_distance) == (10, 12)
+
+
+def test_translate_filter_matches_omitted_defaults(ServersProperties):
+    documents = [
+        compact_properties.compact(ServersProperties(level_name="world")),
+        compact_properties.compact(ServersProperties(level_name="world", hardcore=True)),
+    ]
+    query = compact_properties.translate_filter({"hardcore": False})
+    assert [_matches(document, query) for document in documents] == [True, False]
+
+    query = compact_properties.translate_filter({"hardcore": True})
+    assert query == {"hardcore": True}
+    assert [_matches(document, query) for document in documents] == [False, True]
+
+
+@pytest.mark.parametrize("query", [
+    {"view_distance": {"$gte": 10}},
+    {"view_distance": {"$lt": 10}},
+    {"view_distance": {"$in": [8, 10]}},
+    {"view_distance": {"$ne": 10}},
+    {"view_distance": {"$nin": [6, 12]}},
+    {"hardcore": {"$exists": False}},
+    {"motd": {"$regex": "minecraft", "$options": "i"}},
+    {"motd": {"$exists": True}},
+    {"$or": [{"hardcore": True}, {"view_distance": 6}]},
+    {"hardcore": False, "max_players": 20},
+    {"$nor": [{"allow_flight": False}]},
+])
+def test_translate_filter_round_trip(ServersProperties, second_version, query):
+    """O filtro traduzido sobre os documentos compactos casa o mesmo que o original sobre os completos"""
+    variants = [
+        {"level_name": "world"},
+        {"level_name": "world", "view_distance": 6, "hardcore": True},
+        {"level_name": "world", "view_distance": 12, "motd": "Survival"},
+        {"level_name": "world", "allow_flight": True, "max_players": 50},
+    ]
+    compacted, materialized = [], []
+    for values in variants:
+        for version in (1, 2):
+            document = compact_properties.compact(ServersProperties(**values))
+            # Documento gravado com uma versão anterior dos padrões: só os campos explícitos
+            document = {key: value for key, value in document.items() if key in values or key in PINNED_FIELDS}
+            document["defaults_version"] = version
+            compacted.append(document)
+            materialized.append(compact_properties.materialize(document))
+
+    translated = compact_properties.translate_filter(query)
+    assert [_matches(document, translated) for document in compacted] == [
+        _matches(document, query) for document in materialized
+    ]
+
+
+def test_translate_filter_rejects_unknown_operators():
+    with pytest.raises(ValueError):
+        compact_properties.translate_filter({"view_distance": {"$mod": [2, 0]}})
+
+
+def test_field_expr(second_version):
+    assert compact_properties.field_expr("max_players") == "$max_players"
+    assert compact_properties.field_expr("hardcore") == {"$ifNull": ["$hardcore", {"$literal": False}]}
+
+    expression = compact_properties.field_expr("view_distance")
+    assert _evaluate({"defaults_version": 1}, expression) == 10
+    assert _evaluate({"defaults_version": 2}, expression) == 12
+    assert _evaluate({"defaults_version": 2, "view_distance": 4}, expression) == 4
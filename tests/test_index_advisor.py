@@ -0,0 +1,76 @@
+import asyncio
+
+from core.index_advisor import QueryShape, QueryShapeRecorder, advise, is_covered, shapes_from_command
+
+
+def test_find_records_sort_direction():
+    [shape] = shapes_from_command("find", {
+        "find": "servers", "filter": {"owner_id": 1, "created_at": {"$gte": 0}},
+        "sort": {"created_at": -1, "_id": -1, "score": {"$meta": "textScore"}},
+    })
+    assert shape.sort == (("created_at", -1), ("_id", -1))
+    assert shape.candidate_keys() == [("owner_id", 1), ("created_at", -1), ("_id", -1)]
+
+
+def test_aggregate_records_sort_direction():
+    [shape] = shapes_from_command("aggregate", {
+        "aggregate": "servers", "pipeline": [{"$match": {"status": "online"}}, {"$sort": {"name": 1, "updated_at": -1}}],
+    })
+    assert shape.candidate_keys() == [("status", 1), ("name", 1), ("updated_at", -1)]
+
+
+def test_sort_coverage_respects_directions():
+    shape = QueryShape("servers", ("owner_id",), (("created_at", -1), ("_id", 1)), (), "find")
+    assert is_covered([("owner_id", 1), ("created_at", -1), ("_id", 1)], shape)
+    # Percorrido ao contrário, o índice invertido também atende
+    assert is_covered([("owner_id", 1), ("created_at", 1), ("_id", -1)], shape)
+    assert not is_covered([("owner_id", 1), ("created_at", -1), ("_id", -1)], shape)
+    assert not is_covered([("owner_id", 1), ("created_at", 1)], shape)
+
+    single = QueryShape("servers", (), (("created_at", -1),), (), "find")
+    assert is_covered([("created_at", 1)], single)
+
+
+def test_range_only_shape_ignores_direction():
+    shape = QueryShape("servers", ("status",), (), ("created_at",), "count")
+    assert is_covered([("status", 1), ("created_at", -1)], shape)
+    assert not is_covered([("created_at", 1)], shape)
+
+
+class _Collection:
+    def __init__(self, indexes):
+        self.indexes = indexes
+
+    async def index_information(self):
+        return {name: {"key": keys} for name, keys in self.indexes.items()}
+
+    async def aggregate(self, pipeline):
+        async def stats():
+            for name in self.indexes:
+                yield {"name": name, "accesses": {"ops": 1}}
+        return stats()
+
+
+class _Database:
+    def __init__(self, collections):
+        self.collections = collections
+
+    async def list_collection_names(self):
+        return list(self.collections)
+
+    def __getitem__(self, name):
+        return self.collections[name]
+
+
+def test_advise_recommends_keys_with_direction():
+    recorder = QueryShapeRecorder()
+    recorder.shapes[QueryShape("servers", ("owner_id",), (("created_at", -1), ("_id", 1)), (), "find")] += 3
+    database = _Database({"servers": _Collection({
+        "_id_": [("_id", 1)],
+        "owner_id_1_created_at_-1_id_-1": [("owner_id", 1), ("created_at", -1), ("_id", -1)],
+    })})
+
+    report = asyncio.run(advise(database, recorder))
+    assert report["servers"]["recommended"] == [{
+        "keys": [("owner_id", 1), ("created_at", -1), ("_id", 1)], "queries": 3, "sources": ["find"],
+    }]
@@ -0,0 +1,117 @@
+import pytest
+
+from core import launch_profiles
+from core.config import settings
+
+
+@pytest.mark.parametrize("flag", [
+    "-XX:+UseStringDeduplication",
+    "-XX:MaxGCPauseMillis=130",
+    "-Xss4M",
+    "-Dpaper.playerconnection.keepalive=120",
+    "-Dcom.mojang.eula.agree=true",
+])
+def test_allowed_extra_flags(flag):
+    assert launch_profiles.validate_extra_flags([flag]) == [flag]
+
+
+@pytest.mark.parametrize("flag", [
+    "-javaagent:/tmp/agent.jar",
+    "-agentlib:jdwp=transport=dt_socket",
+    "-XX:OnOutOfMemoryError=sh -c id",
+    "-XX:OnError=id",
+    "-Dlog4j.configurationFile=http://example.com/log4j.xml",
+    "-Djava.library.path=/tmp",
+    "-cp",
+])
+def test_rejected_extra_flags(flag):
+    with pytest.raises(ValueError):
+        launch_profiles.validate_extra_flags([flag])
+
+
+def test_java_path_must_be_configured(monkeypatch, tmp_path):
+    java = tmp_path / "java"
+    java.write_text("")
+    monkeypatch.setattr(settings, "java_installations", {"21": str(java)})
+    assert launch_profiles.validate_java_path(str(java)) == str(java)
+    with pytest.raises(ValueError):
+        launch_profiles.validate_java_path("/bin/sh")
+
+
+@pytest.fixture
+def java(beanie_offline):
+    from models.java_links import Java
+
+    def build(version):
+        return Java(name=f"Java {version}", version=version, link="https://example.com/jdk.tar.gz")
+    return build
+
+
+@pytest.fixture
+def heap_settings(monkeypatch):
+    monkeypatch.setattr(settings, "launch_heap_ratio", 0.85)
+    monkeypatch.setattr(settings, "launch_min_heap_mb", 1024)
+    monkeypatch.setattr(settings, "launch_zgc_min_heap_mb", 12288)
+
+
+@pytest.mark.parametrize("reserved_mb, memory_limit_mb, heap_mb", [
+    (4096, 65536, 3328),    # 4096 * 0.85 = 3481.6 -> múltiplo de 256 abaixo
+    (20000, 8192, 6912),    # limitado pela memória do node
+    (1000, 65536, 1024),    # abaixo do mínimo
+    (256, 512, 1024),
+])
+def test_compute_heap_rounding(heap_settings, java, reserved_mb, memory_limit_mb, heap_mb):
+    spec = launch_profiles.compute(20, 10, 10, None, java("17"), memory_limit_mb, reserved_mb, java_path="/opt/java")
+    assert (spec.xms_mb, spec.xmx_mb) == (heap_mb, heap_mb)
+    assert spec.xmx_mb % 256 == 0
+    assert spec.command()[:3] == ["/opt/java", f"-Xms{heap_mb}M", f"-Xmx{heap_mb}M"]
+
+
+@pytest.mark.parametrize("version, reserved_mb, gc, generational", [
+    ("17.0.10", 1024, "Serial", False),
+    ("1.8.0_392", 8192, "G1", False),
+    ("17", 32768, "G1", False),       # ZGC só a partir do Java 21
+    ("21", 8192, "G1", False),        # heap abaixo de launch_zgc_min_heap_mb
+    ("21", 32768, "ZGC", True),
+    ("23", 32768, "ZGC", False),      # geracional por padrão a partir do 23
+])
+def test_compute_gc_choice(heap_settings, java, version, reserved_mb, gc, generational):
+    spec = launch_profiles.compute(20, 10, 10, None, java(version), 65536, reserved_mb, java_path="java")
+    assert spec.gc == gc
+    assert ("-XX:+ZGenerational" in spec.jvm_flags) == generational
+    if gc == "G1":
+        assert "-XX:+UseG1GC" in spec.jvm_flags
+
+
+def test_compute_g1_sized_flags(heap_settings, java):
+    small = launch_profiles.compute(20, 10, 10, None, java("17"), 65536, 8192, java_path="java")
+    large = launch_profiles.compute(20, 10, 10, None, java("17"), 65536, 32768, java_path="java")
+    assert "-XX:G1HeapRegionSize=8M" in small.jvm_flags
+    assert "-XX:G1HeapRegionSize=16M" in large.jvm_flags
+
+
+def _spec(gc="G1", xmx_mb=4096, major=17):
+    flags = [*launch_profiles.gc_flags(gc, xmx_mb, major), "-Dusing.aikars.flags=https://mcflags.emc.gs"]
+    return launch_profiles.LaunchSpec("java", major, xmx_mb, xmx_mb, gc, flags)
+
+
+def test_overrides_switching_gc_replaces_xx_flags():
+    spec = launch_profiles.apply_overrides(_spec(), {"gc": "Parallel", "extra_flags": ["-XX:+UseStringDeduplication"]})
+    assert spec.gc == "Parallel"
+    assert spec.jvm_flags == ["-XX:+UseParallelGC", "-Dusing.aikars.flags=https://mcflags.emc.gs", "-XX:+UseStringDeduplication"]
+
+
+def test_overrides_resizing_heap_recomputes_g1_flags():
+    spec = launch_profiles.apply_overrides(_spec(xmx_mb=4096), {"xmx_mb": 16384})
+    assert spec.xmx_mb == spec.xms_mb == 16384
+    assert "-XX:G1HeapRegionSize=16M" in spec.jvm_flags
+    assert "-XX:G1HeapRegionSize=8M" not in spec.jvm_flags
+    assert spec.jvm_flags.count("-XX:+UseG1GC") == 1
+
+
+def test_overrides_keep_flags_when_gc_and_heap_unchanged():
+    base = _spec()
+    spec = launch_profiles.apply_overrides(base, {"xms_mb": 8192, "java_path": "/opt/java"})
+    assert spec.jvm_flags == base.jvm_flags
+    # Xms nunca passa do Xmx
+    assert (spec.xms_mb, spec.xmx_mb, spec.java_path) == (4096, 4096, "/opt/java")
@@ -0,0 +1,75 @@
+import asyncio
+import os
+
+import pytest
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
+
+from core import map_imports
+from core.config import settings
+
+
+class _Request:
+    headers = {}
+
+    def __init__(self, body: bytes):
+        self.body = body
+
+    async def stream(self):
+        yield self.body
+
+
+@pytest.fixture
+def upload(beanie_offline, monkeypatch, tmp_path):
+    from models.minecraft_maps import MinecraftMap
+    from routers import minecraft_maps
+
+    monkeypatch.setattr(settings, "maps_dir", str(tmp_path))
+    imported = []
+
+    def import_archive(archive, map_id):
+        directory = map_imports.map_directory(map_id)
+        os.makedirs(os.path.join(directory, "region"))
+        imported.append(directory)
+        return 1, 1024
+
+    monkeypatch.setattr(map_imports, "import_archive", import_archive)
+    return MinecraftMap, minecraft_maps, imported
+
+
+def test_upload_race_returns_existing_map(upload, monkeypatch):
+    MinecraftMap, minecraft_maps, imported = upload
+    winner = MinecraftMap(name="vencedor", link="upload://x")
+    lookups = iter([None, winner])
+
+    async def find_one(*args, **kwargs):
+        return next(lookups)
+
+    async def insert(self, *args, **kwargs):
+        raise DuplicateKeyError("sha256")
+
+    monkeypatch.setattr(MinecraftMap, "find_one", find_one)
+    monkeypatch.setattr(MinecraftMap, "insert", insert)
+
+    result = asyncio.run(minecraft_maps.upload_map(_Request(b"pacote"), name="perdedor", description="", world_type="survival"))
+
+    assert result is winner
+    assert len(imported) == 1 and not os.path.exists(imported[0])
+
+
+def test_upload_race_without_winner_is_conflict(upload, monkeypatch):
+    MinecraftMap, minecraft_maps, imported = upload
+
+    async def find_one(*args, **kwargs):
+        return None
+
+    async def insert(self, *args, **kwargs):
+        raise DuplicateKeyError("sha256")
+
+    monkeypatch.setattr(MinecraftMap, "find_one", find_one)
+    monkeypatch.setattr(MinecraftMap, "insert", insert)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(minecraft_maps.upload_map(_Request(b"pacote"), name="perdedor", description="", world_type="survival"))
+    assert error.value.status_code == 409
+    assert not os.path.exists(imported[0])
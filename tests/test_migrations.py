@@ -0,0 +1,53 @@
+import asyncio
+
+from core.migrations import MigrationContext
+from models.migrations import MigrationRecord
+
+
+class _Collection:
+    name = "servers"
+
+    def __init__(self, documents: list[dict]):
+        self.documents = documents
+
+    async def count_documents(self, query):
+        return len(self._match(query))
+
+    def _match(self, query):
+        last_id = query.get("_id", {}).get("$gt")
+        return [document for document in self.documents if last_id is None or document["_id"] > last_id]
+
+    def find(self, query):
+        documents = self._match(query)
+
+        class Cursor:
+            def sort(self, *args):
+                return self
+
+            def limit(self, size):
+                self.size = size
+                return self
+
+            async def to_list(self):
+                return documents[:self.size]
+
+        return Cursor()
+
+    async def bulk_write(self, operations, ordered):
+        pass
+
+
+def test_rewrite_checkpoints_are_per_migration(monkeypatch):
+    async def save(self):
+        pass
+
+    monkeypatch.setattr(MigrationContext, "_save", save)
+    collection = _Collection([{"_id": i} for i in range(3)])
+    first = MigrationContext(MigrationRecord.model_construct(version=1, name="a", checkpoint={}))
+    asyncio.run(first.rewrite(collection, {}, lambda document: None))
+
+    # Outra migração sobre a mesma coleção não herda o "done" da anterior
+    second = MigrationContext(MigrationRecord.model_construct(version=2, name="b", checkpoint=dict(first.record.checkpoint)))
+    asyncio.run(second.rewrite(collection, {}, lambda document: None))
+    assert set(second.record.checkpoint) == {"rewrite:1:servers:[]", "rewrite:2:servers:[]"}
+    assert second.record.checkpoint["rewrite:2:servers:[]"]["processed"] == 3
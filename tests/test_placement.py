@@ -0,0 +1,102 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from beanie import PydanticObjectId
+
+from core import placement
+from core.placement import Assignment, Footprint, NodeState, PlacementState, PortBitmap
+
+
+def _node(name: str, memory_mb: int = 8192) -> NodeState:
+    return NodeState(name, name, name, cpu_cores=8, memory_mb=memory_mb, ports=PortBitmap(25565, 25574))
+
+
+def _assignment(key, node="a", port=25565, pinned=False, memory_mb=1024):
+    return Assignment(key=key, footprint=Footprint(1, memory_mb), node_id=node, port=port, pinned=pinned)
+
+
+def test_pinned_port_conflict_is_reported_not_moved():
+    state = PlacementState([_node("a"), _node("b")])
+    first, second = _assignment("s1", pinned=True), _assignment("s2", pinned=True, memory_mb=512)
+    placed, unplaced, conflicts = state.rebalance([first, second])
+    assert conflicts == [second]
+    assert (second.node_id, second.port, second.moved) == ("a", 25565, False)
+    assert not unplaced and all(not assignment.moved for assignment in placed)
+    assert state.nodes["a"].used_memory_mb == 1536  # o processo continua consumindo o node
+
+
+def test_pinned_on_missing_node_is_conflict():
+    state = PlacementState([_node("a")])
+    orphan = _assignment("s1", node="gone", pinned=True)
+    _, _, conflicts = state.rebalance([orphan])
+    assert conflicts == [orphan] and orphan.node_id == "gone" and not orphan.moved
+
+
+def test_stopped_server_yields_port_to_pinned():
+    state = PlacementState([_node("a")])
+    stopped = _assignment("stopped", memory_mb=2048)
+    running = _assignment("running", pinned=True, memory_mb=512)
+    placed, _, conflicts = state.rebalance([stopped, running], mode="overflow")
+    assert not conflicts
+    assert running.port == 25565 and not running.moved
+    assert stopped.moved and stopped.port != 25565
+
+
+def test_pack_never_moves_pinned():
+    state = PlacementState([_node("a"), _node("b")])
+    running = _assignment("running", node="b", pinned=True)
+    others = [_assignment(f"s{i}", node="a", port=25566 + i) for i in range(3)]
+    state.rebalance([running, *others], mode="pack")
+    assert (running.node_id, running.port, running.moved) == ("b", 25565, False)
+
+
+class _NodeCollection:
+    def __init__(self, documents, fail_id):
+        self.documents = documents
+        self.fail_id = fail_id
+
+    async def update_one(self, query, update):
+        document = self.documents[query["_id"]]
+        matched = query["_id"] != self.fail_id and all(document[key] == value for key, value in query.items() if key != "_id")
+        if matched:
+            document.update(update["$set"])
+        return SimpleNamespace(matched_count=int(matched))
+
+
+def test_apply_uses_cas_and_rolls_back(beanie_offline, monkeypatch):
+    from models.nodes import Node
+    from models.servers import Server
+
+    nodes = [
+        Node(id=PydanticObjectId(), name=name, address=name, cpu_cores=8, memory_mb=8192,
+             port_range_start=25565, port_range_end=25574, port_bitmap=b"\x01", allocated_cpu=1, allocated_memory_mb=1024)
+        for name in ("a", "b")
+    ]
+    servers = [
+        Server(id=PydanticObjectId(), name="s", owner_id=PydanticObjectId(), server_properties_id=PydanticObjectId(),
+               software_id=PydanticObjectId(), java_id=PydanticObjectId(), node_id=node.id, port=25565,
+               cpu_reserved=1, memory_reserved_mb=1024, status="offline")
+        for node in nodes
+    ]
+    # Um place() concorrente alterou o node "b" depois da leitura
+    collection = _NodeCollection({node.id: placement._allocation(node) for node in nodes}, fail_id=nodes[1].id)
+
+    class Query:
+        def __init__(self, items):
+            self.items = items
+
+        async def to_list(self):
+            return self.items
+
+    monkeypatch.setattr(Node, "find", lambda *args: Query(nodes))
+    monkeypatch.setattr(Server, "find", lambda *args: Query(servers))
+    monkeypatch.setattr(Node, "get_pymongo_collection", classmethod(lambda cls: collection))
+
+    with pytest.raises(placement.PlacementError):
+        asyncio.run(placement.rebalance("pack", apply=True))
+    # A escrita feita no node "a" foi desfeita
+    # O pack consolida os dois em "a"; a gravação em "a" é desfeita quando "b" falha
+    document = collection.documents[nodes[0].id]
+    assert {key: document[key] for key in placement._allocation(nodes[0])} == placement._allocation(nodes[0])
+    assert "updated_at" in document
@@ -0,0 +1,142 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from beanie import PydanticObjectId
+
+from core import property_templates
+from core.config import settings
+
+
+@pytest.fixture
+def models(beanie_offline):
+    from models.servers import Server
+    from models.servers_properties import ServersProperties
+    return Server, ServersProperties
+
+
+def _template(ServersProperties, **values):
+    return ServersProperties(id=PydanticObjectId(), level_name="world", **values)
+
+
+def _server(Server, template, overrides=None):
+    return Server(
+        id=PydanticObjectId(),
+        name="survival",
+        owner_id=PydanticObjectId(),
+        server_properties_id=template.id,
+        software_id=PydanticObjectId(),
+        java_id=PydanticObjectId(),
+        properties_overrides=overrides or {},
+    )
+
+
+def test_content_hash_ignores_metadata(models):
+    _, ServersProperties = models
+    first = _template(ServersProperties, max_players=50)
+    second = _template(ServersProperties, max_players=50, created_at=datetime(2020, 1, 1), content_hash="x")
+    assert property_templates.content_hash(first) == property_templates.content_hash(second)
+    assert property_templates.content_hash(first) != property_templates.content_hash(_template(ServersProperties, max_players=51))
+
+
+def test_with_overrides_and_diff(models):
+    _, ServersProperties = models
+    template = _template(ServersProperties, difficulty="normal")
+    properties = property_templates.with_overrides(template, {"max_players": 5, "difficulty": "hard"})
+    assert (properties.max_players, properties.difficulty) == (5, "hard")
+    assert template.difficulty == "normal"  # o template não é alterado
+    assert property_templates.diff(template, properties) == {"max_players": 5, "difficulty": "hard"}
+    # Campos iguais ao template saem do delta
+    assert property_templates.normalize_overrides(template, {"difficulty": "normal", "max_players": 5}) == {"max_players": 5}
+
+
+def test_with_overrides_rejects_unknown_fields(models):
+    _, ServersProperties = models
+    with pytest.raises(ValueError, match="inválidos"):
+        property_templates.with_overrides(_template(ServersProperties), {"not_a_field": 1})
+
+
+def test_effective_properties(models, monkeypatch):
+    Server, ServersProperties = models
+    template = _template(ServersProperties)
+    templates = {template.id: template}
+
+    async def get(document_id):
+        return templates.get(document_id)
+
+    monkeypatch.setattr(ServersProperties, "get", get)
+    server = _server(Server, template, {"motd": "Olá"})
+    effective = asyncio.run(property_templates.effective_properties(server))
+    assert effective.motd == "Olá" and effective.level_name == "world"
+
+    templates.clear()
+    assert asyncio.run(property_templates.effective_properties(server)) is None
+
+
+def test_patch_is_copy_on_write(models, monkeypatch):
+    Server, ServersProperties = models
+    template = _template(ServersProperties)
+    created = []
+    written = {}
+
+    async def get(document_id):
+        return template if document_id == template.id else None
+
+    async def get_or_create_template(properties):
+        properties.id = PydanticObjectId()
+        created.append(properties)
+        return properties
+
+    async def set_fields(self, fields):
+        written.update({str(key): value for key, value in fields.items()})
+
+    monkeypatch.setattr(ServersProperties, "get", get)
+    monkeypatch.setattr(property_templates, "get_or_create_template", get_or_create_template)
+    monkeypatch.setattr(Server, "set", set_fields)
+    monkeypatch.setattr(settings, "properties_override_limit", 2)
+    server = _server(Server, template, {"motd": "Olá"})
+
+    properties = asyncio.run(property_templates.patch_server_properties(server, {"max_players": 8}))
+    assert properties.max_players == 8 and properties.motd == "Olá"
+    assert template.max_players == 20 and not created
+    assert written["properties_overrides"] == {"motd": "Olá", "max_players": 8}
+    assert written["server_properties_id"] == template.id
+
+    # Acima do limite o servidor ganha um template próprio e o delta zera
+    asyncio.run(property_templates.patch_server_properties(server, {"max_players": 8, "motd": "Olá", "difficulty": "hard"}))
+    assert len(created) == 1 and created[0].difficulty == "hard"
+    assert written["server_properties_id"] == created[0].id
+    assert written["properties_overrides"] == {}
+    assert template.difficulty == "easy"
+
+
+def test_delete_template_in_use_conflicts(models, monkeypatch):
+    from fastapi import HTTPException
+    from routers import servers_properties as router
+
+    Server, ServersProperties = models
+    template = _template(ServersProperties)
+    deleted = []
+    users = {"count": 2}
+
+    class Query:
+        async def count(self):
+            return users["count"]
+
+    async def get(document_id):
+        return template
+
+    async def delete(self):
+        deleted.append(self.id)
+
+    monkeypatch.setattr(ServersProperties, "get", get)
+    monkeypatch.setattr(ServersProperties, "delete", delete)
+    monkeypatch.setattr(Server, "find", lambda *args, **kwargs: Query())
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(router.delete_server_properties(template.id))
+    assert error.value.status_code == 409 and not deleted
+
+    users["count"] = 0
+    asyncio.run(router.delete_server_properties(template.id))
+    assert deleted == [template.id]
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from core.rcon import RconAuthError, RconConnection, RconPool
+from tests.fake_rcon import FakeRconServer
+
+
+async def _command(server: FakeRconServer, command: str, timeout: float = 2.0) -> str:
+    connection = await RconConnection.connect("127.0.0.1", server.port, "secret", timeout)
+    try:
+        return await connection.command(command, timeout)
+    finally:
+        await connection.close()
+
+
+@pytest.mark.parametrize("size", [0, 10, 4095, 4096, 8192, 10000])
+def test_response_sizes(size):
+    async def run():
+        async with FakeRconServer(responses={"list": "x" * size}) as server:
+            return await _command(server, "list")
+
+    assert asyncio.run(run()) == "x" * size
+
+
+def test_source_style_marker_echo():
+    async def run():
+        async with FakeRconServer(responses={"list": "y" * 4096}, echo_markers=True) as server:
+            connection = await RconConnection.connect("127.0.0.1", server.port, "secret", 2.0)
+            try:
+                return [await connection.command("list", 2.0) for _ in range(3)]
+            finally:
+                await connection.close()
+
+    assert asyncio.run(run()) == ["y" * 4096] * 3
+
+
+def test_wrong_password():
+    async def run():
+        async with FakeRconServer() as server:
+            await RconConnection.connect("127.0.0.1", server.port, "wrong", 2.0)
+
+    with pytest.raises(RconAuthError):
+        asyncio.run(run())
+
+
+def test_pipelined_commands_keep_order():
+    responses = {f"cmd{i}": f"out{i}" * (i * 500) for i in range(8)}
+
+    async def run():
+        async with FakeRconServer(responses=responses) as server:
+            connection = await RconConnection.connect("127.0.0.1", server.port, "secret", 2.0)
+            try:
+                return await asyncio.gather(*(connection.command(name, 2.0) for name in responses))
+            finally:
+                await connection.close()
+
+    assert asyncio.run(run()) == list(responses.values())
+
+
+def test_timeout_closes_connection():
+    async def run():
+        async with FakeRconServer(delay=0.5) as server:
+            connection = await RconConnection.connect("127.0.0.1", server.port, "secret", 2.0)
+            with pytest.raises(TimeoutError):
+                await connection.command("list", 0.1)
+            return connection.closed
+
+    assert asyncio.run(run())
+
+
+def test_pool_reuses_connections():
+    async def run():
+        async with FakeRconServer(responses={"list": "ok"}) as server:
+            pool = RconPool("127.0.0.1", server.port, "secret", size=2, depth=4, timeout=2.0)
+            try:
+                results = await asyncio.gather(*(pool.command("list") for _ in range(20)))
+            finally:
+                await pool.close()
+            return results, server.connections
+
+    results, connections = asyncio.run(run())
+    assert results == ["ok"] * 20
+    assert connections <= 2
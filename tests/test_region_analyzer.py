@@ -0,0 +1,109 @@
+import os
+import struct
+import zlib
+
+import pytest
+
+from core.region_analyzer import EXTERNAL, SECTOR, analyze_region, dimension_of
+
+
+def _chunk(payload: bytes, code: int = 2) -> bytes:
+    """Cabeçalho de 5 bytes (tamanho inclui o byte de compressão) + dados, alinhado ao setor"""
+    data = struct.pack(">IB", len(payload) + 1, code) + payload
+    return data + b"\0" * (-len(data) % SECTOR)
+
+
+def _region(path, chunks: dict[int, bytes], locations: dict[int, int] | None = None):
+    """Monta um .mca: `chunks` mapeia índice -> bytes já alinhados; `locations` força entradas"""
+    table = [0] * 1024
+    body, sector = b"", 2
+    for index, data in chunks.items():
+        count = len(data) // SECTOR
+        table[index] = sector << 8 | count
+        body += data
+        sector += count
+    for index, location in (locations or {}).items():
+        table[index] = location
+    path.write_bytes(struct.pack(">1024I", *table) + b"\0" * SECTOR + body)
+    return str(path)
+
+
+def test_empty_region(tmp_path):
+    empty = tmp_path / "r.0.0.mca"
+    empty.write_bytes(b"")
+    result = analyze_region(str(empty), 1)
+    assert result["chunks"] == 0 and result["corrupt"] == 0
+
+    header_only = _region(tmp_path / "r.0.1.mca", {})
+    assert analyze_region(header_only, 1)["chunks"] == 0
+
+
+def test_samples_compression(tmp_path):
+    raw = b"minecraft" * 200
+    path = _region(tmp_path / "r.0.0.mca", {
+        0: _chunk(zlib.compress(raw)),
+        1: _chunk(raw, code=3),
+        2: _chunk(b"lz4", code=4),
+    })
+    result = analyze_region(path, 1)
+    assert result["chunks"] == 3
+    assert result["compression"] == {"deflate": 1, "none": 1, "lz4": 1}
+    assert result["sampled"] == 2
+    assert result["uncompressed"] == 2 * len(raw)
+    assert result["corrupt"] == 0
+
+
+def test_sample_every_skips_chunks(tmp_path):
+    raw = b"x" * 1000
+    path = _region(tmp_path / "r.0.0.mca", {i: _chunk(zlib.compress(raw)) for i in range(4)})
+    result = analyze_region(path, 2)
+    assert result["chunks"] == 4 and result["sampled"] == 2
+
+
+def test_out_of_range_offsets_are_corrupt(tmp_path):
+    path = _region(tmp_path / "r.0.0.mca", {0: _chunk(zlib.compress(b"ok"))}, locations={
+        1: 1 << 8 | 1,     # aponta para a tabela de timestamps
+        2: 500 << 8 | 1,   # além do fim do arquivo
+        3: 2 << 8 | 0,     # sem setores
+    })
+    result = analyze_region(path, 1)
+    assert result["chunks"] == 1 and result["corrupt"] == 3
+
+
+def test_overlapping_offsets_count_once(tmp_path):
+    path = _region(tmp_path / "r.0.0.mca", {0: _chunk(zlib.compress(b"a" * 10000))}, locations={
+        5: 2 << 8 | 1,
+    })
+    result = analyze_region(path, 1)
+    assert result["chunks"] == 1 and result["corrupt"] == 1
+
+
+def test_invalid_payload_is_corrupt(tmp_path):
+    path = _region(tmp_path / "r.0.0.mca", {0: _chunk(b"not deflate")})
+    result = analyze_region(path, 1)
+    assert result["chunks"] == 1 and result["sampled"] == 0 and result["corrupt"] == 1
+
+
+def test_external_chunks_are_counted_not_sampled(tmp_path):
+    # Chunk em c.<x>.<z>.mcc: na região fica só o cabeçalho com o bit 128
+    path = _region(tmp_path / "r.0.0.mca", {0: _chunk(b"", code=2 | EXTERNAL)})
+    (tmp_path / "c.0.0.mcc").write_bytes(zlib.compress(b"big" * 1000))
+    result = analyze_region(path, 1)
+    assert result["chunks"] == 1
+    assert result["compression"] == {"deflate": 1}
+    assert result["sampled"] == 0 and result["corrupt"] == 0
+
+
+@pytest.mark.parametrize("parts, expected", [
+    (("region",), ("minecraft:overworld", "region")),
+    (("entities",), ("minecraft:overworld", "entities")),
+    (("DIM-1", "region"), ("minecraft:the_nether", "region")),
+    (("DIM1", "poi"), ("minecraft:the_end", "poi")),
+    (("dimensions", "mymod", "mining", "region"), ("mymod:mining", "region")),
+    (("dimensions", "mymod", "region"), None),
+    (("DIM-1",), None),
+    (("data",), None),
+    (("backup", "region"), None),
+])
+def test_dimension_of(tmp_path, parts, expected):
+    assert dimension_of(str(tmp_path), os.path.join(str(tmp_path), *parts)) == expected
@@ -0,0 +1,54 @@
+import asyncio
+from datetime import datetime
+
+from beanie import PydanticObjectId
+
+from core import resource_sampler
+from core.resource_sampler import FIELDS, ResourceSampler, SampleBuffer, period_start
+
+
+def test_sample_buffer_rows():
+    buffer = SampleBuffer(2)
+    server_id = PydanticObjectId()
+    buffer.append(server_id, (1.0, 50.0, 512.0, 0.0, 30, float("nan"), float("nan")))
+    assert not buffer.full
+    buffer.append(server_id, tuple(range(len(FIELDS))))
+    assert buffer.full and len(buffer.rows()) == 2 and buffer.rows()[1][6] == 6.0
+
+
+def test_update_rollups_windows(monkeypatch):
+    calls = []
+
+    async def rollup(resolution, start, end):
+        calls.append((resolution, start, end))
+
+    monkeypatch.setattr(resource_sampler, "rollup", rollup)
+    sampler = ResourceSampler(interval=10, flush_interval=60, flush_size=10)
+    now = datetime(2026, 5, 1, 12, 30, 0).timestamp() - datetime(1970, 1, 1).timestamp()
+
+    asyncio.run(sampler.update_rollups(now))
+    # Primeira execução: refaz o período anterior ao último fechado; horas só fechadas
+    assert calls[0][0] == "1m" and calls[0][1] == datetime(2026, 5, 1, 12, 27) and calls[0][2] > datetime(2026, 5, 1, 12, 30)
+    assert calls[1] == ("1h", datetime(2026, 5, 1, 11), datetime(2026, 5, 1, 12))
+
+    calls.clear()
+    asyncio.run(sampler.update_rollups(now + 60))
+    assert [call[:2] for call in calls] == [("1m", datetime(2026, 5, 1, 12, 28))]  # hora em aberto fica para depois
+
+    calls.clear()
+    asyncio.run(sampler.update_rollups(now + 1800 + 70))  # 13:01:10, com o atraso de flush + interval
+    assert calls[1] == ("1h", datetime(2026, 5, 1, 12), datetime(2026, 5, 1, 13))
+
+
+def test_final_rollup_includes_open_hour(monkeypatch):
+    calls = []
+
+    async def rollup(resolution, start, end):
+        calls.append((resolution, start, end))
+
+    monkeypatch.setattr(resource_sampler, "rollup", rollup)
+    sampler = ResourceSampler(interval=10, flush_interval=60, flush_size=10)
+    now = datetime(2026, 5, 1, 12, 30).timestamp() - datetime(1970, 1, 1).timestamp()
+    asyncio.run(sampler.update_rollups(now, final=True))
+    assert calls[1][0] == "1h" and calls[1][2] > datetime(2026, 5, 1, 12, 30)
+    assert period_start(now, "1h") == datetime(2026, 5, 1, 12)
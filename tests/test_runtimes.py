@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import io
+import os
+import stat
+import tarfile
+import threading
+import zipfile
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from beanie import PydanticObjectId
+
+from core.runtimes import RuntimeInstallError, RuntimeManager
+from models.java_links import Java
+
+
+class _CountingHandler(SimpleHTTPRequestHandler):
+    requests: list[str]
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def file_server(tmp_path):
+    """Servidor HTTP local servindo `tmp_path/files`; retorna (diretório, url base, requisições)"""
+    root = tmp_path / "files"
+    root.mkdir()
+    requests: list[str] = []
+    handler = type("Handler", (_CountingHandler,), {"requests": requests})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(handler, directory=str(root)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield root, f"http://127.0.0.1:{server.server_address[1]}", requests
+    server.shutdown()
+    server.server_close()
+
+
+def _tar_runtime() -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tf:
+        info = tarfile.TarInfo("jdk-21/bin/java")
+        info.size, info.mode = 3, 0o755
+        tf.addfile(info, io.BytesIO(b"#!\n"))
+    return buffer.getvalue()
+
+
+def _zip_runtime() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        info = zipfile.ZipInfo("jdk-17/bin/java")
+        info.external_attr = (stat.S_IFREG | 0o755) << 16
+        zf.writestr(info, b"#!\n")
+    return buffer.getvalue()
+
+
+def _java(link: str, version: str = "21.0.2", sha256: str | None = None) -> Java:
+    return Java.model_construct(id=PydanticObjectId(), name="Temurin", version=version, link=link, sha256=sha256)
+
+
+def test_concurrent_ensure_downloads_once(tmp_path, file_server):
+    root, url, requests = file_server
+    (root / "jdk.tar.gz").write_bytes(_tar_runtime())
+    manager = RuntimeManager(str(tmp_path / "cache"))
+    java = _java(f"{url}/jdk.tar.gz")
+
+    async def run():
+        return await asyncio.gather(*(manager.ensure(java) for _ in range(10)))
+
+    paths = asyncio.run(run())
+    assert len(set(paths)) == 1
+    assert os.access(paths[0], os.X_OK)
+    assert requests == ["/jdk.tar.gz"]
+    assert manager.path(java) == paths[0]
+
+
+def test_sha256_mismatch(tmp_path, file_server):
+    root, url, _ = file_server
+    (root / "jdk.tar.gz").write_bytes(_tar_runtime())
+    manager = RuntimeManager(str(tmp_path / "cache"))
+    java = _java(f"{url}/jdk.tar.gz", sha256="0" * 64)
+
+    with pytest.raises(RuntimeInstallError, match="sha256"):
+        asyncio.run(manager.ensure(java))
+    assert manager.installed() == []
+
+
+def test_sha256_match(tmp_path, file_server):
+    root, url, _ = file_server
+    data = _tar_runtime()
+    (root / "jdk.tar.gz").write_bytes(data)
+    manager = RuntimeManager(str(tmp_path / "cache"))
+    java = _java(f"{url}/jdk.tar.gz", sha256=hashlib.sha256(data).hexdigest())
+    assert asyncio.run(manager.ensure(java))
+
+
+def test_non_archive_link(tmp_path, file_server):
+    root, url, _ = file_server
+    (root / "index.html").write_text("<html>not a jdk</html>")
+    manager = RuntimeManager(str(tmp_path / "cache"))
+
+    with pytest.raises(RuntimeInstallError):
+        asyncio.run(manager.ensure(_java(f"{url}/index.html")))
+    assert not [name for name in os.listdir(tmp_path / "cache") if name.startswith(".install-")]
+
+
+def test_zip_keeps_exec_bit(tmp_path, file_server):
+    root, url, _ = file_server
+    (root / "jdk.zip").write_bytes(_zip_runtime())
+    manager = RuntimeManager(str(tmp_path / "cache"))
+
+    binary = asyncio.run(manager.ensure(_java(f"{url}/jdk.zip", version="17.0.10")))
+    assert os.stat(binary).st_mode & 0o111
+
+
+def test_gc_removes_unreferenced_and_renamed_versions(tmp_path, file_server):
+    root, url, _ = file_server
+    (root / "jdk.tar.gz").write_bytes(_tar_runtime())
+    manager = RuntimeManager(str(tmp_path / "cache"))
+    kept, edited, orphan = (_java(f"{url}/jdk.tar.gz") for _ in range(3))
+
+    async def install():
+        for java in (kept, edited, orphan):
+            await manager.ensure(java)
+
+    asyncio.run(install())
+    old_directory = manager.directory(edited)
+    edited.version = "21.0.3"  # versão editada: o diretório antigo fica órfão
+
+    stale = manager.stale({str(kept.id): kept, str(edited.id): edited})
+    assert sorted(runtime["directory"] for runtime in stale) == sorted([old_directory, manager.directory(orphan)])
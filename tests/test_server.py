@@ -0,0 +1,21 @@
+import subprocess
+
+import pytest
+
+from core.config import settings
+from core.server import Server
+
+
+def test_run_core_failure_leaves_server_stopped(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "servers_dir", str(tmp_path))
+
+    def popen(*args, **kwargs):
+        raise FileNotFoundError("java")
+
+    monkeypatch.setattr(subprocess, "Popen", popen)
+    with Server("survival") as server:
+        with pytest.raises(FileNotFoundError):
+            server.run_core()
+        assert server.running is False and server.process is None
+        # Sem processo, comandos são ignorados em vez de falhar em process.stdin
+        server.execute_command("say oi")
@@ -0,0 +1,38 @@
+import asyncio
+
+from core.singleflight import single_flight
+
+
+def test_leader_cancellation_does_not_fail_followers():
+    calls = 0
+
+    @single_flight
+    async def route():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.2)
+        return {"ok": 1}
+
+    async def run():
+        leader = asyncio.create_task(route())
+        await asyncio.sleep(0.01)
+        followers = [asyncio.create_task(route()) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        leader.cancel()  # cliente que iniciou a computação desconectou
+        return await asyncio.gather(*followers)
+
+    responses = asyncio.run(run())
+    assert [response.body for response in responses] == [b'{"ok": 1}'] * 2
+    assert calls == 1
+
+
+def test_errors_reach_every_caller():
+    @single_flight
+    async def route():
+        await asyncio.sleep(0.05)
+        raise ValueError("falhou")
+
+    async def run():
+        return await asyncio.gather(route(), route(), return_exceptions=True)
+
+    assert [type(error) for error in asyncio.run(run())] == [ValueError, ValueError]
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from beanie import PydanticObjectId
+from pymongo.errors import DuplicateKeyError
+
+from core import hyperloglog, sketches
+from models.operators import Operator
+from models.sketches import Sketch
+
+
+class _SketchCollection:
+    def __init__(self):
+        self.documents: dict[str, dict] = {}
+
+    async def find_one(self, query, projection=None):
+        document = self.documents.get(query["name"])
+        return dict(document) if document else None
+
+    async def insert_one(self, document):
+        if document["name"] in self.documents:
+            raise DuplicateKeyError("name")
+        self.documents[document["name"]] = {**document, "registers": list(document["registers"])}
+
+    async def update_one(self, query, update, upsert=False):
+        document = self.documents.get(query["name"])
+        if document is None:
+            if not upsert:
+                return
+            document = self.documents[query["name"]] = {"name": query["name"]}
+        document.update(update.get("$set", {}))
+        for key, value in update.get("$max", {}).items():
+            index = int(key.split(".")[1])
+            document["registers"][index] = max(document["registers"][index], value)
+
+
+class _OperatorCollection:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def find(self, query, projection):
+        async def cursor():
+            for document in self.documents:
+                yield document
+
+        return cursor()
+
+
+@pytest.fixture
+def collections(monkeypatch):
+    sketch_collection = _SketchCollection()
+    servers = [PydanticObjectId() for _ in range(2000)]
+    operator_collection = _OperatorCollection([{"server_id": server_id} for server_id in servers])
+    monkeypatch.setattr(Sketch, "get_pymongo_collection", classmethod(lambda cls: sketch_collection))
+    monkeypatch.setattr(Operator, "get_pymongo_collection", classmethod(lambda cls: operator_collection))
+    monkeypatch.setattr(sketches, "_ensured", set())
+    return sketch_collection, operator_collection
+
+
+def _within(estimate: int, exact: int) -> bool:
+    return abs(estimate - exact) <= exact * 4 * hyperloglog.STANDARD_ERROR
+
+
+def test_first_add_seeds_existing_values(collections):
+    sketch_collection, operator_collection = collections
+    new = [PydanticObjectId() for _ in range(500)]
+
+    async def run():
+        for server_id in new:
+            operator_collection.documents.append({"server_id": server_id})
+            await sketches.add("operators.server_id", server_id)
+        return await sketches.cardinality("operators.server_id")
+
+    estimate = asyncio.run(run())
+    assert sketch_collection.documents["operators.server_id"]["seeded"]
+    assert _within(estimate, 2500)
+
+
+def test_cardinality_seeds_before_first_add(collections):
+    assert _within(asyncio.run(sketches.cardinality("operators.server_id")), 2000)
+
+
+def test_unseeded_legacy_sketch_is_seeded(collections):
+    sketch_collection, _ = collections
+    # Sketch criado pela versão anterior: zerado e sem `seeded`
+    sketch_collection.documents["operators.server_id"] = {
+        "name": "operators.server_id",
+        "precision": hyperloglog.PRECISION,
+        "registers": [0] * hyperloglog.REGISTERS,
+    }
+    assert _within(asyncio.run(sketches.cardinality("operators.server_id")), 2000)
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from core import sorting
+from core.config import settings
+
+SORTABLE = {"id": "_id", "max_players": "max_players", "level_name": "level_name"}
+
+
+class _Collection:
+    def __init__(self, indexes: list[list[str]]):
+        self.indexes = indexes
+        self.created: list[list[tuple[str, int]]] = []
+
+    async def index_information(self):
+        return {f"idx{i}": {"key": [(key, 1) for key in keys]} for i, keys in enumerate(self.indexes)}
+
+    async def create_index(self, keys):
+        self.created.append(keys)
+
+
+def _model(name: str, indexes: list[list[str]]):
+    collection = _Collection([["_id"], *indexes])
+    return type(name, (), {
+        "get_collection_name": staticmethod(lambda: name),
+        "get_pymongo_collection": staticmethod(lambda: collection),
+        "collection": collection,
+    })
+
+
+@pytest.fixture(autouse=True)
+def _reset(monkeypatch):
+    sorting._index_cache.clear()
+    sorting._index_builds.clear()
+    monkeypatch.setattr(settings, "sort_unindexed_policy", "reject")
+    monkeypatch.setattr(settings, "sort_auto_index", False)
+
+
+def _resolve(model, order_by, filters=None, desc=False):
+    async def run():
+        sort = await sorting.resolve_sort(model, SORTABLE, order_by, desc, filters, ["gamemode"])
+        await asyncio.gather(*sorting._index_builds.values())
+        return sort
+
+    return asyncio.run(run())
+
+
+def test_compound_index_keeps_tiebreaker():
+    model = _model("a", [["gamemode", "max_players", "_id"]])
+    assert _resolve(model, "max_players", {"gamemode": "survival"}, desc=True) == [("max_players", -1), ("_id", -1)]
+
+
+def test_single_field_index_drops_tiebreaker():
+    model = _model("b", [["max_players"]])
+    assert _resolve(model, "max_players") == [("max_players", 1)]
+
+
+def test_unindexed_sort_rejected():
+    model = _model("c", [["level_name", "max_players", "_id"]])
+    with pytest.raises(HTTPException):
+        _resolve(model, "max_players")
+
+
+def test_auto_index_includes_id_and_collection(monkeypatch):
+    monkeypatch.setattr(settings, "sort_auto_index", True)
+    monkeypatch.setattr(settings, "sort_unindexed_policy", "fallback")
+    first, second = _model("d", []), _model("e", [])
+
+
+    async def run():
+        filters = {"gamemode": "creative"}
+        sorts = [await sorting.resolve_sort(model, SORTABLE, "max_players", False, filters, ["gamemode"]) for model in (first, second)]
+        await asyncio.gather(*sorting._index_builds.values())
+        return sorts
+
+    assert asyncio.run(run()) == [[("_id", 1)], [("_id", 1)]]
+    expected = [[("gamemode", 1), ("max_players", 1), ("_id", 1)]]
+    assert first.collection.created == expected
+    assert second.collection.created == expected  # mesma chave, coleção diferente
@@ -0,0 +1,26 @@
+import subprocess
+import sys
+
+import pytest
+
+from core.startup import lazy_import
+
+
+def test_lazy_import_defers_until_first_attribute():
+    code = (
+        "import sys; from core.startup import lazy_import\n"
+        "numpy = lazy_import('numpy')\n"
+        "assert 'numpy._core' not in sys.modules\n"
+        "assert numpy.full(2, 1.0).tolist() == [1.0, 1.0]\n"
+        "assert 'numpy._core' in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_main_does_not_load_numpy():
+    subprocess.run([sys.executable, "-c", "import sys, main; assert 'numpy._core' not in sys.modules"], check=True)
+
+
+def test_lazy_import_missing_module():
+    with pytest.raises(ModuleNotFoundError):
+        lazy_import("modulo_que_nao_existe")
@@ -0,0 +1,34 @@
+import asyncio
+
+from beanie import PydanticObjectId
+
+from core import status_buffer as status_buffer_module
+from core.status_buffer import StatusBuffer
+from models.servers import Server
+
+
+class _Collection:
+    def __init__(self):
+        self.operations = []
+
+    async def bulk_write(self, operations, ordered):
+        self.operations += operations
+
+
+def test_flush_syncs_profile_statuses(monkeypatch):
+    collection = _Collection()
+    synced = []
+
+    async def sync(server_ids):
+        synced.append(set(server_ids))
+
+    monkeypatch.setattr(Server, "get_pymongo_collection", classmethod(lambda cls: collection))
+    monkeypatch.setattr(status_buffer_module, "sync_server_statuses", sync)
+    buffer = StatusBuffer(flush_interval=1, flush_size=100)
+    first, second = PydanticObjectId(), PydanticObjectId()
+    buffer.record(first, "online", players_online=3)
+    buffer.record(second, "offline")
+
+    assert asyncio.run(buffer.flush()) == 2
+    assert synced == [{first, second}]
+    assert buffer.get(first) is None
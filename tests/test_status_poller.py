@@ -0,0 +1,95 @@
+import asyncio
+
+from beanie import PydanticObjectId
+
+from core import slp
+from core.status_buffer import status_buffer
+from core.status_poller import StatusPoller
+from tests.fake_slp import FakeSlpServer
+
+
+def _poller(interval: float = 0.1) -> StatusPoller:
+    return StatusPoller(interval=interval, max_interval=interval * 4, jitter=0.0, concurrency=10, timeout=1.0)
+
+
+def _document(server_id, port: int) -> dict:
+    return {"_id": server_id, "ip_address": "127.0.0.1", "port": port, "status": "offline"}
+
+
+def test_ping_fake_server():
+    async def run():
+        async with FakeSlpServer(online=7, max_players=50) as server:
+            return await slp.ping("127.0.0.1", server.port, timeout=1.0)
+
+    result = asyncio.run(run())
+    assert (result["players_online"], result["players_max"], result["version"]) == (7, 50, "1.21.1")
+
+
+def test_ping_without_pong():
+    async def run():
+        async with FakeSlpServer(answer_ping=False) as server:
+            return await slp.ping("127.0.0.1", server.port, timeout=2.0)
+
+    assert asyncio.run(run())["players_online"] == 3
+
+
+def test_poller_records_online_status():
+    server_id = PydanticObjectId()
+    poller = _poller()
+
+    async def run():
+        async with FakeSlpServer(online=5) as server:
+            poller.sync([_document(server_id, server.port)])
+            task = asyncio.create_task(poller._run())
+            await asyncio.sleep(0.3)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+    target = poller._targets[server_id]
+    assert (target.status, target.players_online, target.failures) == ("online", 5, 0)
+    assert status_buffer._pending.pop(server_id)[0] == "online"
+
+
+def test_address_change_drops_old_schedule():
+    server_id = PydanticObjectId()
+    poller = _poller(interval=0.1)
+
+    async def run():
+        async with FakeSlpServer() as old, FakeSlpServer() as new:
+            poller.sync([_document(server_id, old.port)])
+            task = asyncio.create_task(poller._run())
+            await asyncio.sleep(0.35)
+            poller.sync([_document(server_id, new.port)])
+            assert len(poller._schedule) == 2  # a entrada antiga continua no heap, marcada pela geração
+            await asyncio.sleep(0.05)
+            old_connections, probed = old.connections, poller.probed
+            await asyncio.sleep(1.0)
+            task.cancel()
+            await asyncio.gather(task, *poller._probes, return_exceptions=True)
+            return old.connections - old_connections, new.connections, poller.probed - probed
+
+    old_probes, new_probes, probed = asyncio.run(run())
+    status_buffer._pending.pop(server_id, None)
+    assert old_probes == 0
+    # Uma consulta por intervalo (~10 em 1s), e não duas como com a entrada antiga ativa
+    assert 5 <= new_probes <= 13 and probed <= 13
+    assert len(poller._schedule) == 1
+
+
+def test_removed_target_is_not_probed():
+    server_id = PydanticObjectId()
+    poller = _poller()
+
+    async def run():
+        async with FakeSlpServer() as server:
+            poller.sync([_document(server_id, server.port)])
+            poller.sync([])
+            task = asyncio.create_task(poller._run())
+            await asyncio.sleep(0.3)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return server.connections
+
+    assert asyncio.run(run()) == 0
+    assert poller._schedule == []
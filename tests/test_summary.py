@@ -0,0 +1,11 @@
+from core.summary import SummaryBuilder
+
+
+def test_sample_precedes_facet():
+    pipeline = SummaryBuilder(object, sample_size=500).count("sampled").group_count("by_level", "level").pipeline()
+    assert pipeline[0] == {"$sample": {"size": 500}}
+    assert set(pipeline[1]["$facet"]) == {"sampled", "by_level"}
+
+
+def test_full_collection_without_sample():
+    assert list(SummaryBuilder(object).count("total").pipeline()[0]) == ["$facet"]